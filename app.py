@@ -1,49 +1,346 @@
 """
 app.py - Main entry point
+
+Only aiohttp and the bot's own light modules are imported here, so the port is
+bound quickly. The Bot Framework adapter, DeployBot and the Jenkins / Octopus /
+audit clients (botbuilder, python-jenkins) are loaded by warm_up() in the
+background once the server is listening: /health answers meanwhile,
+/api/messages waits for it.
+
+    python app.py                    # serve on $PORT, with $WEB_CONCURRENCY worker processes
+    python app.py --import-profile   # where startup import time goes
+
+With several workers, each process binds the port itself (SO_REUSEPORT) and the
+kernel spreads connections across them. What has to be seen by every worker —
+pending approvals, build cards waiting for Jenkins, idempotency keys, read
+cache invalidations — goes through the shared store (store/shared.py).
+
+On SIGTERM the ShutdownCoordinator (jobs/shutdown.py) turns new commands away,
+drains the running ones and leaves pending approvals and tracked builds for the
+next process, which resumes them during warm-up.
 """
+import asyncio
+import hmac
+import importlib
+import multiprocessing
+import multiprocessing.connection
 import os
+import signal
+import sys
+import time
+from typing import Optional
 from aiohttp import web
-from botbuilder.core import BotFrameworkAdapterSettings, BotFrameworkAdapter
-from botbuilder.schema import Activity
 
-from bot.deploy_bot import DeployBot
+from cassette.cassette import close_active_cassette
+from codec.fastjson import json_response, loads
 from config.settings import settings
+from diagnostics.loop_monitor import LoopMonitor
+from diagnostics.profiler import ProfilerBusy, profile
+from diagnostics.readiness import ReadinessCheck
+from jobs.shutdown import ShutdownCoordinator
+from metrics.registry import REGISTRY
+from resilience.breaker import snapshot as upstream_breakers
+from resilience.executors import snapshot as executor_pools
+from store.shared import shared_store, worker_id
+from tracing.otlp import OtlpFileExporter
+from tracing.tracer import TRACER, waterfall, waterfall_text
 
-adapter_settings = BotFrameworkAdapterSettings(
-    app_id=settings.APP_ID,
-    app_password=settings.APP_PASSWORD,
+TURN_ERRORS = REGISTRY.counter("deploybot_turn_errors_total", "Turns that ended in an unhandled exception")
+
+# Imported by warm_up() on a worker thread, after the port is bound
+WARM_UP_MODULES = (
+    "botbuilder.core",
+    "botbuilder.schema",
+    "bot.deploy_bot",
+    "auth.tokens",
+    "codec.activity",
+    "jenkins_client.client",
+    "octopus_client.client",
 )
-adapter = BotFrameworkAdapter(adapter_settings)
-bot = DeployBot()
+
+loop_monitor = LoopMonitor()
+shutdown = ShutdownCoordinator()
+if settings.TRACE_EXPORT_PATH:
+    TRACER.exporters.append(OtlpFileExporter(settings.TRACE_EXPORT_PATH))
 
 
 async def on_error(context, error):
+    TURN_ERRORS.inc()
     print(f"[ERROR] {error}")
     await context.send_activity("Something went wrong. Please try again.")
 
-adapter.on_turn_error = on_error
+
+# ─────────────────────────────────────────────────────────────
+# Runtime — the adapter, the bot and its readiness probes, built once
+# ─────────────────────────────────────────────────────────────
+class Runtime:
+
+    def __init__(self):
+        from botbuilder.core import BotFrameworkAdapterSettings, BotFrameworkAdapter
+        from auth.tokens import TokenValidator
+        from bot.deploy_bot import DeployBot
+        from codec.activity import decode_activity
+
+        self.decode_activity = decode_activity
+        self.adapter = BotFrameworkAdapter(BotFrameworkAdapterSettings(
+            app_id=settings.APP_ID,
+            app_password=settings.APP_PASSWORD,
+        ))
+        self.adapter.on_turn_error = on_error
+        self.tokens = TokenValidator(self.adapter)
+        self.bot = DeployBot(self.adapter)
+        self.readiness = ReadinessCheck({
+            "jenkins": lambda: self.bot.jenkins.ping(),
+            "octopus": lambda: self.bot.octopus.ping(),
+            "audit_db": self.bot.audit.ping,
+        })
+
+
+_runtime: Optional[Runtime] = None
+_warming: Optional[asyncio.Task] = None
+_metrics_publisher: Optional[asyncio.Task] = None
+_application: Optional[web.Application] = None
+
+
+def runtime() -> Runtime:
+    """The runtime, built right now if warm_up() has not got to it (scripts, tests)."""
+    global _runtime
+    if _runtime is None:
+        _runtime = Runtime()
+    return _runtime
+
+
+async def warm_up():
+    started = time.perf_counter()
+    # Imports on a worker thread, so the loop keeps answering /health meanwhile
+    await asyncio.to_thread(lambda: [importlib.import_module(name) for name in WARM_UP_MODULES])
+    rt = runtime()
+    rt.tokens.start()
+    bot = rt.bot
+    for client in ("jenkins", "octopus"):
+        try:
+            getattr(bot, client)
+        except Exception as e:
+            print(f"[STARTUP] {client} client could not be built yet: {e}")
+    await shutdown.resume(bot)
+    print(f"[STARTUP] Warm-up finished in {time.perf_counter() - started:.2f}s")
 
 
+async def ready_runtime() -> Runtime:
+    """The runtime, once warm-up has finished."""
+    global _warming
+    if _runtime is not None:
+        return _runtime
+    if _warming is None:
+        _warming = asyncio.create_task(warm_up())
+    await asyncio.shield(_warming)
+    return runtime()
+
+
+def __getattr__(name: str):
+    # Built on first access rather than at import: `app` (gunicorn app:app) and
+    # the runtime objects scripts reach for (app.bot, app.adapter, app.readiness)
+    global _application
+    if name == "app":
+        if _application is None:
+            _application = create_app()
+        return _application
+    if name in ("adapter", "bot", "readiness"):
+        return getattr(runtime(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Handlers only parse and enqueue the command, so this returns as soon as the
+# activity is accepted — Bot Framework never waits on Jenkins or Octopus.
 async def messages(req: web.Request) -> web.Response:
     if "application/json" not in req.content_type:
         return web.Response(status=415)
-    body = await req.json()
-    activity = Activity().deserialize(body)
+    if shutdown.draining:
+        # Bot Framework retries, and the retry reaches a worker that is still up
+        return web.json_response({"error": "shutting down"}, status=503, headers={"Retry-After": "1"})
+    rt = await ready_runtime()
+    # Malformed and expired tokens are turned away before the body is read
     auth_header = req.headers.get("Authorization", "")
-    response = await adapter.process_activity(activity, auth_header, bot.on_turn)
+    refused = rt.tokens.precheck(auth_header)
+    if refused:
+        return web.json_response({"error": refused}, status=401)
+    try:
+        body = loads(await req.read())
+    except ValueError:
+        return web.json_response({"error": "invalid JSON"}, status=400)
+    activity = rt.decode_activity(body)
+    try:
+        identity = await rt.tokens.authenticate(activity, auth_header)
+    except PermissionError:
+        return web.json_response({"error": "unauthorized"}, status=401)
+    response = await rt.adapter.process_activity_with_identity(activity, identity, rt.bot.on_turn)
     if response:
-        return web.json_response(data=response.body, status=response.status)
+        return json_response(response.body, status=response.status)
     return web.Response(status=201)
 
 
 async def jenkins_callback(req: web.Request) -> web.Response:
     body = await req.json()
     print(f"[CALLBACK] Build {body.get('build_number')} for {body.get('app')}: {body.get('status')}")
+    rt = await ready_runtime()
+    await rt.bot.on_build_finished(
+        app=body.get("app"), build_number=body.get("build_number"),
+        status=body.get("status"), url=body.get("url", ""),
+    )
     return web.json_response({"received": True})
 
 
+# /health?ready=1 — readiness mode: 503 while warming up or the event loop is overloaded
 async def health(req: web.Request) -> web.Response:
-    return web.json_response({"status": "ok", "bot": "DeployBot"})
+    if _runtime is None:
+        body = {"status": "starting", "bot": "DeployBot", "worker": worker_id(), "loop": loop_monitor.snapshot()}
+        return web.json_response(body, status=503 if req.query.get("ready") in ("1", "true") else 200)
+    bot = _runtime.bot
+    body = {
+        "status": "ok",
+        "bot": "DeployBot",
+        "worker": worker_id(),
+        "queue": bot.jobs.snapshot(),
+        "outbound": bot.outbound.snapshot(),
+        "deploys": bot.deploys.snapshot(),
+        "upstreams": upstream_breakers(),
+        "executors": executor_pools(),
+        "loop": loop_monitor.snapshot(),
+    }
+    if shutdown.draining:
+        body.update(status="draining", shutdown=shutdown.report)
+        return web.json_response(body, status=503 if req.query.get("ready") in ("1", "true") else 200)
+    if req.query.get("ready") in ("1", "true"):
+        reason = loop_monitor.lagging()
+        if reason:
+            body.update(status="overloaded", reason=reason)
+            return web.json_response(body, status=503)
+    return web.json_response(body)
+
+
+# Readiness for the load balancer: 503 unless Jenkins, Octopus and the audit DB answer
+# (probes cached for READY_CACHE_SECONDS) and the event loop is keeping up
+async def ready(req: web.Request) -> web.Response:
+    if _runtime is None:
+        return web.json_response({"status": "starting"}, status=503)
+    if shutdown.draining:
+        return web.json_response({"status": "draining"}, status=503)
+    ok, report = await _runtime.readiness.check()
+    reason = loop_monitor.lagging()
+    report["checks"]["event_loop"] = {"ok": False, "error": reason} if reason else {"ok": True}
+    ok = ok and not reason
+    return web.json_response({"status": "ready" if ok else "not_ready", **report}, status=200 if ok else 503)
+
+
+async def metrics(req: web.Request) -> web.Response:
+    store = shared_store()
+    if store is None:
+        body = REGISTRY.render()
+    else:
+        # The scrape reaches one worker at random: answer for all of them, labelled by worker
+        others = await store.worker_metrics(max_age=3 * settings.METRICS_PUBLISH_SECONDS)
+        body = REGISTRY.render(workers=[REGISTRY.samples(store.worker), *others])
+    return web.Response(
+        body=body.encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+# /debug/traces?limit=10[&format=text] — the slowest recent command traces, as waterfalls
+async def debug_traces(req: web.Request) -> web.Response:
+    try:
+        limit = max(1, int(req.query.get("limit", "10")))
+    except ValueError:
+        return web.json_response({"error": "limit must be a number"}, status=400)
+    traces = [waterfall(trace) for trace in TRACER.slowest(limit)]
+    if req.query.get("format") == "text":
+        return web.Response(text="\n\n".join(waterfall_text(trace) for trace in traces) + "\n")
+    return web.json_response({"buffered": len(TRACER.finished), "traces": traces})
+
+
+def is_admin(req: web.Request) -> bool:
+    token = settings.DEBUG_ADMIN_TOKEN
+    supplied = req.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    return bool(token) and hmac.compare_digest(supplied.encode(), token.encode())
+
+
+# /debug/profile?seconds=30&mode=cpu|alloc — profiles the live bot, returns collapsed stacks
+async def debug_profile(req: web.Request) -> web.Response:
+    if not is_admin(req):
+        return web.json_response({"error": "forbidden"}, status=403)
+    mode = req.query.get("mode", "cpu")
+    if mode not in ("cpu", "alloc"):
+        return web.json_response({"error": "mode must be cpu or alloc"}, status=400)
+    try:
+        seconds = float(req.query.get("seconds", "30"))
+    except ValueError:
+        return web.json_response({"error": "seconds must be a number"}, status=400)
+    if not 0 < seconds <= settings.PROFILE_MAX_SECONDS:
+        return web.json_response(
+            {"error": f"seconds must be between 0 and {settings.PROFILE_MAX_SECONDS}"}, status=400)
+
+    print(f"[PROFILE] {mode} profile for {seconds:g}s requested")
+    try:
+        stacks = await profile(mode, seconds)
+    except ProfilerBusy as e:
+        return web.json_response({"error": str(e)}, status=409)
+    filename = f"deploybot-{mode}-{time.strftime('%Y%m%d-%H%M%S')}.folded"
+    return web.Response(text=stacks, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+async def start_loop_monitor(application: web.Application):
+    loop_monitor.start()
+
+
+async def start_warm_up(application: web.Application):
+    # Runs once the server is listening; on_startup itself finishes before the port is bound
+    global _warming
+    if _warming is None:
+        _warming = asyncio.create_task(warm_up())
+
+
+async def start_shared_state(application: web.Application):
+    global _metrics_publisher
+    store = shared_store()
+    if store is not None:
+        store.start()
+        _metrics_publisher = asyncio.create_task(publish_metrics(store))
+
+
+async def publish_metrics(store):
+    """Keep this worker's samples in the shared store, for scrapes that reach another worker."""
+    while True:
+        try:
+            await store.publish_metrics(REGISTRY.samples(store.worker))
+        except Exception as e:
+            print(f"[STATE] Could not publish metrics: {e}")
+        await asyncio.sleep(settings.METRICS_PUBLISH_SECONDS)
+
+
+async def drain_commands(application: web.Application):
+    # Runs once the listening socket is closed, before open connections are
+    await shutdown.shutdown(_runtime.bot if _runtime is not None else None)
+
+
+async def stop_loop_monitor(application: web.Application):
+    await loop_monitor.stop()
+
+
+async def stop_token_refresh(application: web.Application):
+    if _runtime is not None:
+        await _runtime.tokens.stop()
+
+
+async def stop_shared_state(application: web.Application):
+    if _metrics_publisher is not None:
+        _metrics_publisher.cancel()
+    store = shared_store()
+    if store is not None:
+        await store.stop()
+
+
+async def close_cassette(application: web.Application):
+    close_active_cassette()
 
 
 def create_app() -> web.Application:
@@ -51,13 +348,77 @@ def create_app() -> web.Application:
     application.router.add_post("/api/messages", messages)
     application.router.add_post("/api/callback", jenkins_callback)
     application.router.add_get("/health", health)
+    application.router.add_get("/ready", ready)
+    application.router.add_get("/metrics", metrics)
+    application.router.add_get("/debug/traces", debug_traces)
+    application.router.add_get("/debug/profile", debug_profile)
+    application.on_startup.append(start_loop_monitor)
+    application.on_startup.append(start_warm_up)
+    application.on_startup.append(start_shared_state)
+    application.on_shutdown.append(drain_commands)
+    application.on_cleanup.append(stop_loop_monitor)
+    application.on_cleanup.append(stop_token_refresh)
+    application.on_cleanup.append(stop_shared_state)
+    application.on_cleanup.append(close_cassette)
     return application
 
 
+# ─────────────────────────────────────────────────────────────
+# Worker processes
+# ─────────────────────────────────────────────────────────────
+def serve(port: int, workers: int = 1):
+    """Serve on `port` from this process, or from `workers` forked processes that replace any that die."""
+    if workers <= 1:
+        web.run_app(create_app(), host="0.0.0.0", port=port)
+        return
+
+    print(f"[STARTUP] {workers} workers on port {port}, sharing state through {settings.STATE_DB_PATH}")
+    print(f"[STARTUP] WARNING: commands that share a serial key (builds of one app) are only run in order "
+          f"within a worker; two workers can start builds of the same app at once")
+    # Forked before any event loop or thread exists; each worker builds its own
+    context = multiprocessing.get_context("fork")
+    running: list[multiprocessing.Process] = []
+    stopping = False
+
+    def start_worker():
+        process = context.Process(target=_run_worker, args=(port,), name="deploybot-worker")
+        process.start()
+        running.append(process)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        # Ctrl-C already reached the workers (same process group); SIGTERM is passed on
+        if signum == signal.SIGTERM:
+            for process in running:
+                process.terminate()
+
+    for _ in range(workers):
+        start_worker()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while running:
+        multiprocessing.connection.wait([process.sentinel for process in running])
+        for process in [process for process in running if not process.is_alive()]:
+            running.remove(process)
+            if not stopping:
+                print(f"[STARTUP] Worker {process.pid} exited with code {process.exitcode}; starting another")
+                start_worker()
+
+
+def _run_worker(port: int):
+    # Replacement workers are forked after serve() took over these
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    # Each worker listens on the port itself; the kernel spreads connections across them
+    web.run_app(create_app(), host="0.0.0.0", port=port, reuse_port=True, print=None)
+
+
 if __name__ == "__main__":
+    if "--import-profile" in sys.argv:
+        from diagnostics.import_profile import report
+        print(report())
+        sys.exit(0)
     PORT = int(os.environ.get("PORT", 8000))
     print(f"DeployBot starting on port {PORT}")
-    web.run_app(create_app(), host="0.0.0.0", port=PORT)
-
-# Expose app instance for gunicorn
-app = create_app()
\ No newline at end of file
+    serve(PORT, settings.WEB_CONCURRENCY)
@@ -3,23 +3,48 @@ approval/manager.py
 Manages pending deployment approvals.
 
 Flow:
-  1. Bot calls `create()` → stores pending approval, returns unique ID
+  1. Bot calls `create()` → stores pending approval, posts the approval card, returns unique ID
   2. Approver clicks ✅/❌ on the Adaptive Card in Teams
   3. Bot calls `handle_response()` → executes or cancels the deployment
   4. Pending approvals expire after APPROVAL_TIMEOUT_MINUTES
+
+An approval created with `on_response` is a gate for someone else's work (the
+stages of a `promote`): instead of deploying, handle_response / expiry call
+`on_response(approved, approver)` and leave the rest of the card to the caller.
+
+The approval card is edited in place for every later step (approved, deploying,
+triggered / failed, rejected, expired) instead of posting new messages.
+
+With a shared store (several worker processes) pending approvals are also kept
+there, and a click is handled by whichever worker receives it: claiming the
+approval in the store decides who acts on it. The worker that raised the
+approval is told through the store's change feed, and for a `promote` gate it
+is the one that carries on, since the promotion runs there.
+
+At shutdown `checkpoint()` leaves the pending approvals for the next process
+(see store/shared.py), which `adopt()`s them with the time they had left.
 """
 import uuid
 import asyncio
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, timezone
 from botbuilder.core import TurnContext, MessageFactory
 
 from config.settings import settings
-from bot.cards import deploy_triggered_card, error_card
+from bot.cards import OperationCard, deploy_outcome
+from outbound.scheduler import OutboundScheduler
+from outbound.live_card import LiveCard
+from jobs.deploys import DeployScheduler
+from metrics.registry import REGISTRY
+from store.shared import RELEASED, SharedStore
+
+
+PENDING_APPROVALS = REGISTRY.gauge("deploybot_pending_approvals", "Approval requests waiting for a decision")
 
 
 class PendingApproval:
     def __init__(self, app, build_number, environment, requested_by,
-                 turn_context, is_rollback=False):
+                 turn_context, is_rollback=False, on_response=None):
         self.id = str(uuid.uuid4())
         self.app = app
         self.build_number = build_number
@@ -27,6 +52,8 @@ class PendingApproval:
         self.requested_by = requested_by
         self.turn_context = turn_context   # Saved to reply in same channel
         self.is_rollback = is_rollback
+        self.card = None                   # LiveCard showing this request
+        self.on_response = on_response     # async (approved, approver) → None, instead of deploying
         self.created_at = datetime.utcnow()
         self.expires_at = self.created_at + timedelta(
             minutes=settings.APPROVAL_TIMEOUT_MINUTES
@@ -35,10 +62,21 @@ class PendingApproval:
 
 class ApprovalManager:
 
-    def __init__(self):
-        # In-memory store: approval_id → PendingApproval
-        # For production, replace with Redis or a database
+    def __init__(self, reads=None, outbound: OutboundScheduler = None, deploys: DeployScheduler = None,
+                 store: SharedStore = None):
+        # approval_id → PendingApproval, for the approvals this process raised
         self._pending: dict[str, PendingApproval] = {}
+        PENDING_APPROVALS.set_function(lambda: len(self._pending))
+        # Bot's status/history cache — invalidated once an approved change goes out
+        self.reads = reads
+        # All replies go through the bot's per-conversation outbound lanes
+        self.outbound = outbound or OutboundScheduler()
+        # Approved deploys queue with direct ones, so a newer build can supersede them
+        self.deploys = deploys or DeployScheduler()
+        # Shared with the other worker processes, when there are any
+        self.store = store
+        if store is not None:
+            store.subscribe("approval", self._decided_elsewhere)
 
     async def create(
         self,
@@ -48,10 +86,11 @@ class ApprovalManager:
         requested_by: str,
         turn_context: TurnContext,
         is_rollback: bool = False,
+        on_response=None,
     ) -> str:
         """
-        Register a pending approval and schedule auto-expiry.
-        Returns the approval_id to embed in the Adaptive Card.
+        Register a pending approval, post its approval card and schedule auto-expiry.
+        Returns the approval_id embedded in the card's buttons.
         """
         approval = PendingApproval(
             app=app,
@@ -60,13 +99,37 @@ class ApprovalManager:
             requested_by=requested_by,
             turn_context=turn_context,
             is_rollback=is_rollback,
+            on_response=on_response,
         )
         self._pending[approval.id] = approval
+        approval.card = LiveCard(self.outbound, turn_context, OperationCard(
+            kind="rollback" if is_rollback else "deploy",
+            app=app, build=build_number, env=environment, user=requested_by,
+            approval_id=approval.id, stage="awaiting_approval",
+        ))
+        if self.store is not None:
+            # Stored before the card is posted, so a click can never arrive first
+            expires_at = time.time() + settings.APPROVAL_TIMEOUT_MINUTES * 60
+            await self.store.add_approval(approval.id, self._record(approval), expires_at)
+        await approval.card.post()
+        if self.store is not None and approval.card.activity_id:
+            await self.store.update_approval(approval.id, self._record(approval))
 
         # Auto-expire after timeout
         asyncio.create_task(self._expire(approval.id))
         return approval.id
 
+    def peek(self, approval_id: str):
+        """Return the pending approval without consuming it, or None."""
+        return self._pending.get(approval_id)
+
+    async def cancel(self, approval_id: str, reason: str):
+        """Withdraw a pending approval that is no longer needed; its card says why."""
+        approval = await self._take_own(approval_id)
+        if approval:
+            approval.card.set(stage="cancelled", detail=reason)
+            await approval.card.settle()
+
     async def handle_response(
         self,
         approval_id: str,
@@ -77,51 +140,51 @@ class ApprovalManager:
         """
         Called when an approver clicks ✅ or ❌ on the Adaptive Card.
         """
-        approval = self._pending.pop(approval_id, None)
+        approval = await self._claim(approval_id, turn_context)
 
         if approval is None:
-            await turn_context.send_activity(
+            await self.outbound.send(
+                turn_context,
                 MessageFactory.text("⚠️ This approval request has already been handled or expired.")
             )
             return
 
+        card = approval.card
         if not approved:
-            await turn_context.send_activity(
-                MessageFactory.text(
-                    f"❌ **{approver}** rejected the deployment of "
-                    f"`{approval.app}` build **#{approval.build_number}** to **{approval.environment.upper()}**."
-                )
-            )
+            card.set(stage="rejected", approver=approver)
+            if approval.on_response:
+                await approval.on_response(False, approver)
+            await card.settle()
+            return
+
+        if approval.on_response:
+            await approval.on_response(True, approver)
             return
 
         # Approved — execute the deployment
-        await turn_context.send_activity(
-            MessageFactory.text(
-                f"✅ **{approver}** approved! Deploying `{approval.app}` "
-                f"build **#{approval.build_number}** to **{approval.environment.upper()}**..."
-            )
-        )
+        card.set(stage="deploying", approver=approver)
 
         # Import here to avoid circular import
-        from octopus.client import OctopusClient
         from audit.logger import AuditLogger
 
-        octopus = OctopusClient()
         audit = AuditLogger()
 
         if approval.is_rollback:
-            result = await octopus.rollback(
+            result = await self.deploys.rollback(
                 app=approval.app,
                 environment=approval.environment,
+                requested_by=approval.requested_by,
             )
             action = "rollback"
         else:
-            result = await octopus.deploy(
+            result = await self.deploys.deploy(
                 app=approval.app,
                 build_number=approval.build_number,
                 environment=approval.environment,
+                requested_by=approval.requested_by,
             )
             action = "deploy"
+        card.set(**deploy_outcome(result))
 
         await audit.log(
             user=approver,
@@ -131,34 +194,111 @@ class ApprovalManager:
                      "approved_by": approver},
             result=result,
         )
+        if self.reads is not None:
+            self.reads.invalidate(approval.app)
+        await card.settle()
 
-        status = result.get("status", "unknown")
-        if status == "triggered":
-            link = result.get("url", "")
-            await turn_context.send_activity(
-                MessageFactory.text(
-                    f"🚀 Deployment triggered in Octopus! {link}"
-                )
-            )
+    async def _expire(self, approval_id: str, delay: float = None):
+        """Wait for the timeout period (or `delay` seconds), then remove if still pending."""
+        await asyncio.sleep(settings.APPROVAL_TIMEOUT_MINUTES * 60 if delay is None else max(delay, 0))
+        approval = await self._take_own(approval_id)
+        if approval:
+            # Show on the approval card that the request expired
+            approval.card.set(stage="expired")
+            if approval.on_response:
+                await approval.on_response(False, None)
+            await approval.card.settle()   # LiveCard logs if the channel is no longer reachable
+
+    # ─────────────────────────────────────────────────────────────
+    # Sharing approvals between worker processes
+    # ─────────────────────────────────────────────────────────────
+    @staticmethod
+    def _record(approval: PendingApproval) -> dict:
+        """What another worker needs to act on a click for `approval`."""
+        return {
+            "app": approval.app,
+            "build_number": approval.build_number,
+            "environment": approval.environment,
+            "requested_by": approval.requested_by,
+            "is_rollback": approval.is_rollback,
+            "gate": approval.on_response is not None,
+            "card": approval.card.record(),
+            "reference": TurnContext.get_conversation_reference(approval.turn_context.activity).serialize(),
+        }
+
+    def _restore(self, approval_id: str, record: dict, turn_context: TurnContext) -> PendingApproval:
+        """A PendingApproval for `record`; `turn_context` must be in the approval card's conversation."""
+        approval = PendingApproval(
+            app=record["app"], build_number=record["build_number"], environment=record["environment"],
+            requested_by=record["requested_by"], turn_context=turn_context, is_rollback=record["is_rollback"],
+        )
+        approval.id = approval_id
+        approval.card = LiveCard.restore(self.outbound, turn_context, record["card"])
+        return approval
+
+    async def _claim(self, approval_id: str, turn_context: TurnContext):
+        """The approval a click is for, now this worker's to act on; None if already handled or expired."""
+        if self.store is None:
+            return self._pending.pop(approval_id, None)
+        claimed = await self.store.claim_approval(approval_id)
+        if claimed is None:
+            return None
+        approval = self._pending.pop(approval_id, None)
+        if approval is not None:
+            return approval
+
+        # Raised by another worker. The click comes from the card's own conversation,
+        # so its turn context can edit the card
+        _, record = claimed
+        approval = self._restore(approval_id, record, turn_context)
+        if record["gate"]:
+            # The promotion waiting on this gate carries on in the worker that raised it
+            async def on_response(approved: bool, approver: str):
+                self.store.notify("approval", approval_id, {"approved": approved, "approver": approver})
+            approval.on_response = on_response
         else:
-            await turn_context.send_activity(
-                MessageFactory.attachment(
-                    error_card(f"Deployment failed: {result.get('message', 'Unknown error')}")
-                )
-            )
+            self.store.notify("approval", approval_id)   # Handled here; the owner can forget it
+        return approval
+
+    async def _take_own(self, approval_id: str):
+        """One of this worker's approvals, to cancel or expire; None if it has been decided meanwhile."""
+        if self.store is not None and await self.store.claim_approval(approval_id, unexpired=False) is None:
+            # Claimed by a click on another worker, which says so through the change feed
+            return None
+        return self._pending.pop(approval_id, None)
 
-    async def _expire(self, approval_id: str):
-        """Wait for the timeout period, then remove if still pending."""
-        await asyncio.sleep(settings.APPROVAL_TIMEOUT_MINUTES * 60)
+    async def _decided_elsewhere(self, approval_id: str, decision: dict = None):
+        """Change feed: another worker took the click for one of this worker's approvals."""
         approval = self._pending.pop(approval_id, None)
-        if approval:
-            # Notify the channel that the request expired
-            try:
-                await approval.turn_context.send_activity(
-                    MessageFactory.text(
-                        f"⏱️ Approval request for `{approval.app}` to "
-                        f"**{approval.environment.upper()}** has expired."
-                    )
-                )
-            except Exception:
-                pass  # Channel may no longer be reachable
+        if approval is not None and decision is not None and approval.on_response:
+            await approval.on_response(decision["approved"], decision["approver"])
+
+    # ─────────────────────────────────────────────────────────────
+    # Restarts
+    # ─────────────────────────────────────────────────────────────
+    async def checkpoint(self, store: SharedStore) -> int:
+        """
+        Shutdown, without a shared store: write the pending approvals to the
+        checkpoint `store` for the next process to adopt. Returns how many.
+        """
+        for approval in self._pending.values():
+            expires_at = approval.expires_at.replace(tzinfo=timezone.utc).timestamp()
+            await store.add_approval(approval.id, self._record(approval), expires_at, owner=RELEASED)
+        return len(self._pending)
+
+    async def adopt(self, approval_id: str, record: dict, expires_at: float, turn_context: TurnContext):
+        """
+        Startup: take over an approval a previous process left pending, with the
+        time it had left. A `promote` gate is withdrawn instead, since the
+        promotion waiting on it did not survive the restart.
+        """
+        approval = self._restore(approval_id, record, turn_context)
+        if record["gate"]:
+            if self.store is not None:
+                await self.store.claim_approval(approval_id, unexpired=False)
+            approval.card.set(stage="cancelled", detail="DeployBot restarted during the promotion — run `promote` again")
+            await approval.card.settle()
+            return
+        approval.expires_at = datetime.utcfromtimestamp(expires_at)
+        self._pending[approval_id] = approval
+        asyncio.create_task(self._expire(approval_id, expires_at - time.time()))
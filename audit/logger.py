@@ -3,20 +3,35 @@ audit/logger.py
 Persists every bot action to a local SQLite database.
 Table: audit_log (id, timestamp, user, action, app, details, result)
 
+Queries run on the bounded "sqlite" executor (resilience/executors.py).
+
 Replace SQLite with PostgreSQL for production by swapping the connection string.
 """
 import json
-import aiosqlite
+import sqlite3
+import time
+from contextlib import closing
 from datetime import datetime
 
+from metrics.registry import REGISTRY
+from resilience.executors import executor
+from tracing.tracer import traced
+
 
 DB_PATH = "audit.db"
 
+AUDIT_WRITE = REGISTRY.histogram("deploybot_audit_write_seconds", "Time to write one audit record")
+
+
+def _connect() -> closing:
+    return closing(sqlite3.connect(DB_PATH))
+
 
 class AuditLogger:
 
-    async def _ensure_table(self, db):
-        await db.execute("""
+    @staticmethod
+    def _ensure_table(db: sqlite3.Connection):
+        db.execute("""
             CREATE TABLE IF NOT EXISTS audit_log (
                 id        INTEGER PRIMARY KEY AUTOINCREMENT,
                 timestamp TEXT NOT NULL,
@@ -27,8 +42,12 @@ class AuditLogger:
                 result    TEXT
             )
         """)
-        await db.commit()
+        # get_history walks one app's records newest-first; without this it
+        # scans the whole log for apps with little recent activity
+        db.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_app_id ON audit_log (app, id)")
+        db.commit()
 
+    @traced("audit.log")
     async def log(
         self,
         user: str,
@@ -38,30 +57,58 @@ class AuditLogger:
         result: dict = None,
     ):
         """Write a single audit record."""
-        async with aiosqlite.connect(DB_PATH) as db:
-            await self._ensure_table(db)
-            await db.execute(
+        started = time.perf_counter()
+        await executor("sqlite").run(self._write, (
+            datetime.utcnow().isoformat(),
+            user,
+            action,
+            app,
+            json.dumps(details or {}),
+            json.dumps(result or {}),
+        ))
+        AUDIT_WRITE.observe(time.perf_counter() - started)
+
+    def _write(self, record: tuple):
+        with _connect() as db:
+            self._ensure_table(db)
+            db.execute(
                 """
                 INSERT INTO audit_log (timestamp, user, action, app, details, result)
                 VALUES (?, ?, ?, ?, ?, ?)
                 """,
-                (
-                    datetime.utcnow().isoformat(),
-                    user,
-                    action,
-                    app,
-                    json.dumps(details or {}),
-                    json.dumps(result or {}),
-                ),
+                record,
             )
-            await db.commit()
+            db.commit()
+
+    async def ping(self):
+        """Check the audit database can be opened and queried. Raises on failure."""
+        await executor("sqlite").run(self._ping)
 
+    @staticmethod
+    def _ping():
+        with _connect() as db:
+            db.execute("SELECT 1")
+
+    @traced("audit.history")
     async def get_history(self, app: str, limit: int = 10) -> list[dict]:
         """Return the last N audit records for a given app."""
-        async with aiosqlite.connect(DB_PATH) as db:
-            await self._ensure_table(db)
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute(
+        rows = await executor("sqlite").run(self._read_history, app, limit)
+        result = []
+        for row in rows:
+            res = json.loads(row["result"] or "{}")
+            result.append({
+                "timestamp": row["timestamp"],
+                "user": row["user"],
+                "action": row["action"],
+                "result": res.get("status", "unknown"),
+            })
+        return result
+
+    def _read_history(self, app: str, limit: int) -> list[sqlite3.Row]:
+        with _connect() as db:
+            self._ensure_table(db)
+            db.row_factory = sqlite3.Row
+            cursor = db.execute(
                 """
                 SELECT timestamp, user, action, result
                 FROM audit_log
@@ -71,14 +118,4 @@ class AuditLogger:
                 """,
                 (app, limit),
             )
-            rows = await cursor.fetchall()
-            result = []
-            for row in rows:
-                res = json.loads(row["result"] or "{}")
-                result.append({
-                    "timestamp": row["timestamp"],
-                    "user": row["user"],
-                    "action": row["action"],
-                    "result": res.get("status", "unknown"),
-                })
-            return result
+            return cursor.fetchall()
@@ -0,0 +1,204 @@
+"""
+auth/tokens.py
+Bot Framework token validation in front of the adapter.
+
+botbuilder checks the JWT on every /api/messages request: it parses the signing
+key out of the JWKS and verifies the RS256 signature each time, and once its
+copy of the keys is a day old it refetches them with blocking HTTP calls on
+the event loop. Teams reuses a token for about an hour, so here:
+
+  - precheck() refuses malformed and expired tokens before the request body
+    is read
+  - authenticate() returns the identity of a token it has already verified for
+    the same channel and service URL, until the token expires, and refuses one
+    that failed for them within AUTH_REJECT_CACHE_SECONDS; anything else goes
+    through the adapter's own validation
+  - a background task refetches the OpenID metadata and signing keys every
+    AUTH_KEYS_REFRESH_HOURS, so new keys are in place before Microsoft rotates
+    to them and the request path never fetches them itself
+
+With no MicrosoftAppId configured (local runs) authentication is disabled
+and only the adapter's anonymous path runs.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+import aiohttp
+import jwt
+from botframework.connector.auth import (
+    AuthenticationConstants,
+    ChannelValidation,
+    ClaimsIdentity,
+    JwtTokenExtractor,
+    MicrosoftAppCredentials,
+)
+
+from config.settings import settings
+from metrics.registry import REGISTRY
+
+
+AUTH_SECONDS = REGISTRY.histogram(
+    "deploybot_auth_seconds", "Time to validate the token of an incoming activity", ["result"],
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+KEY_REFRESHES = REGISTRY.counter(
+    "deploybot_auth_key_refreshes_total", "Background refreshes of the Bot Framework signing keys", ["result"])
+
+_OBSERVE = {result: AUTH_SECONDS.labels(result).observe
+            for result in ("cached", "verified", "rejected", "anonymous")}
+_REFRESHED = {result: KEY_REFRESHES.labels(result) for result in ("ok", "failed")}
+
+# Same allowance botbuilder gives token expiry
+CLOCK_TOLERANCE_SECONDS = 5 * 60
+KEYS_RETRY_SECONDS = 300
+
+
+def metadata_urls() -> list[str]:
+    """The OpenID metadata documents botbuilder validates channel and emulator tokens against."""
+    return [
+        ChannelValidation.open_id_metadata_endpoint or AuthenticationConstants.TO_BOT_FROM_CHANNEL_OPEN_ID_METADATA_URL,
+        AuthenticationConstants.TO_BOT_FROM_EMULATOR_OPEN_ID_METADATA_URL,
+    ]
+
+
+class TokenValidator:
+
+    def __init__(self, adapter, max_entries: int = None, reject_seconds: float = None):
+        self.adapter = adapter
+        self.max_entries = max_entries or settings.AUTH_TOKEN_CACHE_SIZE
+        self.reject_seconds = settings.AUTH_REJECT_CACHE_SECONDS if reject_seconds is None else reject_seconds
+        self.disabled = not settings.APP_ID
+        # (token hash, channel id, service url) → (expires_at, identity), oldest first
+        self._verified: OrderedDict[tuple, tuple[float, ClaimsIdentity]] = OrderedDict()
+        # (token hash, channel id, service url) → refused until
+        self._rejected: OrderedDict[tuple, float] = OrderedDict()
+        self._refresher: Optional[asyncio.Task] = None
+
+    # ─────────────────────────────────────────────────────────────
+    # Request path
+    # ─────────────────────────────────────────────────────────────
+    def precheck(self, auth_header: str) -> Optional[str]:
+        """Why the header is refused without looking at the body, or None to carry on."""
+        if self.disabled:
+            return None
+        started = time.perf_counter()
+        reason = self._precheck(auth_header)
+        if reason:
+            _OBSERVE["rejected"](time.perf_counter() - started)
+        return reason
+
+    def _precheck(self, auth_header: str) -> Optional[str]:
+        scheme, _, token = auth_header.partition(" ")
+        if scheme != "Bearer" or token.count(".") != 2:
+            return "missing or malformed bearer token"
+        try:
+            claims = jwt.decode(token, options={"verify_signature": False})
+        except jwt.PyJWTError:
+            return "malformed token"
+        if not isinstance(claims.get("exp"), (int, float)) or claims["exp"] + CLOCK_TOLERANCE_SECONDS < time.time():
+            return "token expired"
+        return None
+
+    async def authenticate(self, activity, auth_header: str) -> ClaimsIdentity:
+        """The caller's identity, as the adapter would establish it. Raises PermissionError."""
+        started = time.perf_counter()
+        if self.disabled or not auth_header:
+            identity = await self.adapter._authenticate_request(activity, auth_header)
+            _OBSERVE["anonymous"](time.perf_counter() - started)
+            return identity
+
+        # A token is only good for the channel and service URL it was checked against
+        key = (_hash(auth_header.partition(" ")[2]), activity.channel_id, activity.service_url)
+        cached = self._verified.get(key)
+        if cached and cached[0] > time.time():
+            # What a full validation would do besides checking the token
+            MicrosoftAppCredentials.trust_service_url(activity.service_url)
+            _OBSERVE["cached"](time.perf_counter() - started)
+            return cached[1]
+        refused_until = self._rejected.get(key)
+        if refused_until and refused_until > time.monotonic():
+            _OBSERVE["rejected"](time.perf_counter() - started)
+            raise PermissionError("Unauthorized: token was rejected")
+
+        try:
+            identity = await self.adapter._authenticate_request(activity, auth_header)
+        except Exception as e:
+            _OBSERVE["rejected"](time.perf_counter() - started)
+            if isinstance(e, OSError) and not isinstance(e, PermissionError):
+                raise   # Could not fetch keys — says nothing about the token
+            self._reject(key)
+            if isinstance(e, PermissionError):
+                raise
+            raise PermissionError(f"Unauthorized: {e}") from e
+        self._remember(key, identity)
+        _OBSERVE["verified"](time.perf_counter() - started)
+        return identity
+
+    def _remember(self, key: tuple, identity: ClaimsIdentity):
+        expires = identity.claims.get("exp") if identity.claims else None
+        if not isinstance(expires, (int, float)):
+            return
+        self._verified.pop(key, None)
+        self._verified[key] = (expires, identity)
+        while len(self._verified) > self.max_entries:
+            self._verified.popitem(last=False)
+
+    def _reject(self, key: tuple):
+        if not self.reject_seconds:
+            return
+        self._rejected.pop(key, None)
+        self._rejected[key] = time.monotonic() + self.reject_seconds
+        while len(self._rejected) > self.max_entries:
+            self._rejected.popitem(last=False)
+
+    # ─────────────────────────────────────────────────────────────
+    # Signing keys
+    # ─────────────────────────────────────────────────────────────
+    def start(self):
+        if not self.disabled and self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    async def _refresh_forever(self):
+        while True:
+            ok = await self.refresh_keys()
+            await asyncio.sleep(settings.AUTH_KEYS_REFRESH_HOURS * 3600 if ok else KEYS_RETRY_SECONDS)
+
+    async def refresh_keys(self) -> bool:
+        """Fetch the signing keys into botbuilder's metadata cache. False if any fetch failed."""
+        ok = True
+        timeout = aiohttp.ClientTimeout(total=30)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            for url in metadata_urls():
+                try:
+                    async with session.get(url) as resp:
+                        resp.raise_for_status()
+                        jwks_uri = (await resp.json(content_type=None))["jwks_uri"]
+                    async with session.get(jwks_uri) as resp:
+                        resp.raise_for_status()
+                        keys = (await resp.json(content_type=None))["keys"]
+                except Exception as e:
+                    ok = False
+                    print(f"[AUTH] Could not refresh signing keys from {url}: {e}")
+                    continue
+                # The object botbuilder's validators read from; fresh keys mean it never refetches itself
+                metadata = JwtTokenExtractor.get_open_id_metadata(url)
+                metadata.keys = keys
+                metadata.last_updated = datetime.now()
+        _REFRESHED["ok" if ok else "failed"].inc()
+        return ok
+
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
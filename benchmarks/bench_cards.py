@@ -0,0 +1,214 @@
+"""
+benchmarks/bench_cards.py
+Microbenchmark: the card builders in bot/cards.py (shared fixed parts, help
+built once) vs the original builders that rebuilt every dict per call.
+
+Reports, for each card:
+  cards/s       — renders per second (Attachment included), best of --repeat runs
+  bytes/card    — memory retained per rendered card, measured with tracemalloc
+
+Usage:
+    python benchmarks/bench_cards.py                # table
+    python benchmarks/bench_cards.py --json         # machine-readable
+    python benchmarks/bench_cards.py -n 50000 --repeat 10
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from botbuilder.schema import Attachment
+
+from bot import cards
+
+
+# ─────────────────────────────────────────────────────────────
+# Reference: the original builders, every dict rebuilt per call
+# ─────────────────────────────────────────────────────────────
+def _make_card(body, actions=None):
+    card = {
+        "type": "AdaptiveCard",
+        "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
+        "version": "1.4",
+        "body": body,
+    }
+    if actions:
+        card["actions"] = actions
+    return Attachment(content_type="application/vnd.microsoft.card.adaptive", content=card)
+
+
+def legacy_help_card():
+    return _make_card([
+        {"type": "TextBlock", "text": "🤖 DeployBot Commands", "weight": "Bolder", "size": "Large"},
+        {"type": "TextBlock", "text": "Here's what I can do:", "wrap": True, "spacing": "Small"},
+        {"type": "FactSet", "facts": [
+            {"title": "build <app> <branch>", "value": "Trigger a Jenkins build"},
+            {"title": "deploy <app> <build#> <env>", "value": "Deploy to qa / uat / prod"},
+            {"title": "status <app>", "value": "Check deployment status in Octopus"},
+            {"title": "rollback <app> <env>", "value": "Roll back to the previous release"},
+            {"title": "history <app>", "value": "Show last 10 actions for an app"},
+        ]},
+        {"type": "TextBlock", "text": "💡 UAT and Prod deployments require approval from a Team Lead.",
+         "wrap": True, "isSubtle": True, "spacing": "Medium"},
+    ])
+
+
+def legacy_build_triggered_card(app, branch, user):
+    return _make_card([
+        {"type": "TextBlock", "text": "🔨 Build Triggered", "weight": "Bolder", "size": "Medium", "color": "Good"},
+        {"type": "FactSet", "facts": [
+            {"title": "App", "value": app},
+            {"title": "Branch", "value": branch},
+            {"title": "Triggered by", "value": user},
+            {"title": "Status", "value": "⏳ Running in Jenkins..."},
+        ]},
+        {"type": "TextBlock", "text": "I'll update you here when the build completes.", "wrap": True, "isSubtle": True},
+    ])
+
+
+def legacy_deploy_triggered_card(app, build, env, user):
+    color = cards.ENV_COLORS.get(env, "Default")
+    return _make_card([
+        {"type": "TextBlock", "text": f"🚀 Deploying to {env.upper()}", "weight": "Bolder", "size": "Medium",
+         "color": color},
+        {"type": "FactSet", "facts": [
+            {"title": "App", "value": app},
+            {"title": "Build", "value": f"#{build}"},
+            {"title": "Environment", "value": env.upper()},
+            {"title": "Triggered by", "value": user},
+            {"title": "Status", "value": "⏳ Deploying via Octopus..."},
+        ]},
+    ])
+
+
+def legacy_approval_request_card(approval_id, app, build, env, requested_by, is_rollback=False):
+    action_label = "Rollback" if is_rollback else "Deployment"
+    color = cards.ENV_COLORS.get(env, "Warning")
+    return _make_card(
+        body=[
+            {"type": "TextBlock", "text": f"⚠️ {action_label} Approval Required",
+             "weight": "Bolder", "size": "Large", "color": color},
+            {"type": "TextBlock",
+             "text": f"**{requested_by}** wants to deploy `{app}` build **#{build}** to **{env.upper()}**.",
+             "wrap": True},
+            {"type": "FactSet", "facts": [
+                {"title": "App", "value": app},
+                {"title": "Build", "value": f"#{build}"},
+                {"title": "Environment", "value": env.upper()},
+                {"title": "Requested by", "value": requested_by},
+                {"title": "Action", "value": action_label},
+            ]},
+            {"type": "TextBlock", "text": "⏱️ This request will expire in 30 minutes.", "wrap": True,
+             "isSubtle": True},
+        ],
+        actions=[
+            {"type": "Action.Submit", "title": "✅ Approve", "style": "positive",
+             "data": {"action": "approve", "approval_id": approval_id}},
+            {"type": "Action.Submit", "title": "❌ Reject", "style": "destructive",
+             "data": {"action": "reject", "approval_id": approval_id}},
+        ],
+    )
+
+
+def legacy_error_card(message):
+    return _make_card([
+        {"type": "TextBlock", "text": "❌ Error", "weight": "Bolder", "color": "Attention"},
+        {"type": "TextBlock", "text": message, "wrap": True},
+        {"type": "TextBlock", "text": "Type `help` to see all available commands.", "wrap": True, "isSubtle": True},
+    ])
+
+
+# ─────────────────────────────────────────────────────────────
+# Cases: name → (legacy call, current call)
+# ─────────────────────────────────────────────────────────────
+CASES = {
+    "help": (
+        legacy_help_card,
+        cards.help_card,
+    ),
+    "build_triggered": (
+        lambda: legacy_build_triggered_card("myapp", "main", "Alice"),
+        lambda: cards.build_triggered_card("myapp", "main", "Alice"),
+    ),
+    "deploy_triggered": (
+        lambda: legacy_deploy_triggered_card("myapp", "42", "qa", "Alice"),
+        lambda: cards.deploy_triggered_card("myapp", "42", "qa", "Alice"),
+    ),
+    "approval_request": (
+        lambda: legacy_approval_request_card("a1b2", "myapp", "42", "prod", "Alice"),
+        lambda: cards.approval_request_card("a1b2", "myapp", "42", "prod", "Alice"),
+    ),
+    "error": (
+        lambda: legacy_error_card("Invalid environment `staging`. Choose from: qa, uat, prod"),
+        lambda: cards.error_card("Invalid environment `staging`. Choose from: qa, uat, prod"),
+    ),
+}
+
+
+def _rate(fn, n: int) -> float:
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        return n / (time.perf_counter() - start)
+    finally:
+        gc.enable()
+
+
+def _bytes_per_call(fn, n: int) -> float:
+    keep = [None] * n                    # Pre-sized so the list itself is not counted
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(n):
+            keep[i] = fn()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) / n
+
+
+def run(n: int = 20000, alloc_n: int = 2000, repeat: int = 5) -> dict:
+    results = {}
+    for name, (legacy, current) in CASES.items():
+        # Alternate the two so clock drift hits both alike; keep the best of each
+        legacy_rate = current_rate = 0.0
+        for _ in range(repeat):
+            legacy_rate = max(legacy_rate, _rate(legacy, n))
+            current_rate = max(current_rate, _rate(current, n))
+        results[name] = {
+            "legacy":    {"cards_per_s": legacy_rate,  "bytes_per_card": _bytes_per_call(legacy, alloc_n)},
+            "current":   {"cards_per_s": current_rate, "bytes_per_card": _bytes_per_call(current, alloc_n)},
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("-n", type=int, default=20000, help="renders per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per card; the best is reported")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.n, repeat=args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'card':<18} {'legacy cards/s':>15} {'current cards/s':>16} {'speedup':>8}"
+          f" {'legacy B/card':>14} {'current B/card':>15}")
+    for name, r in results.items():
+        legacy, current = r["legacy"], r["current"]
+        print(f"{name:<18} {legacy['cards_per_s']:>15,.0f} {current['cards_per_s']:>16,.0f}"
+              f" {current['cards_per_s'] / legacy['cards_per_s']:>7.1f}x"
+              f" {legacy['bytes_per_card']:>14,.0f} {current['bytes_per_card']:>15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
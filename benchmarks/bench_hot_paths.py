@@ -0,0 +1,324 @@
+"""
+benchmarks/bench_hot_paths.py
+Microbenchmark suite for the bot's hot paths, run with benchmarks/perf.py:
+
+  parser/*     parse_command / parse_commands on each kind of input, and a
+               pass over the Teams message corpus
+  cards/*      every builder in bot/cards.py
+  codec/*      request JSON parsing and activity decoding for /api/messages,
+               fast path and stdlib / full deserialization
+  audit/*      AuditLogger.log / get_history against audit logs of 10k, 1M
+               and 10M rows (an app with recent activity, and one whose last
+               actions are at the very start of the log)
+  approvals/*  ApprovalManager.create / handle_response with 100k approvals
+               already pending
+
+Audit databases are generated once into $TMPDIR/deploybot-bench and reused.
+The 10M-row log takes a few minutes to build and ~1.5 GB of disk.
+
+Usage:
+    python benchmarks/bench_hot_paths.py                         # everything
+    python benchmarks/bench_hot_paths.py -k parser -k cards      # name filters (substring or glob)
+    python benchmarks/bench_hot_paths.py --rows 10k,1M --out results.json
+    python benchmarks/bench_hot_paths.py --save-baseline         # → benchmarks/baselines/baseline.json
+    python benchmarks/compare.py benchmarks/baselines/baseline.json results.json
+
+Timings only compare against a baseline saved on the same machine, so
+benchmarks/baselines/ is local and not committed: save one before a change,
+then compare after it.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_messages import teams_message
+from benchmarks.perf import Suite, run_suite
+from bot import cards
+from bot.command_parser import parse_command, parse_commands
+from codec import fastjson
+from codec.activity import decode_activity
+from config.settings import settings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(HERE, "data", "teams_messages.txt")
+BASELINE_DIR = os.path.join(HERE, "baselines")
+DATA_DIR = os.path.join(tempfile.gettempdir(), "deploybot-bench")
+
+ROW_COUNTS = {"10k": 10_000, "1M": 1_000_000, "10M": 10_000_000}
+PENDING_APPROVALS = 100_000
+APPROVAL_LOOPS = 2_000            # handle_response consumes one approval per call
+
+suite = Suite()
+
+
+# ─────────────────────────────────────────────────────────────
+# Parser
+# ─────────────────────────────────────────────────────────────
+PARSER_INPUTS = {
+    "build": "build payments-api main",
+    "deploy": "deploy payments-api 42 qa",
+    "status": "status payments-api",
+    "promote": "promote payments-api 42 qa>uat>prod",
+    "mention": "<at>DeployBot</at> deploy payments-api 42 uat",
+    "invalid_env": "deploy payments-api 42 staging",
+    "usage_error": "deploy payments-api",
+    "unknown": "shipit payments-api",
+    "empty": "   ",
+}
+
+for _kind, _text in PARSER_INPUTS.items():
+    suite.add(f"parser/parse_command[{_kind}]", lambda text=_text: lambda: parse_command(text))
+
+suite.add("parser/parse_commands[batch3]",
+          lambda: lambda: parse_commands("build api main; build web main\ndeploy worker 17 qa"))
+
+
+@suite.bench("parser/corpus")
+def _parser_corpus():
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        messages = [line.rstrip("\n") for line in f if line.strip()]
+    return lambda: [parse_command(m) for m in messages]
+
+
+# ─────────────────────────────────────────────────────────────
+# Cards
+# ─────────────────────────────────────────────────────────────
+STATUS_DATA = {
+    "Environments-1": {"release": "Releases-42", "state": "Success", "created": "2024-01-01T00:00:00Z"},
+    "Environments-2": {"release": "Releases-41", "state": "Executing", "created": "2024-01-01T00:00:00Z"},
+    "Environments-3": {"release": "Releases-40", "state": "Failed", "created": "2024-01-01T00:00:00Z"},
+}
+
+suite.add("cards/help_card", lambda: cards.help_card)
+suite.add("cards/build_triggered_card", lambda: lambda: cards.build_triggered_card("payments-api", "main", "Ana"))
+suite.add("cards/deploy_triggered_card", lambda: lambda: cards.deploy_triggered_card("payments-api", "42", "qa", "Ana"))
+suite.add("cards/approval_request_card",
+          lambda: lambda: cards.approval_request_card("5f0c", "payments-api", "42", "prod", "Ana"))
+suite.add("cards/status_card", lambda: lambda: cards.status_card("payments-api", STATUS_DATA))
+suite.add("cards/error_card", lambda: lambda: cards.error_card("Invalid environment `staging`."))
+
+OPERATION_STATES = {
+    "building": cards.OperationCard(kind="build", app="payments-api", user="Ana", stage="building", branch="main"),
+    "awaiting_approval": cards.OperationCard(kind="deploy", app="payments-api", user="Ana", stage="awaiting_approval",
+                                             build="42", env="prod", approval_id="5f0c"),
+    "deployed": cards.OperationCard(kind="deploy", app="payments-api", user="Ana", stage="deployed", build="42",
+                                    env="prod", approver="Ben", detail="https://octopus/app#/deployments/1"),
+    "rollback_failed": cards.OperationCard(kind="rollback", app="payments-api", user="Ana", stage="deploy_failed",
+                                           build="previous", env="uat", approver="Ben", detail="Octopus API error"),
+}
+for _stage, _state in OPERATION_STATES.items():
+    suite.add(f"cards/OperationCard.render[{_stage}]", lambda state=_state: state.render)
+
+suite.add("cards/BatchCard.render[10]", lambda: cards.BatchCard(
+    user="Ana", rows=[cards.BatchRow(f"build app-{i} main", "✅ Build succeeded") for i in range(10)]).render)
+suite.add("cards/PromotionCard.render[3]", lambda: cards.PromotionCard(
+    app="payments-api", build="42", user="Ana",
+    rows=[cards.BatchRow(env, "⏳ Waiting") for env in ("QA", "UAT", "PROD")]).render)
+suite.add("cards/deploy_outcome", lambda: lambda: cards.deploy_outcome(
+    {"status": "triggered", "deployment_id": "Deployments-1", "url": "https://octopus/app#/deployments/1"}))
+
+
+# ─────────────────────────────────────────────────────────────
+# Codec
+# ─────────────────────────────────────────────────────────────
+TEAMS_BODY = json.dumps(teams_message(0, "https://smba.trafficmanager.net/emea/")).encode()
+
+
+def _with_codec(fast: bool, fn):
+    def run():
+        previous, settings.FAST_CODEC = settings.FAST_CODEC, fast
+        try:
+            return fn()
+        finally:
+            settings.FAST_CODEC = previous
+    return run
+
+
+for _mode, _fast in (("fast", True), ("stdlib", False)):
+    suite.add(f"codec/loads[{_mode}]", lambda fast=_fast: _with_codec(fast, lambda: fastjson.loads(TEAMS_BODY)))
+    suite.add(f"codec/dumps[{_mode}]",
+              lambda fast=_fast: _with_codec(fast, lambda: fastjson.dumps(cards.help_card().content)))
+
+_BODY = json.loads(TEAMS_BODY)
+suite.add("codec/decode_activity[lean]", lambda: _with_codec(True, lambda: decode_activity(_BODY)))
+suite.add("codec/decode_activity[full]", lambda: _with_codec(False, lambda: decode_activity(_BODY)))
+
+
+# ─────────────────────────────────────────────────────────────
+# Audit log
+# ─────────────────────────────────────────────────────────────
+APPS = 200
+RARE_APP = "legacy-batch"         # Only active at the very start of the log
+
+
+async def _audit_db(rows: int) -> str:
+    """Path of an audit database with at least `rows` records, building it if needed."""
+    from audit.logger import AuditLogger
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"audit-{rows}.db")
+    if os.path.exists(path):
+        with sqlite3.connect(path) as db:
+            if (db.execute("SELECT max(id) FROM audit_log").fetchone()[0] or 0) >= rows:
+                return path
+        os.remove(path)
+
+    print(f"[BENCH] Building {path} ({rows:,} rows)...", file=sys.stderr)
+    started = time.perf_counter()
+    with sqlite3.connect(path) as db:
+        AuditLogger._ensure_table(db)   # The bot's own schema and indexes
+
+    details = json.dumps({"build": "42", "env": "qa"})
+    result = json.dumps({"status": "triggered", "deployment_id": "Deployments-1"})
+
+    def records():
+        for i in range(rows):
+            app = RARE_APP if i < 10 else f"app-{i % APPS}"
+            yield ("2024-01-01T00:00:00", f"user-{i % 50}", "deploy", app, details, result)
+
+    with sqlite3.connect(path) as db:
+        db.execute("PRAGMA journal_mode = OFF")
+        db.execute("PRAGMA synchronous = OFF")
+        db.executemany("INSERT INTO audit_log (timestamp, user, action, app, details, result) "
+                       "VALUES (?, ?, ?, ?, ?, ?)", records())
+    print(f"[BENCH] Built in {time.perf_counter() - started:.0f}s", file=sys.stderr)
+    return path
+
+
+async def _audit_logger(rows: int):
+    import audit.logger
+    audit.logger.DB_PATH = await _audit_db(rows)
+    return audit.logger.AuditLogger()
+
+
+def add_audit_benchmarks(sizes: list[str]):
+    for size in sizes:
+        rows = ROW_COUNTS[size]
+
+        async def log(rows=rows):
+            logger = await _audit_logger(rows)
+
+            async def write():
+                await logger.log(user="Ana", action="deploy", app="app-7",
+                                 details={"build": "42", "env": "qa"}, result={"status": "triggered"})
+            return write
+
+        async def history(rows=rows, app="app-7"):
+            logger = await _audit_logger(rows)
+
+            async def read():
+                await logger.get_history(app=app, limit=10)
+            return read
+
+        suite.add(f"audit/log[{size}]", log)
+        suite.add(f"audit/get_history[{size}]", history)
+        suite.add(f"audit/get_history_rare_app[{size}]", lambda rows=rows: history(rows, RARE_APP))
+
+
+# ─────────────────────────────────────────────────────────────
+# Approvals
+# ─────────────────────────────────────────────────────────────
+class _Sent:
+    id = "activity-1"
+
+
+class _Outbound:
+    """Accepts every card straight away, so only the manager's own work is timed."""
+
+    async def send(self, turn_context, activity):
+        return _Sent
+
+    async def update(self, turn_context, activity_id, activity):
+        return _Sent
+
+
+class _Deploys:
+    async def deploy(self, **kwargs):
+        return {"status": "triggered", "deployment_id": "Deployments-1", "url": ""}
+
+    async def rollback(self, **kwargs):
+        return {"status": "triggered", "rollback_to": "1.0.41", "deployment_id": "Deployments-2"}
+
+
+async def _approval_manager(extra: int):
+    """An ApprovalManager with PENDING_APPROVALS approvals waiting, plus `extra` ids to consume."""
+    from approval.manager import ApprovalManager
+    from config.settings import settings
+    import audit.logger
+
+    settings.CARD_UPDATE_DEBOUNCE_SECONDS = 0
+    audit.logger.DB_PATH = os.path.join(DATA_DIR, "approvals-audit.db")
+    os.makedirs(DATA_DIR, exist_ok=True)
+    manager = ApprovalManager(outbound=_Outbound(), deploys=_Deploys())
+    ids = []
+    for i in range(PENDING_APPROVALS + extra):
+        ids.append(await manager.create(app=f"app-{i % APPS}", build_number=str(i), environment="prod",
+                                        requested_by="Ana", turn_context=None))
+    return manager, ids
+
+
+@suite.bench("approvals/create[100k pending]")
+async def _approvals_create():
+    manager, _ = await _approval_manager(0)
+
+    async def create():
+        await manager.create(app="payments-api", build_number="42", environment="prod",
+                             requested_by="Ana", turn_context=None)
+    return create
+
+
+@suite.bench("approvals/handle_response[reject,100k pending]", loops=APPROVAL_LOOPS)
+async def _approvals_reject():
+    manager, ids = await _approval_manager(APPROVAL_LOOPS * 7)
+
+    async def reject():
+        await manager.handle_response(ids.pop(), approved=False, approver="Ben", turn_context=None)
+    return reject
+
+
+@suite.bench("approvals/handle_response[approve,100k pending]", loops=APPROVAL_LOOPS)
+async def _approvals_approve():
+    manager, ids = await _approval_manager(APPROVAL_LOOPS * 7)
+
+    async def approve():
+        await manager.handle_response(ids.pop(), approved=True, approver="Ben", turn_context=None)
+    return approve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="patterns", action="append", default=[], help="run benchmarks matching this")
+    parser.add_argument("--rows", default="10k,1M,10M", help="audit log sizes, from " + ",".join(ROW_COUNTS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per sample")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--save-baseline", nargs="?", const="baseline", metavar="NAME",
+                        help="write results to benchmarks/baselines/NAME.json")
+    args = parser.parse_args()
+
+    add_audit_benchmarks([size for size in args.rows.split(",") if size])
+    results = run_suite(suite, patterns=args.patterns, repeat=args.repeat, min_time=args.min_time,
+                        progress=lambda line: print(line, file=sys.stderr))
+
+    paths = [args.out] if args.out else []
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        paths.append(os.path.join(BASELINE_DIR, f"{args.save_baseline}.json"))
+    for path in paths:
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Saved {path}", file=sys.stderr)
+    if not paths:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
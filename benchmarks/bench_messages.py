@@ -0,0 +1,246 @@
+"""
+benchmarks/bench_messages.py
+Requests per second per CPU core on /api/messages, with FAST_CODEC on and off.
+
+For each setting the bot runs in its own process (create_app(), auth
+disabled) with its replies going to a FakeConnector (loadtest/fakes.py) in
+this one. A realistic Teams "help" message — mention entities, timestamps,
+channelData and all — is posted --count times, --concurrency at a time, and
+the run ends once every reply has reached the connector. The bot process's
+own CPU time over the run gives:
+
+  rps_per_core   requests handled per CPU-second of the bot process
+  cpu_us         CPU time per request, including the reply it sends
+  wall_rps       requests per second of wall time (depends on this machine's
+                 cores, since the load generator shares them)
+
+Each setting is run --repeat times and the median is reported.
+
+Usage:
+    python benchmarks/bench_messages.py
+    python benchmarks/bench_messages.py --count 5000 --concurrency 32 --out codec.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from loadtest.fakes import FakeConnector
+
+MODES = {"fast": "true", "stdlib": "false"}
+
+
+def teams_message(index: int, service_url: str) -> dict:
+    """A message as Teams actually sends it, not just the fields the bot reads."""
+    return {
+        "text": "<at>DeployBot</at> help",
+        "textFormat": "plain",
+        "type": "message",
+        "timestamp": "2024-05-01T10:00:00.1234567Z",
+        "localTimestamp": "2024-05-01T12:00:00.1234567+02:00",
+        "id": f"bench-{index}",
+        "channelId": "msteams",
+        "serviceUrl": service_url,
+        "from": {"id": f"29:bench-user-{index % 25}", "name": "Bench User", "aadObjectId": "00000000-0000-0000-0000-000000000001"},
+        "conversation": {"conversationType": "channel", "tenantId": "00000000-0000-0000-0000-0000000000aa",
+                         "id": f"19:bench-{index}@thread.tacv2;messageid=1714557600123", "isGroup": True},
+        "recipient": {"id": "28:deploybot", "name": "DeployBot"},
+        "entities": [
+            {"mentioned": {"id": "28:deploybot", "name": "DeployBot"}, "text": "<at>DeployBot</at>", "type": "mention"},
+            {"locale": "en-US", "country": "US", "platform": "Web", "timezone": "Europe/Madrid", "type": "clientInfo"},
+        ],
+        "channelData": {
+            "teamsChannelId": "19:bench@thread.tacv2",
+            "teamsTeamId": "19:bench-team@thread.tacv2",
+            "channel": {"id": "19:bench@thread.tacv2"},
+            "team": {"id": "19:bench-team@thread.tacv2"},
+            "tenant": {"id": "00000000-0000-0000-0000-0000000000aa"},
+        },
+        "locale": "en-US",
+        "localTimezone": "Europe/Madrid",
+    }
+
+
+# ─────────────────────────────────────────────────────────────
+# Bot process
+# ─────────────────────────────────────────────────────────────
+async def serve():
+    """Run the bot on a free port. Protocol on stdout: the port, then CPU seconds per "cpu" line on stdin."""
+    from config.settings import settings
+    settings.APP_ID = settings.APP_PASSWORD = ""
+
+    import audit.logger
+    workdir = tempfile.mkdtemp(prefix="deploybot-bench-")
+    audit.logger.DB_PATH = os.path.join(workdir, "audit.db")
+    settings.CHECKPOINT_PATH = os.path.join(workdir, "checkpoint.db")
+
+    import app as bot_app
+    runner = web.AppRunner(bot_app.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    out = sys.__stdout__
+    out.write(f"{runner.addresses[0][1]}\n")
+    out.flush()
+
+    loop = asyncio.get_running_loop()
+    while await loop.run_in_executor(None, sys.stdin.readline):
+        out.write(f"{time.process_time()}\n")
+        out.flush()
+    await runner.cleanup()
+
+
+class BotProcess:
+
+    def __init__(self, fast_codec: str):
+        self.env = {**os.environ, "FAST_CODEC": fast_codec}
+
+    async def __aenter__(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "--serve", cwd=ROOT, env=self.env,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
+        self.url = f"http://127.0.0.1:{int(await self.proc.stdout.readline())}"
+        return self
+
+    async def cpu(self) -> float:
+        self.proc.stdin.write(b"cpu\n")
+        await self.proc.stdin.drain()
+        return float(await self.proc.stdout.readline())
+
+    async def __aexit__(self, *exc):
+        self.proc.stdin.close()
+        try:
+            await asyncio.wait_for(self.proc.wait(), 10)
+        except asyncio.TimeoutError:
+            self.proc.kill()
+            await self.proc.wait()
+
+
+# ─────────────────────────────────────────────────────────────
+# Load
+# ─────────────────────────────────────────────────────────────
+async def wait_ready(session: aiohttp.ClientSession, url: str, timeout: float = 30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        with contextlib.suppress(aiohttp.ClientError):
+            async with session.get(f"{url}/health", params={"ready": "1"}) as resp:
+                if resp.status == 200:
+                    return
+        await asyncio.sleep(0.05)
+    raise SystemExit(f"Bot at {url} did not become ready")
+
+
+async def post_all(session: aiohttp.ClientSession, url: str, bodies: list[bytes], concurrency: int) -> int:
+    """Post every body, `concurrency` at a time. Returns how many were not answered 2xx."""
+    failed = 0
+    pending = iter(bodies)
+    headers = {"Content-Type": "application/json"}
+
+    async def worker():
+        nonlocal failed
+        for body in pending:
+            async with session.post(f"{url}/api/messages", data=body, headers=headers) as resp:
+                await resp.read()
+                failed += resp.status >= 300
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return failed
+
+
+async def wait_replies(connector: FakeConnector, expected: int, timeout: float = 60):
+    deadline = time.perf_counter() + timeout
+    while len(connector.first_reply) < expected:
+        if time.perf_counter() > deadline:
+            raise SystemExit(f"Only {len(connector.first_reply)} of {expected} replies arrived")
+        await asyncio.sleep(0.005)
+
+
+async def measure(mode: str, connector: FakeConnector, args, offset: int) -> dict:
+    async with BotProcess(MODES[mode]) as bot, aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=0)) as session:
+        await wait_ready(session, bot.url)
+
+        def bodies(start: int, count: int) -> list[bytes]:
+            return [json.dumps(teams_message(start + i, connector.url)).encode() for i in range(count)]
+
+        warm = bodies(offset, args.warmup)
+        await post_all(session, bot.url, warm, args.concurrency)
+        await wait_replies(connector, offset + args.warmup)
+
+        timed = bodies(offset + args.warmup, args.count)
+        cpu, started = await bot.cpu(), time.perf_counter()
+        failed = await post_all(session, bot.url, timed, args.concurrency)
+        await wait_replies(connector, offset + args.warmup + args.count)
+        cpu, elapsed = await bot.cpu() - cpu, time.perf_counter() - started
+
+    return {
+        "rps_per_core": args.count / cpu,
+        "cpu_us": cpu / args.count * 1e6,
+        "wall_rps": args.count / elapsed,
+        "failed": failed,
+    }
+
+
+async def run(args) -> dict:
+    connector = FakeConnector()
+    await connector.start()
+    runs = {mode: [] for mode in MODES}
+    sent = 0
+    try:
+        for _ in range(args.repeat):
+            for mode in MODES:   # Interleaved, so drift on the machine hits both settings alike
+                runs[mode].append(await measure(mode, connector, args, sent))
+                sent += args.warmup + args.count
+                print(f"[BENCH] {mode:<6} {runs[mode][-1]['rps_per_core']:>8.0f} req/CPU-s", file=sys.stderr)
+    finally:
+        await connector.stop()
+
+    results = {}
+    for mode, samples in runs.items():
+        results[mode] = {key: round(statistics.median(s[key] for s in samples), 1)
+                         for key in ("rps_per_core", "cpu_us", "wall_rps")}
+        results[mode]["failed"] = sum(s["failed"] for s in samples)
+    results["speedup"] = round(results["fast"]["rps_per_core"] / results["stdlib"]["rps_per_core"], 2)
+    return {
+        "config": {"count": args.count, "concurrency": args.concurrency, "repeat": args.repeat},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000, help="timed requests per run")
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        with open(os.devnull, "w") as log, contextlib.redirect_stdout(log):
+            asyncio.run(serve())
+        return
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+benchmarks/bench_parser.py
+Microbenchmark: registry-driven command parser (bot/command_parser.py) vs
+the previous if-chain parser, over a corpus of Teams message texts.
+
+Reports messages parsed per second for each parser over the whole corpus
+(benchmarks/data/teams_messages.txt), and checks both parsers agree on
+every message first.
+
+Usage:
+    python benchmarks/bench_parser.py                # table
+    python benchmarks/bench_parser.py --json         # machine-readable
+    python benchmarks/bench_parser.py -n 200000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.command_parser import ParsedCommand, parse_command
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "teams_messages.txt")
+
+
+# ─────────────────────────────────────────────────────────────
+# Reference: the if-chain parser command_parser.py used before the registry
+# ─────────────────────────────────────────────────────────────
+LEGACY_ENVS = {"qa", "uat", "prod"}
+LEGACY_ACTIONS = {"build", "deploy", "status", "rollback", "history", "help"}
+
+
+def legacy_parse_command(message: str) -> ParsedCommand:
+    text = message.strip()
+    if "<at>" in text:
+        import re
+        text = re.sub(r"<at>[^<]*</at>", "", text).strip()
+    raw = text
+    parts = text.lower().split()
+    if not parts:
+        return ParsedCommand(action="help", raw=raw)
+    action = parts[0]
+    if action not in LEGACY_ACTIONS:
+        return ParsedCommand(action="unknown", raw=raw,
+                             error=f"Unknown command `{action}`. Type `help` to see available commands.")
+    if action == "help":
+        return ParsedCommand(action="help", raw=raw)
+    if action == "build":
+        if len(parts) < 3:
+            return ParsedCommand(action="build", raw=raw, error="usage")
+        return ParsedCommand(action="build", app=parts[1], branch=parts[2], raw=raw)
+    if action == "deploy":
+        if len(parts) < 4:
+            return ParsedCommand(action="deploy", raw=raw, error="usage")
+        env = parts[3]
+        if env not in LEGACY_ENVS:
+            return ParsedCommand(action="deploy", raw=raw, error="env")
+        return ParsedCommand(action="deploy", app=parts[1], build_number=parts[2], environment=env, raw=raw)
+    if action == "status":
+        if len(parts) < 2:
+            return ParsedCommand(action="status", raw=raw, error="usage")
+        return ParsedCommand(action="status", app=parts[1], raw=raw)
+    if action == "rollback":
+        if len(parts) < 3:
+            return ParsedCommand(action="rollback", raw=raw, error="usage")
+        env = parts[2]
+        if env not in LEGACY_ENVS:
+            return ParsedCommand(action="rollback", raw=raw, error="env")
+        return ParsedCommand(action="rollback", app=parts[1], environment=env, raw=raw)
+    if action == "history":
+        if len(parts) < 2:
+            return ParsedCommand(action="history", raw=raw, error="usage")
+        return ParsedCommand(action="history", app=parts[1], raw=raw)
+    return ParsedCommand(action="unknown", raw=raw, error="Could not parse command.")
+
+
+def load_corpus(path: str = CORPUS_PATH) -> list[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if not line.startswith("#")]
+
+
+def _same(a: ParsedCommand, b: ParsedCommand) -> bool:
+    """Equal apart from the wording of error messages."""
+    return (a.action, a.app, a.branch, a.build_number, a.environment, a.raw, bool(a.error)) == \
+           (b.action, b.app, b.branch, b.build_number, b.environment, b.raw, bool(b.error))
+
+
+def _rate(parse, corpus: list[str], n: int) -> float:
+    rounds = max(1, n // len(corpus))
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for message in corpus:
+                parse(message)
+        return rounds * len(corpus) / (time.perf_counter() - start)
+    finally:
+        gc.enable()
+
+
+def run(n: int = 100000, corpus: list[str] = None) -> dict:
+    corpus = corpus or load_corpus()
+    mismatches = [m for m in corpus if not _same(legacy_parse_command(m), parse_command(m))]
+    if mismatches:
+        raise SystemExit(f"Parsers disagree on: {mismatches}")
+    return {
+        "corpus_size": len(corpus),
+        "legacy":   {"msgs_per_s": _rate(legacy_parse_command, corpus, n)},
+        "registry": {"msgs_per_s": _rate(parse_command, corpus, n)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("-n", type=int, default=100000, help="messages parsed per timing run")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.n)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    legacy, registry = results["legacy"]["msgs_per_s"], results["registry"]["msgs_per_s"]
+    print(f"corpus: {results['corpus_size']} messages")
+    print(f"{'parser':<10} {'msgs/s':>12}")
+    print(f"{'legacy':<10} {legacy:>12,.0f}")
+    print(f"{'registry':<10} {registry:>12,.0f}   ({registry / legacy:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+benchmarks/bench_workers.py
+Throughput of /api/messages as the number of worker processes grows.
+
+For each worker count the bot is started the way production starts it —
+app.serve(port, workers): forked workers sharing the port through SO_REUSEPORT
+and their state through a fresh STATE_DB_PATH — with auth disabled and its
+replies going to a FakeConnector (loadtest/fakes.py) in this process. Once
+every worker answers /health?ready=1, a realistic Teams "help" message is
+posted --count times over --concurrency connections, and the run ends when
+every reply has reached the connector.
+
+  wall_rps   requests per second, from the first post to the last reply
+  p50_ms     /api/messages response time (p99_ms likewise)
+  spread     share of the requests each worker handled, from its /metrics
+  speedup    wall_rps relative to the 1-worker run
+
+The load generator runs on the same machine, so scaling stops at the cores
+left over for the workers: `cores` in the report says how many there were.
+Each worker count is run --repeat times and the median is reported.
+
+Usage:
+    python benchmarks/bench_workers.py
+    python benchmarks/bench_workers.py --workers 1,2,4,8 --count 5000 --out workers.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import re
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_messages import teams_message, wait_replies
+from loadtest.fakes import FakeConnector
+
+COMMANDS_HANDLED = re.compile(r'^deploybot_command_seconds_count\{command="help"\} (\S+)$', re.MULTILINE)
+
+
+# ─────────────────────────────────────────────────────────────
+# Bot processes
+# ─────────────────────────────────────────────────────────────
+def serve(port: int, workers: int):
+    """Run app.serve() on `port` with auth off and state, audit log and idempotency keys in a scratch directory."""
+    from config.settings import settings
+    workdir = tempfile.mkdtemp(prefix="deploybot-bench-")
+    settings.APP_ID = settings.APP_PASSWORD = ""
+    settings.STATE_DB_PATH = os.path.join(workdir, "state.db")
+
+    import audit.logger
+    audit.logger.DB_PATH = os.path.join(workdir, "audit.db")
+
+    import app as bot_app
+    bot_app.serve(port, workers)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BotWorkers:
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+
+    async def __aenter__(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "--serve", str(self.port), str(self.workers),
+            cwd=ROOT, stdout=asyncio.subprocess.DEVNULL)
+        return self
+
+    async def wait_ready(self, timeout: float = 60) -> set[str]:
+        """Wait until every worker answers /health?ready=1; returns their IDs."""
+        seen = set()
+        deadline = time.perf_counter() + timeout
+        while len(seen) < self.workers:
+            if time.perf_counter() > deadline:
+                raise SystemExit(f"Only {len(seen)} of {self.workers} workers became ready")
+            # A new connection each time, so the kernel can hand it to any worker
+            with contextlib.suppress(aiohttp.ClientError):
+                async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(force_close=True)) as session:
+                    async with session.get(f"{self.url}/health", params={"ready": "1"}) as resp:
+                        if resp.status == 200:
+                            seen.add((await resp.json())["worker"])
+            await asyncio.sleep(0.02)
+        return seen
+
+    async def handled_per_worker(self) -> list[float]:
+        """`help` commands handled by each worker, read from every worker's /metrics."""
+        handled = {}
+        for _ in range(self.workers * 20):
+            if len(handled) == self.workers:
+                break
+            async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=1)) as session:
+                async with session.get(f"{self.url}/health") as resp:
+                    worker = (await resp.json())["worker"]
+                async with session.get(f"{self.url}/metrics") as resp:
+                    match = COMMANDS_HANDLED.search(await resp.text())
+            # Both requests went over one kept-alive connection, so to the same worker
+            handled[worker] = float(match.group(1)) if match else 0.0
+        return sorted(handled.values(), reverse=True)
+
+    async def __aexit__(self, *exc):
+        self.proc.terminate()
+        try:
+            await asyncio.wait_for(self.proc.wait(), 30)
+        except asyncio.TimeoutError:
+            self.proc.kill()
+            await self.proc.wait()
+
+
+# ─────────────────────────────────────────────────────────────
+# Load
+# ─────────────────────────────────────────────────────────────
+async def post_all(url: str, bodies: list[bytes], concurrency: int) -> tuple[list[float], int]:
+    """Post every body over `concurrency` connections. Returns response times (s) and non-2xx count."""
+    latencies, failed = [], 0
+    pending = iter(bodies)
+    headers = {"Content-Type": "application/json"}
+
+    async def client():
+        nonlocal failed
+        # One session (and so one kept-alive connection, pinned to one worker) per client
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=1)) as session:
+            for body in pending:
+                started = time.perf_counter()
+                async with session.post(f"{url}/api/messages", data=body, headers=headers) as resp:
+                    await resp.read()
+                latencies.append(time.perf_counter() - started)
+                failed += resp.status >= 300
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, failed
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def measure(workers: int, connector: FakeConnector, args, offset: int) -> dict:
+    async with BotWorkers(workers) as bot:
+        await bot.wait_ready()
+
+        def bodies(start: int, count: int) -> list[bytes]:
+            return [json.dumps(teams_message(start + i, connector.url)).encode() for i in range(count)]
+
+        await post_all(bot.url, bodies(offset, args.warmup), args.concurrency)
+        await wait_replies(connector, offset + args.warmup)
+
+        timed = bodies(offset + args.warmup, args.count)
+        cpu, started = time.process_time(), time.perf_counter()
+        latencies, failed = await post_all(bot.url, timed, args.concurrency)
+        await wait_replies(connector, offset + args.warmup + args.count)
+        elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu
+        handled = await bot.handled_per_worker()
+
+    return {
+        "wall_rps": args.count / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "loadgen_cpu_share": cpu / elapsed,
+        "spread": [round(n / sum(handled), 2) for n in handled] if sum(handled) else [],
+        "failed": failed,
+    }
+
+
+async def run(args) -> dict:
+    counts = [int(n) for n in args.workers.split(",")]
+    connector = FakeConnector()
+    await connector.start()
+    runs = {n: [] for n in counts}
+    sent = 0
+    try:
+        for _ in range(args.repeat):
+            for n in counts:   # Interleaved, so drift on the machine hits every worker count alike
+                runs[n].append(await measure(n, connector, args, sent))
+                sent += args.warmup + args.count
+                print(f"[BENCH] {n:>2} workers {runs[n][-1]['wall_rps']:>8.0f} req/s", file=sys.stderr)
+    finally:
+        await connector.stop()
+
+    results = {}
+    for n, samples in runs.items():
+        results[n] = {key: round(statistics.median(s[key] for s in samples), 2)
+                      for key in ("wall_rps", "p50_ms", "p99_ms", "loadgen_cpu_share")}
+        results[n]["spread"] = samples[-1]["spread"]
+        results[n]["failed"] = sum(s["failed"] for s in samples)
+    base = results[counts[0]]["wall_rps"]
+    for n in counts:
+        results[n]["speedup"] = round(results[n]["wall_rps"] / base, 2)
+    return {
+        "config": {"count": args.count, "concurrency": args.concurrency, "repeat": args.repeat,
+                   "cores": os.cpu_count()},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    default_workers = ",".join(str(n) for n in (1, 2, 4, 8) if n == 1 or n <= (os.cpu_count() or 1))
+    parser.add_argument("--workers", default=default_workers, help=f"worker counts to compare (default {default_workers})")
+    parser.add_argument("--count", type=int, default=3000, help="timed requests per run")
+    parser.add_argument("--warmup", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=64, help="client connections")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--serve", nargs=2, type=int, metavar=("PORT", "WORKERS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(*args.serve)
+        return
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+benchmarks/compare.py
+Compare two benchmark result files from bench_hot_paths.py and flag regressions.
+
+A benchmark regresses when its mean time grew by more than --threshold
+(a fraction: 0.10 = 10% slower) and the growth is larger than the noise —
+the two runs' standard deviations combined. Exits 1 if anything regressed,
+so it can gate CI.
+
+Usage:
+    python benchmarks/compare.py benchmarks/baselines/baseline.json results.json
+    python benchmarks/compare.py baseline.json results.json --threshold 0.05 -k audit
+"""
+import argparse
+import fnmatch
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.perf import _format_ns
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict, threshold: float, patterns: list[str] = None) -> list[dict]:
+    """One row per benchmark in either file: name, base/current mean, change, verdict."""
+    base, cur = baseline["results"], current["results"]
+    rows = []
+    for name in sorted(set(base) | set(cur)):
+        if patterns and not any(fnmatch.fnmatch(name, p) or p in name for p in patterns):
+            continue
+        if name not in cur or name not in base:
+            rows.append({"name": name, "verdict": "missing" if name not in cur else "new",
+                         "base": base.get(name), "current": cur.get(name), "change": None})
+            continue
+        b, c = base[name], cur[name]
+        change = c["mean_ns"] / b["mean_ns"] - 1 if b["mean_ns"] else 0.0
+        noise = b["stdev_ns"] + c["stdev_ns"]
+        significant = abs(c["mean_ns"] - b["mean_ns"]) > noise
+        if change > threshold and significant:
+            verdict = "REGRESSION"
+        elif change < -threshold and significant:
+            verdict = "faster"
+        else:
+            verdict = ""
+        rows.append({"name": name, "verdict": verdict, "base": b, "current": c, "change": change})
+    return rows
+
+
+def render(rows: list[dict]) -> str:
+    width = max([len(r["name"]) for r in rows] + [9])
+    lines = [f"{'benchmark':<{width}}  {'baseline':>10}  {'current':>10}  {'change':>8}"]
+    for r in rows:
+        base = _format_ns(r["base"]["mean_ns"]) if r["base"] else "-"
+        cur = _format_ns(r["current"]["mean_ns"]) if r["current"] else "-"
+        change = f"{r['change']:+.1%}" if r["change"] is not None else ""
+        lines.append(f"{r['name']:<{width}}  {base:>10}  {cur:>10}  {change:>8}  {r['verdict']}".rstrip())
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown (fraction, default 0.10)")
+    parser.add_argument("-k", dest="patterns", action="append", default=[], help="only compare benchmarks matching this")
+    args = parser.parse_args()
+
+    baseline, current = load(args.baseline), load(args.current)
+    for label, data in (("baseline", baseline), ("current", current)):
+        meta = data.get("meta", {})
+        print(f"{label:<9} {meta.get('commit') or '?':<10} {meta.get('date', '')}  "
+              f"python {meta.get('python', '?')}  {meta.get('machine', '')}")
+    if baseline.get("meta", {}).get("machine") != current.get("meta", {}).get("machine"):
+        print("[BENCH] Results are from different machines — timings may not be comparable")
+    print()
+
+    rows = compare(baseline, current, args.threshold, args.patterns)
+    print(render(rows))
+
+    regressions = [r["name"] for r in rows if r["verdict"] == "REGRESSION"]
+    missing = [r["name"] for r in rows if r["verdict"] == "missing"]
+    print()
+    if missing:
+        print(f"{len(missing)} benchmark(s) missing from {args.current}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+benchmarks/perf.py
+A small pyperf-style runner for the hot-path suite (bench_hot_paths.py).
+
+Each benchmark is registered as a factory: it does the setup (build a
+fixture, fill a database) and returns the callable to time — sync or async,
+no arguments. The runner calibrates the number of loops per sample to take
+at least `min_time`, runs one warm-up sample and `repeat` timed ones, and
+reports per-call times in nanoseconds.
+
+Results are JSON, so they can be saved as baselines and diffed with
+benchmarks/compare.py.
+"""
+import asyncio
+import fnmatch
+import gc
+import inspect
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+
+@dataclass
+class Case:
+    name: str
+    factory: Callable            # () -> callable to time; may be async, may return a coroutine function
+    loops: Optional[int] = None  # Fixed loops per sample, for benchmarks that consume their fixture
+
+
+class Suite:
+
+    def __init__(self):
+        self.cases: list[Case] = []
+
+    def bench(self, name: str, loops: int = None):
+        """Decorator registering a benchmark factory under `name` (group/benchmark[param])."""
+        def register(factory):
+            self.cases.append(Case(name, factory, loops))
+            return factory
+        return register
+
+    def add(self, name: str, factory: Callable, loops: int = None):
+        self.cases.append(Case(name, factory, loops))
+
+    def select(self, patterns: list[str]) -> list[Case]:
+        if not patterns:
+            return list(self.cases)
+        return [c for c in self.cases if any(fnmatch.fnmatch(c.name, p) or p in c.name for p in patterns)]
+
+    async def run(self, patterns: list[str] = None, repeat: int = 5, min_time: float = 0.2,
+                  progress: Callable[[str], None] = None) -> dict:
+        results = {}
+        for case in self.select(patterns):
+            fn = case.factory()
+            if inspect.isawaitable(fn):
+                fn = await fn
+            loops = case.loops or await _calibrate(fn, min_time)
+            await _sample(fn, loops)   # Warm-up
+            samples = [await _sample(fn, loops) / loops for _ in range(repeat)]
+            results[case.name] = _summary(samples, loops)
+            if progress:
+                progress(f"{case.name:<55} {_format_ns(results[case.name]['mean_ns']):>10} "
+                         f"± {_format_ns(results[case.name]['stdev_ns'])}")
+        return {"meta": metadata(repeat=repeat, min_time=min_time), "results": results}
+
+
+async def _sample(fn: Callable, loops: int) -> float:
+    gc.collect()
+    if inspect.iscoroutinefunction(fn):
+        started = time.perf_counter()
+        for _ in range(loops):
+            await fn()
+        return time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(loops):
+        fn()
+    return time.perf_counter() - started
+
+
+async def _calibrate(fn: Callable, min_time: float) -> int:
+    loops = 1
+    while True:
+        elapsed = await _sample(fn, loops)
+        if elapsed >= min_time or loops >= 1 << 24:
+            return loops
+        # Jump close to the target instead of doubling all the way
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9) * 1.1))
+
+
+def _summary(samples: list[float], loops: int) -> dict:
+    return {
+        "mean_ns": statistics.fmean(samples) * 1e9,
+        "stdev_ns": (statistics.stdev(samples) if len(samples) > 1 else 0.0) * 1e9,
+        "min_ns": min(samples) * 1e9,
+        "loops": loops,
+        "repeat": len(samples),
+    }
+
+
+def _format_ns(ns: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f} {unit}"
+    return f"{ns:.0f} ns"
+
+
+def metadata(**extra) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "commit": commit,
+        **extra,
+    }
+
+
+def run_suite(suite: Suite, **kwargs) -> dict:
+    return asyncio.run(suite.run(**kwargs))
@@ -2,93 +2,112 @@
 bot/cards.py
 Adaptive Card builders for all bot responses.
 All cards return a botbuilder Attachment ready to send.
+
+The help card never changes, so it is built once and shared. The others are
+dict literals per call, with their fixed parts (hint lines, button styles)
+hoisted into module-level dicts that every card shares (see bot/templates.py).
 """
 from botbuilder.schema import Attachment
-import json
-
+from dataclasses import dataclass
+from typing import Optional
 
-def _make_card(body: list, actions: list = None) -> Attachment:
-    card = {
-        "type": "AdaptiveCard",
-        "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-        "version": "1.4",
-        "body": body,
-    }
-    if actions:
-        card["actions"] = actions
-    return Attachment(
-        content_type="application/vnd.microsoft.card.adaptive",
-        content=card,
-    )
+from bot.commands import COMMANDS
+from bot.templates import adaptive_card
 
 
 # ── Color helpers ─────────────────────────────────────────────
 ENV_COLORS = {"qa": "Good", "uat": "Warning", "prod": "Attention"}
 
+# ── Fixed card parts, shared by every card that shows them ────
+_BUILD_HINT = {"type": "TextBlock", "text": "I'll update you here when the build completes.",
+               "wrap": True, "isSubtle": True}
+_EXPIRY_NOTE = {"type": "TextBlock", "text": "⏱️ This request will expire in 30 minutes.",
+                "wrap": True, "isSubtle": True}
+_HELP_HINT = {"type": "TextBlock", "text": "Type `help` to see all available commands.",
+              "wrap": True, "isSubtle": True}
+_ERROR_TITLE = {"type": "TextBlock", "text": "❌ Error", "weight": "Bolder", "color": "Attention"}
+_NO_DEPLOYMENTS = {"type": "TextBlock", "text": "No deployments found for this app.", "isSubtle": True}
+
+
+def _approval_actions(approval_id: str) -> list:
+    return [
+        {"type": "Action.Submit", "title": "✅ Approve", "style": "positive",
+         "data": {"action": "approve", "approval_id": approval_id}},
+        {"type": "Action.Submit", "title": "❌ Reject", "style": "destructive",
+         "data": {"action": "reject", "approval_id": approval_id}},
+    ]
+
 
 # ─────────────────────────────────────────────────────────────
 # Help Card
 # ─────────────────────────────────────────────────────────────
+_HELP_CARD = adaptive_card([
+    {"type": "TextBlock", "text": "🤖 DeployBot Commands", "weight": "Bolder", "size": "Large"},
+    {"type": "TextBlock", "text": "Here's what I can do:", "wrap": True, "spacing": "Small"},
+    {
+        "type": "FactSet",
+        "facts": [{"title": spec.usage, "value": spec.help} for spec in COMMANDS.values() if spec.help]
+    },
+    {
+        "type": "TextBlock",
+        "text": "💡 UAT and Prod deployments require approval from a Team Lead.",
+        "wrap": True, "isSubtle": True, "spacing": "Medium"
+    },
+    {
+        "type": "TextBlock",
+        "text": "💡 Send several commands at once by separating them with `;` or new lines.",
+        "wrap": True, "isSubtle": True, "spacing": "None"
+    }
+])
+
+
 def help_card() -> Attachment:
-    return _make_card([
-        {"type": "TextBlock", "text": "🤖 DeployBot Commands", "weight": "Bolder", "size": "Large"},
-        {"type": "TextBlock", "text": "Here's what I can do:", "wrap": True, "spacing": "Small"},
-        {
-            "type": "FactSet",
-            "facts": [
-                {"title": "build <app> <branch>",              "value": "Trigger a Jenkins build"},
-                {"title": "deploy <app> <build#> <env>",       "value": "Deploy to qa / uat / prod"},
-                {"title": "status <app>",                      "value": "Check deployment status in Octopus"},
-                {"title": "rollback <app> <env>",              "value": "Roll back to the previous release"},
-                {"title": "history <app>",                     "value": "Show last 10 actions for an app"},
-            ]
-        },
-        {
-            "type": "TextBlock",
-            "text": "💡 UAT and Prod deployments require approval from a Team Lead.",
-            "wrap": True, "isSubtle": True, "spacing": "Medium"
-        }
-    ])
+    return _HELP_CARD
 
 
 # ─────────────────────────────────────────────────────────────
 # Build Triggered Card
 # ─────────────────────────────────────────────────────────────
+_BUILD_TRIGGERED_TITLE = {"type": "TextBlock", "text": "🔨 Build Triggered", "weight": "Bolder", "size": "Medium",
+                          "color": "Good"}
+_BUILD_RUNNING = {"title": "Status", "value": "⏳ Running in Jenkins..."}
+
+
 def build_triggered_card(app: str, branch: str, user: str) -> Attachment:
-    return _make_card([
-        {"type": "TextBlock", "text": "🔨 Build Triggered", "weight": "Bolder", "size": "Medium", "color": "Good"},
+    return adaptive_card([
+        _BUILD_TRIGGERED_TITLE,
         {
             "type": "FactSet",
             "facts": [
                 {"title": "App",       "value": app},
                 {"title": "Branch",    "value": branch},
                 {"title": "Triggered by", "value": user},
-                {"title": "Status",    "value": "⏳ Running in Jenkins..."},
+                _BUILD_RUNNING,
             ]
         },
-        {
-            "type": "TextBlock",
-            "text": "I'll update you here when the build completes.",
-            "wrap": True, "isSubtle": True
-        }
+        _BUILD_HINT,
     ])
 
 
 # ─────────────────────────────────────────────────────────────
 # Deploy Triggered Card (QA — no approval needed)
 # ─────────────────────────────────────────────────────────────
+_DEPLOY_RUNNING = {"title": "Status", "value": "⏳ Deploying via Octopus..."}
+
+
 def deploy_triggered_card(app: str, build: str, env: str, user: str) -> Attachment:
-    color = ENV_COLORS.get(env, "Default")
-    return _make_card([
-        {"type": "TextBlock", "text": f"🚀 Deploying to {env.upper()}", "weight": "Bolder", "size": "Medium", "color": color},
+    env_name = env.upper()
+    return adaptive_card([
+        {"type": "TextBlock", "text": f"🚀 Deploying to {env_name}", "weight": "Bolder", "size": "Medium",
+         "color": ENV_COLORS.get(env, "Default")},
         {
             "type": "FactSet",
             "facts": [
                 {"title": "App",          "value": app},
                 {"title": "Build",        "value": f"#{build}"},
-                {"title": "Environment",  "value": env.upper()},
+                {"title": "Environment",  "value": env_name},
                 {"title": "Triggered by", "value": user},
-                {"title": "Status",       "value": "⏳ Deploying via Octopus..."},
+                _DEPLOY_RUNNING,
             ]
         }
     ])
@@ -106,42 +125,32 @@ def approval_request_card(
     is_rollback: bool = False,
 ) -> Attachment:
     action_label = "Rollback" if is_rollback else "Deployment"
-    color = ENV_COLORS.get(env, "Warning")
-    return _make_card(
+    env_name = env.upper()
+    return adaptive_card(
         body=[
             {"type": "TextBlock", "text": f"⚠️ {action_label} Approval Required",
-             "weight": "Bolder", "size": "Large", "color": color},
+             "weight": "Bolder", "size": "Large", "color": ENV_COLORS.get(env, "Warning")},
             {"type": "TextBlock",
-             "text": f"**{requested_by}** wants to deploy `{app}` build **#{build}** to **{env.upper()}**.",
+             "text": f"**{requested_by}** wants to deploy `{app}` build **#{build}** to **{env_name}**.",
              "wrap": True},
             {
                 "type": "FactSet",
                 "facts": [
                     {"title": "App",         "value": app},
                     {"title": "Build",       "value": f"#{build}"},
-                    {"title": "Environment", "value": env.upper()},
+                    {"title": "Environment", "value": env_name},
                     {"title": "Requested by","value": requested_by},
                     {"title": "Action",      "value": action_label},
                 ]
             },
-            {"type": "TextBlock",
-             "text": "⏱️ This request will expire in 30 minutes.",
-             "wrap": True, "isSubtle": True}
+            _EXPIRY_NOTE,
         ],
         actions=[
-            {
-                "type": "Action.Submit",
-                "title": "✅ Approve",
-                "style": "positive",
-                "data": {"action": "approve", "approval_id": approval_id}
-            },
-            {
-                "type": "Action.Submit",
-                "title": "❌ Reject",
-                "style": "destructive",
-                "data": {"action": "reject", "approval_id": approval_id}
-            }
-        ]
+            {"type": "Action.Submit", "title": "✅ Approve", "style": "positive",
+             "data": {"action": "approve", "approval_id": approval_id}},
+            {"type": "Action.Submit", "title": "❌ Reject", "style": "destructive",
+             "data": {"action": "reject", "approval_id": approval_id}},
+        ],
     )
 
 
@@ -155,10 +164,9 @@ def status_card(app: str, data: dict) -> Attachment:
             "title": env.upper(),
             "value": f"Release {info.get('release', 'N/A')} — {info.get('state', 'Unknown')}"
         })
-    return _make_card([
+    return adaptive_card([
         {"type": "TextBlock", "text": f"📊 Status: {app}", "weight": "Bolder", "size": "Medium"},
-        {"type": "FactSet", "facts": facts} if facts else
-        {"type": "TextBlock", "text": "No deployments found for this app.", "isSubtle": True}
+        {"type": "FactSet", "facts": facts} if facts else _NO_DEPLOYMENTS,
     ])
 
 
@@ -166,9 +174,175 @@ def status_card(app: str, data: dict) -> Attachment:
 # Error Card
 # ─────────────────────────────────────────────────────────────
 def error_card(message: str) -> Attachment:
-    return _make_card([
-        {"type": "TextBlock", "text": "❌ Error", "weight": "Bolder", "color": "Attention"},
+    return adaptive_card([
+        _ERROR_TITLE,
         {"type": "TextBlock", "text": message, "wrap": True},
-        {"type": "TextBlock", "text": "Type `help` to see all available commands.",
-         "wrap": True, "isSubtle": True}
+        _HELP_HINT,
     ])
+
+
+# ─────────────────────────────────────────────────────────────
+# Operation Card — one card per build / deploy / rollback,
+# re-rendered in place as the operation moves through its stages
+# ─────────────────────────────────────────────────────────────
+# stage → (title, color, status line). `{env}`, `{approver}`, `{detail}`, `{label}` are filled from the state.
+OPERATION_STAGES = {
+    # Builds
+    "building":          ("🔨 Build Triggered",              "Good",      "⏳ Running in Jenkins..."),
+    "build_queued":      ("🔨 Build Triggered",              "Good",      "⏳ Queued in Jenkins {detail}"),
+    "build_succeeded":   ("✅ Build Succeeded",              "Good",      "✅ Build #{build} succeeded"),
+    "build_failed":      ("❌ Build Failed",                 "Attention", "❌ {detail}"),
+    # Deploys and rollbacks
+    "awaiting_approval": ("⚠️ {label} Approval Required",    "{env_color}", "⏳ Waiting for approval"),
+    "rejected":          ("❌ {label} Rejected",             "Attention", "❌ Rejected by {approver}"),
+    "expired":           ("⏱️ {label} Approval Expired",     "Default",   "⏱️ Approval request expired"),
+    "deploying":         ("🚀 Deploying to {env}",           "{env_color}", "⏳ Deploying via Octopus..."),
+    "deployed":          ("🚀 {label} Triggered in {env}",   "{env_color}", "✅ Triggered in Octopus {detail}"),
+    "deploy_failed":     ("❌ {label} Failed",               "Attention", "❌ {detail}"),
+    "superseded":        ("⏭️ {label} Superseded",           "Default",   "⏭️ Replaced by {detail}"),
+    # Promote stages
+    "waiting":           ("⏳ {label} to {env} Queued",       "Default",   "⏳ Waiting for {detail}"),
+    "approved":          ("✅ {label} Approved",             "{env_color}", "⏳ Approved, waiting for {detail}"),
+    "deploy_succeeded":  ("✅ {label} Succeeded in {env}",   "Good",      "✅ Deployed {detail}"),
+    "cancelled":         ("🚫 {label} Cancelled",            "Default",   "🚫 {detail}"),
+}
+
+# Stages after which nothing else will change on the card
+FINAL_STAGES = {"build_succeeded", "build_failed", "rejected", "expired", "deployed", "deploy_failed", "superseded",
+                "deploy_succeeded", "cancelled"}
+
+
+@dataclass
+class OperationCard:
+    kind: str                              # build | deploy | rollback
+    app: str
+    user: str
+    stage: str
+    branch: Optional[str] = None
+    build: Optional[str] = None
+    env: Optional[str] = None
+    approval_id: Optional[str] = None
+    approver: Optional[str] = None
+    detail: str = ""                       # Queue item, Octopus link or error message
+
+    @property
+    def label(self) -> str:
+        return "Rollback" if self.kind == "rollback" else "Deployment"
+
+    @property
+    def final(self) -> bool:
+        return self.stage in FINAL_STAGES
+
+    def _heading(self) -> tuple[str, str, str]:
+        """(title, color, status line) for the current stage."""
+        fields = {"env": (self.env or "").upper(), "env_color": ENV_COLORS.get(self.env, "Default"),
+                  "label": self.label, "approver": self.approver or "", "detail": self.detail,
+                  "build": self.build or "?"}
+        title, color, status = (part.format(**fields) for part in OPERATION_STAGES[self.stage])
+        if self.stage == "awaiting_approval" and color == "Default":
+            color = "Warning"
+        return title, color, status.strip()
+
+    @property
+    def status_line(self) -> str:
+        return self._heading()[2]
+
+    def render(self) -> Attachment:
+        env = (self.env or "").upper()
+        title, color, status = self._heading()
+        awaiting = self.stage == "awaiting_approval"
+
+        if self.kind == "build":
+            facts = [
+                {"title": "App",          "value": self.app},
+                {"title": "Branch",       "value": self.branch},
+                {"title": "Triggered by", "value": self.user},
+            ]
+        else:
+            requested = bool(self.approval_id)
+            facts = [
+                {"title": "App",          "value": self.app},
+                {"title": "Build",        "value": f"#{self.build}"},
+                {"title": "Environment",  "value": env},
+                {"title": "Requested by" if requested else "Triggered by", "value": self.user},
+            ]
+            if requested:
+                facts.append({"title": "Action", "value": self.label})
+            if self.approver:
+                facts.append({"title": "Rejected by" if self.stage == "rejected" else "Approved by",
+                              "value": self.approver})
+        facts.append({"title": "Status", "value": status})
+
+        body = [{"type": "TextBlock", "text": title, "weight": "Bolder",
+                 "size": "Large" if awaiting else "Medium", "color": color}]
+        if awaiting:
+            body.append({"type": "TextBlock",
+                         "text": f"**{self.user}** wants to deploy `{self.app}` build **#{self.build}** to **{env}**.",
+                         "wrap": True})
+        body.append({"type": "FactSet", "facts": facts})
+
+        if awaiting:
+            body.append(_EXPIRY_NOTE)
+            return adaptive_card(body, _approval_actions(self.approval_id))
+        if self.stage in ("building", "build_queued"):
+            body.append(_BUILD_HINT)
+        return adaptive_card(body)
+
+
+def deploy_outcome(result: dict) -> dict:
+    """OperationCard changes for an OctopusClient.deploy / rollback (or DeployScheduler) result."""
+    if result.get("status") == "superseded":
+        return {"stage": "superseded",
+                "detail": f"build #{result['superseded_by']} (requested by {result['superseded_by_user']})"}
+    if result.get("status") == "triggered":
+        target = f"(reverted to {result['rollback_to']})" if result.get("rollback_to") else ""
+        return {"stage": "deployed", "detail": result.get("url") or target}
+    return {"stage": "deploy_failed", "detail": f"Deployment failed: {result.get('message', 'Unknown error')}"}
+
+
+# ─────────────────────────────────────────────────────────────
+# Batch Card — one line per command of a multi-command message
+# ─────────────────────────────────────────────────────────────
+@dataclass
+class BatchRow:
+    command: str                           # The command as typed
+    status: str = "⏳ Queued"
+
+
+@dataclass
+class BatchCard:
+    user: str
+    rows: list
+    kind: str = "batch"
+    app: str = ""
+
+    def render(self) -> Attachment:
+        facts = [{"title": row.command, "value": row.status} for row in self.rows]
+        return adaptive_card([
+            {"type": "TextBlock", "text": f"📋 {len(self.rows)} commands from {self.user}",
+             "weight": "Bolder", "size": "Medium"},
+            {"type": "FactSet", "facts": facts},
+        ])
+
+
+# ─────────────────────────────────────────────────────────────
+# Promotion Card — one line per environment of a `promote`
+# ─────────────────────────────────────────────────────────────
+@dataclass
+class PromotionCard:
+    app: str
+    build: str
+    user: str
+    rows: list                             # BatchRow per environment, in promotion order
+    kind: str = "promote"
+
+    def render(self) -> Attachment:
+        facts = [{"title": row.command, "value": row.status} for row in self.rows]
+        route = " → ".join(row.command for row in self.rows)
+        return adaptive_card([
+            {"type": "TextBlock", "text": f"🚚 Promoting {self.app} build #{self.build}",
+             "weight": "Bolder", "size": "Medium"},
+            {"type": "TextBlock", "text": f"{route} · requested by {self.user}",
+             "isSubtle": True, "spacing": "None", "wrap": True},
+            {"type": "FactSet", "facts": facts},
+        ])
@@ -2,21 +2,23 @@
 bot/command_parser.py
 Parses incoming Teams messages into structured command objects.
 
-Supported commands:
-  build <app> <branch>
-  deploy <app> <build_number> <environment>
-  status <app>
-  rollback <app> <environment>
-  history <app>
-  help
+The supported commands, their arguments and validation live in the
+registry in bot/commands.py; parsing is one dict lookup on the first word.
+
+One message may carry several commands separated by `;` or new lines, e.g.
+"build api main; build web main; deploy worker 17 qa" (see parse_commands).
 """
+import re
 from dataclasses import dataclass
+from operator import itemgetter
 from typing import Optional
 
+from bot.commands import COMMANDS
+
 
 @dataclass
 class ParsedCommand:
-    action: str                      # build | deploy | status | rollback | history | help | unknown
+    action: str                      # build | deploy | status | rollback | promote | history | help | unknown
     app: Optional[str] = None
     branch: Optional[str] = None
     build_number: Optional[str] = None
@@ -24,9 +26,28 @@ class ParsedCommand:
     raw: str = ""
     error: Optional[str] = None      # Set if parsing failed
 
+    @property
+    def stages(self) -> list[str]:
+        """Environments of a `promote`, e.g. "qa>uat>prod" → ["qa", "uat", "prod"]."""
+        return [env for env in (self.environment or "").split(">") if env]
+
+
+VALID_ACTIONS = set(COMMANDS)
+
+# Argument fields of ParsedCommand, in constructor order
+_ARG_FIELDS = ("app", "branch", "build_number", "environment")
+
+# action → picks the argument fields out of `words + [None]` (index -1 = not taken)
+_PICKERS = {
+    spec.name: itemgetter(*(spec.fields.index(f) + 1 if f in spec.fields else -1 for f in _ARG_FIELDS))
+    for spec in COMMANDS.values()
+}
+
+# The XML mention tag Teams injects, e.g. "<at>DeployBot</at> build ..."
+_MENTION = re.compile(r"<at>[^<]*</at>")
 
-VALID_ENVS = {"qa", "uat", "prod"}
-VALID_ACTIONS = {"build", "deploy", "status", "rollback", "history", "help"}
+# Separates the commands of a multi-command message
+_SEPARATOR = re.compile(r"[;\r\n]")
 
 
 def parse_command(message: str) -> ParsedCommand:
@@ -34,74 +55,44 @@ def parse_command(message: str) -> ParsedCommand:
     Parse a raw Teams message into a ParsedCommand.
     Strips @mentions automatically before parsing.
     """
-    # Strip @mention prefix (e.g. "<at>DeployBot</at> build ...")
     text = message.strip()
     if "<at>" in text:
-        # Remove the XML mention tag Teams injects
-        import re
-        text = re.sub(r"<at>[^<]*</at>", "", text).strip()
+        text = _MENTION.sub("", text).strip()
 
-    raw = text
     parts = text.lower().split()
-
     if not parts:
-        return ParsedCommand(action="help", raw=raw)
-
-    action = parts[0]
+        return ParsedCommand(action="help", raw=text)
 
-    if action not in VALID_ACTIONS:
+    spec = COMMANDS.get(parts[0])
+    if spec is None:
         return ParsedCommand(
             action="unknown",
-            raw=raw,
-            error=f"Unknown command `{action}`. Type `help` to see available commands."
+            raw=text,
+            error=f"Unknown command `{parts[0]}`. Type `help` to see available commands."
         )
+    if len(parts) <= spec.arity:
+        return ParsedCommand(action=spec.name, raw=text, error=spec.usage_error)
+
+    if spec.greedy:
+        parts[spec.arity:] = ["".join(parts[spec.arity:])]
+    parts.append(None)
+    cmd = ParsedCommand(spec.name, *_PICKERS[spec.name](parts), text)
+    if spec.validator is not None:
+        error = spec.validator(cmd)
+        if error:
+            return ParsedCommand(action=spec.name, raw=text, error=error)
+    return cmd
+
 
-    # ── help ────────────────────────────────────────────────────
-    if action == "help":
-        return ParsedCommand(action="help", raw=raw)
-
-    # ── build <app> <branch> ────────────────────────────────────
-    if action == "build":
-        if len(parts) < 3:
-            return ParsedCommand(action="build", raw=raw,
-                                 error="Usage: `build <app> <branch>`  e.g. `build myapp main`")
-        return ParsedCommand(action="build", app=parts[1], branch=parts[2], raw=raw)
-
-    # ── deploy <app> <build_number> <environment> ───────────────
-    if action == "deploy":
-        if len(parts) < 4:
-            return ParsedCommand(action="deploy", raw=raw,
-                                 error="Usage: `deploy <app> <build#> <qa|uat|prod>`  e.g. `deploy myapp 42 qa`")
-        env = parts[3]
-        if env not in VALID_ENVS:
-            return ParsedCommand(action="deploy", raw=raw,
-                                 error=f"Invalid environment `{env}`. Choose from: qa, uat, prod")
-        return ParsedCommand(action="deploy", app=parts[1],
-                             build_number=parts[2], environment=env, raw=raw)
-
-    # ── status <app> ────────────────────────────────────────────
-    if action == "status":
-        if len(parts) < 2:
-            return ParsedCommand(action="status", raw=raw,
-                                 error="Usage: `status <app>`  e.g. `status myapp`")
-        return ParsedCommand(action="status", app=parts[1], raw=raw)
-
-    # ── rollback <app> <environment> ────────────────────────────
-    if action == "rollback":
-        if len(parts) < 3:
-            return ParsedCommand(action="rollback", raw=raw,
-                                 error="Usage: `rollback <app> <environment>`  e.g. `rollback myapp prod`")
-        env = parts[2]
-        if env not in VALID_ENVS:
-            return ParsedCommand(action="rollback", raw=raw,
-                                 error=f"Invalid environment `{env}`. Choose from: qa, uat, prod")
-        return ParsedCommand(action="rollback", app=parts[1], environment=env, raw=raw)
-
-    # ── history <app> ───────────────────────────────────────────
-    if action == "history":
-        if len(parts) < 2:
-            return ParsedCommand(action="history", raw=raw,
-                                 error="Usage: `history <app>`  e.g. `history myapp`")
-        return ParsedCommand(action="history", app=parts[1], raw=raw)
-
-    return ParsedCommand(action="unknown", raw=raw, error="Could not parse command.")
+def parse_commands(message: str) -> list[ParsedCommand]:
+    """
+    Parse a message that may hold several commands into one ParsedCommand each,
+    in the order they were written. A single command gives a one-item list.
+    """
+    text = message
+    if "<at>" in text:
+        text = _MENTION.sub("", text)
+    pieces = [piece for piece in _SEPARATOR.split(text) if piece.strip()]
+    if not pieces:
+        return [parse_command("")]
+    return [parse_command(piece) for piece in pieces]
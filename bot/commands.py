@@ -0,0 +1,124 @@
+"""
+bot/commands.py
+The command registry — one CommandSpec per chat command.
+
+Everything command-shaped is generated from COMMANDS:
+  - bot/command_parser.py turns message text into a ParsedCommand
+  - DeployBot.on_message_activity looks up the spec to dispatch it
+  - the help card lists every spec that has help text
+
+Adding a command means adding one `register(...)` entry here and its
+handler method on DeployBot.
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from config.settings import settings
+
+
+@dataclass(frozen=True)
+class Arg:
+    field: str                       # ParsedCommand attribute the value is stored in
+    label: str                       # Shown as <label> in usage and help
+    rest: bool = False               # Last argument only: takes the remaining words, joined
+
+
+@dataclass(frozen=True)
+class CommandSpec:
+    name: str
+    args: tuple[Arg, ...]
+    handler: str                     # DeployBot method, called as handler(turn_context, cmd, user)
+    help: Optional[str] = None       # One-line description for the help card (None = not listed)
+    example: str = ""                # Shown after the usage line when arguments are missing
+    validator: Optional[Callable] = None   # validator(cmd) -> error message or None
+    key: Optional[Callable] = None   # key(cmd) -> job queue key (None = no ordering; deploys
+                                     # and rollbacks are ordered by jobs/deploys.py instead)
+    inline: bool = False             # Run on the incoming turn instead of the job queue
+    background: bool = False         # Long-running: runs beside the job queue instead of on a worker
+
+    # Derived once at registration so the parser does no string work per message
+    arity: int = field(init=False)
+    greedy: bool = field(init=False)
+    fields: tuple[str, ...] = field(init=False)
+    usage: str = field(init=False)
+    usage_error: str = field(init=False)
+
+    def __post_init__(self):
+        usage = " ".join([self.name, *(f"<{a.label}>" for a in self.args)])
+        usage_error = f"Usage: `{usage}`" + (f"  e.g. `{self.example}`" if self.example else "")
+        object.__setattr__(self, "arity", len(self.args))
+        object.__setattr__(self, "greedy", bool(self.args) and self.args[-1].rest)
+        object.__setattr__(self, "fields", tuple(a.field for a in self.args))
+        object.__setattr__(self, "usage", usage)
+        object.__setattr__(self, "usage_error", usage_error)
+
+
+COMMANDS: dict[str, CommandSpec] = {}
+
+
+def register(spec: CommandSpec) -> CommandSpec:
+    COMMANDS[spec.name] = spec
+    return spec
+
+
+# ─────────────────────────────────────────────────────────────
+# Validators and queue keys
+# ─────────────────────────────────────────────────────────────
+def valid_environment(cmd) -> Optional[str]:
+    if cmd.environment not in settings.VALID_ENVIRONMENTS:
+        return f"Invalid environment `{cmd.environment}`. Choose from: {', '.join(settings.VALID_ENVIRONMENTS)}"
+    return None
+
+
+def valid_stages(cmd) -> Optional[str]:
+    stages = cmd.stages
+    invalid = [env for env in stages if env not in settings.VALID_ENVIRONMENTS]
+    if invalid or not stages:
+        return f"Invalid environment `{invalid[0] if invalid else cmd.environment}`. " \
+               f"Promote through {'>'.join(settings.VALID_ENVIRONMENTS)} or a part of it, e.g. `uat>prod`"
+    if len(set(stages)) != len(stages):
+        return "Each environment can appear only once in a promotion."
+    return None
+
+
+def app_key(cmd):
+    """Builds for one app run in order."""
+    return (cmd.app, None)
+
+
+# ─────────────────────────────────────────────────────────────
+# Commands — listed on the help card in this order
+# ─────────────────────────────────────────────────────────────
+APP = Arg("app", "app")
+ENV = Arg("environment", "env")
+
+register(CommandSpec(
+    name="build", args=(APP, Arg("branch", "branch")), handler="_handle_build",
+    help="Trigger a Jenkins build", example="build myapp main", key=app_key,
+))
+register(CommandSpec(
+    name="deploy", args=(APP, Arg("build_number", "build#"), ENV), handler="_handle_deploy",
+    help="Deploy to qa / uat / prod", example="deploy myapp 42 qa",
+    validator=valid_environment,
+))
+register(CommandSpec(
+    name="status", args=(APP,), handler="_handle_status",
+    help="Check deployment status in Octopus", example="status myapp",
+))
+register(CommandSpec(
+    name="rollback", args=(APP, ENV), handler="_handle_rollback",
+    help="Roll back to the previous release", example="rollback myapp prod",
+    validator=valid_environment,
+))
+register(CommandSpec(
+    name="promote", args=(APP, Arg("build_number", "build#"), Arg("environment", "envs", rest=True)),
+    handler="_handle_promote", help="Deploy one build through e.g. qa>uat>prod, stage by stage",
+    example="promote myapp 42 qa>uat>prod", validator=valid_stages, background=True,
+))
+register(CommandSpec(
+    name="history", args=(APP,), handler="_handle_history",
+    help="Show last 10 actions for an app", example="history myapp",
+))
+register(CommandSpec(
+    name="help", args=(), handler="_handle_help", inline=True,
+))
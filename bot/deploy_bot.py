@@ -1,80 +1,190 @@
 """
 bot/deploy_bot.py
 Core Teams bot — receives messages, routes commands, sends replies.
+
+With a shared store (STATE_DB_PATH, several worker processes) build cards
+waiting for their Jenkins callback are tracked there, so the callback can
+finish them from whichever worker it reaches.
+
+On shutdown `drain()` lets running commands finish (up to a deadline) and
+`checkpoint()` leaves pending approvals and tracked builds for the next process,
+which picks them up with `resume()` (see jobs/shutdown.py).
 """
-from botbuilder.core import ActivityHandler, TurnContext, MessageFactory
-from botbuilder.schema import Activity, ActivityTypes
+import asyncio
+import time
+from collections import deque
+from functools import partial
+from typing import TYPE_CHECKING, Union
+
+from botbuilder.core import ActivityHandler, BotAdapter, InvokeResponse, TurnContext, MessageFactory
+from botbuilder.schema import Activity, ActivityTypes, ConversationReference
+from botframework.connector.auth import SkillValidation
 
-from bot.command_parser import parse_command
+from bot.command_parser import ParsedCommand, parse_commands
+from bot.commands import COMMANDS
 from bot.cards import (
-    build_triggered_card,
-    deploy_triggered_card,
-    approval_request_card,
+    BatchCard,
+    BatchRow,
+    OperationCard,
+    deploy_outcome,
     status_card,
     error_card,
     help_card,
 )
-from jenkins_client.client import JenkinsClient
-from octopus_client.client import OctopusClient
 from approval.manager import ApprovalManager
 from audit.logger import AuditLogger
+from jobs.queue import CommandQueue, QueueFull
+from jobs.deploys import DeployScheduler
+from promotion.pipeline import PromotionPipeline
+from idempotency.cache import DUPLICATES, IdempotencyCache
+from cache.readthrough import ReadThroughCache
+from outbound.scheduler import OutboundScheduler
+from outbound.live_card import LiveCard, LiveRow
 from config.settings import settings
+from metrics.registry import DEFAULT_BUCKETS, REGISTRY
+from resilience.deadline import deadline_after, within_deadline
+from store.shared import RELEASED, SharedStore, shared_store
+from tracing.tracer import current_span, span
+
+if TYPE_CHECKING:
+    from jenkins_client.client import JenkinsClient
+    from octopus_client.client import OctopusClient
+
+# turn_state slot where handlers leave the outcome that retries should get back
+OUTCOME_KEY = "deploybot.outcome"
+
+COMMAND_LATENCY = REGISTRY.histogram(
+    "deploybot_command_seconds", "Time from receiving a command to its handler finishing", ["command"],
+    buckets=DEFAULT_BUCKETS + (120.0, 300.0, 900.0, 1800.0, 3600.0))   # promote / batch run for minutes
+COMMAND_ERRORS = REGISTRY.counter(
+    "deploybot_command_errors_total", "Commands that were invalid, turned away or failed", ["command", "reason"])
+
+# Children bound up front so recording a command is a dict lookup plus an observe
+_COMMAND_NAMES = (*COMMANDS, "approval", "batch", "unknown")
+_LATENCY = {name: COMMAND_LATENCY.labels(name) for name in _COMMAND_NAMES}
+_ERRORS = {(name, reason): COMMAND_ERRORS.labels(name, reason)
+           for name in _COMMAND_NAMES for reason in ("invalid", "busy", "failed")}
+
+
+def _interrupted_notice(text: str):
+    return MessageFactory.attachment(error_card(
+        f"DeployBot restarted before `{text}` finished, so it may be only partly done. "
+        f"Check `status` before running it again."
+    ))
 
 
 class DeployBot(ActivityHandler):
 
-    def __init__(self):
+    def __init__(self, adapter=None, jobs: CommandQueue = None):
         # Lazy-loaded — clients are only created when first command is used.
         # This lets the bot server start cleanly even if .env is not yet filled in.
         self._jenkins = None
         self._octopus = None
-        self.approvals = ApprovalManager()
+        # Approvals, build cards and cache invalidations shared with the other worker processes
+        self.store = shared_store()
+        self.reads = ReadThroughCache(store=self.store)
+        self.outbound = OutboundScheduler()
+        # One Octopus deploy at a time per (app, environment), across workers; newer builds
+        # supersede queued ones
+        self.deploys = DeployScheduler(octopus=lambda: self.octopus, store=self.store)
+        self.approvals = ApprovalManager(reads=self.reads, outbound=self.outbound, deploys=self.deploys,
+                                         store=self.store)
         self.audit = AuditLogger()
+        self.promotions = PromotionPipeline(self.deploys, self.approvals, self.outbound,
+                                            audit=self.audit, reads=self.reads)
+        # With an adapter, slow commands run on the job queue and reply proactively.
+        # Without one (local scripts), they run inline on the incoming turn.
+        self.adapter = adapter
+        self.jobs = jobs or CommandQueue()
+        self.idempotency = IdempotencyCache()
+        # app → build cards waiting for their Jenkins callback, oldest first
+        self._builds: dict[str, deque] = {}
+        # With a shared store the queue is kept there instead; this worker's cards by build ID
+        self._tracked: dict[int, Union[LiveCard, LiveRow]] = {}
+        if self.store is not None:
+            self.store.subscribe("build", self._build_finished_elsewhere)
+        # Multi-command messages and promotions running beside the job queue
+        self._background: set[asyncio.Task] = set()
+        self._draining = False   # Set by drain(): commands cancelled from then on were cut off by shutdown
 
+    # The client modules are imported here too: python-jenkins alone pulls in
+    # requests and pkg_resources, which startup should not wait for
     @property
-    def jenkins(self) -> JenkinsClient:
+    def jenkins(self) -> "JenkinsClient":
         if self._jenkins is None:
+            from jenkins_client.client import JenkinsClient
             self._jenkins = JenkinsClient()
         return self._jenkins
 
     @property
-    def octopus(self) -> OctopusClient:
+    def octopus(self) -> "OctopusClient":
         if self._octopus is None:
+            from octopus_client.client import OctopusClient
             self._octopus = OctopusClient()
         return self._octopus
 
+    # ─────────────────────────────────────────────────────────────
+    # Retry guard — Bot Framework resends activities when we are slow
+    # ─────────────────────────────────────────────────────────────
+    async def on_turn(self, turn_context: TurnContext):
+        activity = turn_context.activity
+        key = None
+        if activity.type in (ActivityTypes.message, ActivityTypes.invoke):
+            key = self.idempotency.key_for(activity)
+        if key is None:
+            await super().on_turn(turn_context)
+            return
+
+        outcome = await self.idempotency.claim(key)
+        if outcome is not None:
+            DUPLICATES.labels(activity.type).inc()
+            print(f"[DUPLICATE] Activity {activity.id} already handled: {outcome}")
+            if activity.type == ActivityTypes.invoke:
+                await turn_context.send_activity(Activity(
+                    type=ActivityTypes.invoke_response,
+                    value=InvokeResponse(status=outcome.get("invoke_status", 200)),
+                ))
+            return
+
+        try:
+            await super().on_turn(turn_context)
+        except Exception:
+            await self.idempotency.forget(key)   # Let the retry run it
+            raise
+        await self.idempotency.complete(key, turn_context.turn_state.get(OUTCOME_KEY, {"status": "handled"}))
+
     # ─────────────────────────────────────────────────────────────
     # Entry point — called on every incoming Teams message
     # ─────────────────────────────────────────────────────────────
     async def on_message_activity(self, turn_context: TurnContext):
         text = turn_context.activity.text or ""
         user = turn_context.activity.from_property.name or "unknown"
-        user_id = turn_context.activity.from_property.id or ""
 
-        cmd = parse_command(text)
+        cmds = parse_commands(text)
+        if len(cmds) > 1:
+            await self._start_batch(turn_context, cmds, user)
+            return
+        cmd = cmds[0]
 
         if cmd.error:
-            await turn_context.send_activity(
+            _ERRORS[cmd.action, "invalid"].inc()
+            await self.outbound.send(
+                turn_context,
                 MessageFactory.attachment(error_card(cmd.error))
             )
             return
 
-        if cmd.action == "help":
-            await turn_context.send_activity(MessageFactory.attachment(help_card()))
-        elif cmd.action == "build":
-            await self._handle_build(turn_context, cmd, user)
-        elif cmd.action == "deploy":
-            await self._handle_deploy(turn_context, cmd, user, user_id)
-        elif cmd.action == "status":
-            await self._handle_status(turn_context, cmd, user)
-        elif cmd.action == "rollback":
-            await self._handle_rollback(turn_context, cmd, user)
-        elif cmd.action == "history":
-            await self._handle_history(turn_context, cmd)
-        else:
-            await turn_context.send_activity(
-                MessageFactory.attachment(error_card("Unknown command. Type `help` to see available commands."))
-            )
+        spec = COMMANDS[cmd.action]
+        handler = getattr(self, spec.handler)
+        if spec.inline:
+            await self._instrumented(spec.name, lambda ctx: handler(ctx, cmd, user))(turn_context)
+            return
+        if spec.background:
+            await self._start_background(turn_context, spec.name, lambda ctx: handler(ctx, cmd, user),
+                                         text=cmd.raw, user=user)
+            return
+        await self._enqueue(turn_context, spec.name, spec.key(cmd) if spec.key else None,
+                            lambda ctx: handler(ctx, cmd, user), text=cmd.raw, user=user)
 
     async def on_invoke_activity(self, turn_context: TurnContext):
         value = turn_context.activity.value or {}
@@ -82,63 +192,407 @@ class DeployBot(ActivityHandler):
         approval_id = value.get("approval_id")
         approver = turn_context.activity.from_property.name
         if action in ("approve", "reject") and approval_id:
-            await self.approvals.handle_response(
-                approval_id=approval_id,
-                approved=(action == "approve"),
-                approver=approver,
-                turn_context=turn_context,
+            # Ordering against other deploys of the same environment is up to self.deploys
+            await self._enqueue(
+                turn_context, "approval", None,
+                lambda ctx: self.approvals.handle_response(
+                    approval_id=approval_id,
+                    approved=(action == "approve"),
+                    approver=approver,
+                    turn_context=ctx,
+                ),
+                approval_id=approval_id, action=action, user=approver,
             )
+            turn_context.turn_state[OUTCOME_KEY]["invoke_status"] = 200
+            return InvokeResponse(status=200)
 
-    async def _handle_build(self, turn_context, cmd, user):
-        await turn_context.send_activity(
-            MessageFactory.attachment(build_triggered_card(app=cmd.app, branch=cmd.branch, user=user))
+    # ─────────────────────────────────────────────────────────────
+    # Background execution
+    # ─────────────────────────────────────────────────────────────
+    async def _enqueue(self, turn_context: TurnContext, command: str, key, handler, **attributes):
+        """
+        Run `handler(turn_context)` on the job queue so the incoming request can be
+        acknowledged straight away. The handler gets a proactive turn context for
+        the same conversation, so its replies land where the command was typed.
+        `attributes` are recorded on the command's trace.
+        """
+        turn_context.turn_state[OUTCOME_KEY] = {"status": "queued", "command": command}
+        handler = self._instrumented(command, handler, budget=settings.COMMAND_DEADLINE_SECONDS, **attributes)
+        if self.adapter is None:
+            await handler(turn_context)
+            return
+
+        try:
+            self.jobs.submit(command, self._continuation(turn_context, handler), key=key)
+        except QueueFull:
+            _ERRORS[command, "busy"].inc()
+            turn_context.turn_state[OUTCOME_KEY] = {"status": "rejected", "command": command}
+            await self.outbound.send(
+                turn_context,
+                MessageFactory.attachment(error_card(
+                    "DeployBot is busy with other commands right now. Please try again in a minute."
+                ))
+            )
+
+    async def _start_background(self, turn_context: TurnContext, command: str, handler, **attributes):
+        """
+        Run `handler(turn_context)` as its own task on a proactive turn, for work that
+        mostly waits (on approvals, on Octopus, on other jobs) and would otherwise tie
+        up a job queue worker for minutes.
+        """
+        turn_context.turn_state[OUTCOME_KEY] = {"status": "queued", "command": command}
+        handler = self._instrumented(command, handler, **attributes)
+        if self.adapter is None:
+            await handler(turn_context)
+            return
+        task = asyncio.create_task(self._continuation(turn_context, handler)())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _instrumented(self, command: str, handler, budget: float = None, **attributes):
+        """
+        Wrap `handler` to record the command's latency (counted from now) and failures,
+        and to trace it: a new trace, or a child span when wrapped inside one (batches).
+        Its upstream calls must finish within `budget` seconds from now (None = no deadline).
+        A command cut off by shutdown says so in its conversation (a batch, not each of its commands).
+        """
+        received = time.perf_counter_ns()
+        deadline = deadline_after(budget)
+        parent = current_span()
+        latency = _LATENCY[command]
+        failed = _ERRORS[command, "failed"]
+
+        async def run(turn_context: TurnContext):
+            started = time.perf_counter_ns()
+            with span(command, parent=parent, start_ns=received, **attributes) as trace, within_deadline(deadline):
+                trace.child("queued", received, started)
+                try:
+                    await handler(turn_context)
+                except Exception:
+                    failed.inc()
+                    raise
+                except asyncio.CancelledError:
+                    if self._draining and parent is None:
+                        await self.outbound.send(turn_context, _interrupted_notice(attributes.get("text", command)))
+                    raise
+                finally:
+                    latency.observe((time.perf_counter_ns() - received) / 1e9)
+        return run
+
+    def _continuation(self, turn_context: TurnContext, handler):
+        """A job body that runs `handler` on a proactive turn in the conversation of `turn_context`."""
+        reference = TurnContext.get_conversation_reference(turn_context.activity)
+        identity = turn_context.turn_state.get(BotAdapter.BOT_IDENTITY_KEY)
+
+        async def run():
+            await self.adapter.continue_conversation(
+                reference, handler, bot_id=settings.APP_ID or None, claims_identity=identity,
+            )
+        return run
+
+    async def _resume(self, reference: ConversationReference, handler):
+        """Run `handler` on a proactive turn in a conversation another worker process started."""
+        identity = None if settings.APP_ID else SkillValidation.create_anonymous_skill_claim()
+        await self.adapter.continue_conversation(
+            reference, handler, bot_id=settings.APP_ID or None, claims_identity=identity,
         )
+
+    # ─────────────────────────────────────────────────────────────
+    # Multi-command messages — one summary card, a line per command
+    # ─────────────────────────────────────────────────────────────
+    async def _start_batch(self, turn_context: TurnContext, cmds: list[ParsedCommand], user: str):
+        errors = [f"`{cmd.raw}` — {cmd.error}" for cmd in cmds if cmd.error]
+        errors += [f"`{cmd.raw}` — `{cmd.action}` can't be combined with other commands"
+                   for cmd in cmds if not cmd.error and (COMMANDS[cmd.action].inline or COMMANDS[cmd.action].background)]
+        if len(cmds) > settings.BATCH_MAX_COMMANDS:
+            errors.insert(0, f"A message can hold at most {settings.BATCH_MAX_COMMANDS} commands.")
+        if errors:
+            _ERRORS["batch", "invalid"].inc()
+            await self.outbound.send(turn_context, MessageFactory.attachment(error_card("\n\n".join(errors))))
+            return
+
+        # The coordinator only waits on the job queue, so it runs beside it rather than on a worker
+        await self._start_background(turn_context, "batch",
+                                     lambda ctx: self._run_batch(ctx, turn_context, cmds, user),
+                                     commands=len(cmds), user=user)
+        turn_context.turn_state[OUTCOME_KEY]["count"] = len(cmds)
+
+    async def _run_batch(self, turn_context: TurnContext, origin: TurnContext,
+                         cmds: list[ParsedCommand], user: str):
+        """
+        Run `cmds` and report on one summary card. Commands for the same app run in
+        the order they were written (a build before the deploy of that app); other
+        apps run alongside, at most BATCH_CONCURRENCY commands at a time.
+        """
+        summary = LiveCard(self.outbound, turn_context,
+                           BatchCard(user=user, rows=[BatchRow(cmd.raw) for cmd in cmds]))
+        await summary.post()
+
+        by_app: dict[str, list[int]] = {}
+        for index, cmd in enumerate(cmds):
+            by_app.setdefault(cmd.app, []).append(index)
+        limit = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+        async def run_in_order(indexes: list[int]):
+            for index in indexes:
+                async with limit:
+                    await self._run_batch_command(origin, cmds[index], user, LiveRow(summary, index))
+
+        await asyncio.gather(*(run_in_order(indexes) for indexes in by_app.values()))
+        await summary.settle()
+
+    async def _run_batch_command(self, origin: TurnContext, cmd: ParsedCommand, user: str, row: LiveRow):
+        spec = COMMANDS[cmd.action]
+        method = getattr(self, spec.handler)
+        handler = self._instrumented(spec.name, lambda ctx: method(ctx, cmd, user, row=row),
+                                     budget=settings.COMMAND_DEADLINE_SECONDS, text=cmd.raw)
+        if self.adapter is None:
+            try:
+                await handler(origin)
+            except Exception as e:
+                print(f"[ERROR] {cmd.action} in batch failed: {e}")
+                row.show(f"❌ {e}")
+            return
+
+        # Each command is still a job with its own serial key, so it is ordered
+        # against the same app / environment from other messages too
+        try:
+            job = self.jobs.submit(spec.name, self._continuation(origin, handler),
+                                   key=spec.key(cmd) if spec.key else None)
+        except QueueFull:
+            _ERRORS[spec.name, "busy"].inc()
+            row.show("❌ DeployBot is busy, try again in a minute")
+            return
+        # wait() leaves job.done alone if this task is the one cancelled
+        await asyncio.wait({job.done})
+        if job.done.cancelled():
+            row.show("🚫 Cancelled")
+        elif job.done.result() is not None:
+            row.show(f"❌ {job.done.result()}")
+
+    # ─────────────────────────────────────────────────────────────
+    # Command handlers — named by CommandSpec.handler in bot/commands.py.
+    # `row` is set when the command is part of a multi-command message:
+    # progress then goes to its line on the summary card.
+    # ─────────────────────────────────────────────────────────────
+    def _live_card(self, turn_context: TurnContext, state: OperationCard, row: LiveRow = None):
+        return row.attach(state) if row else LiveCard(self.outbound, turn_context, state)
+
+    async def _handle_help(self, turn_context, cmd, user, row=None):
+        await self.outbound.send(turn_context, MessageFactory.attachment(help_card()))
+
+    async def _handle_build(self, turn_context, cmd, user, row=None):
+        card = self._live_card(turn_context, OperationCard(
+            kind="build", app=cmd.app, branch=cmd.branch, user=user, stage="building"), row)
+        await card.post()
         result = await self.jenkins.trigger_build(app=cmd.app, branch=cmd.branch)
+        if result.get("status") == "triggered":
+            card.set(stage="build_queued", detail=f"(queue item #{result.get('queue_item')})")
+            # The Jenkins callback moves this card to succeeded / failed
+            await self._track_build(turn_context, cmd.app, card)
+        else:
+            card.set(stage="build_failed", detail=f"Build failed: {result.get('message', 'Unknown error')}")
         await self.audit.log(user=user, action="build", app=cmd.app,
                              details={"branch": cmd.branch}, result=result)
+        self.reads.invalidate(cmd.app)
+        await card.settle()
+
+    async def _track_build(self, turn_context: TurnContext, app: str, card):
+        if self.store is None:
+            self._builds.setdefault(app, deque()).append(card)
+            return
+        build_id = await self.store.add_build(app, self._build_record(turn_context, card))
+        self._tracked[build_id] = card
+
+    @staticmethod
+    def _build_record(turn_context: TurnContext, card) -> dict:
+        return {
+            # A line of a batch card can only be edited by the worker showing the batch
+            "card": card.record() if isinstance(card, LiveCard) else None,
+            "reference": TurnContext.get_conversation_reference(turn_context.activity).serialize(),
+        }
+
+    async def on_build_finished(self, app: str, build_number, status: str, url: str = ""):
+        """Called from the Jenkins callback — finish the oldest open build card for `app`."""
+        if status == "SUCCESS":
+            outcome = {"stage": "build_succeeded", "build": str(build_number), "detail": url}
+        else:
+            outcome = {"stage": "build_failed", "build": str(build_number),
+                       "detail": f"Build #{build_number} finished {status}. {url}".strip()}
+        if self.store is not None:
+            await self._finish_tracked_build(app, outcome)
+            return
+        cards = self._builds.get(app)
+        if not cards:
+            return
+        card = cards.popleft()
+        if not cards:
+            del self._builds[app]
+        card.set(**outcome)
+        await card.settle()
+
+    async def _finish_tracked_build(self, app: str, outcome: dict):
+        claimed = await self.store.claim_build(app)
+        if claimed is None:
+            return
+        build_id, _, record = claimed
+        card = self._tracked.pop(build_id, None)
+        if card is None and record["card"] is not None and self.adapter is not None:
+            # Started on another worker: edit its card from here, and let that worker forget it
+            self.store.notify("build", str(build_id))
+
+            async def finish(turn_context: TurnContext):
+                restored = LiveCard.restore(self.outbound, turn_context, record["card"])
+                restored.set(**outcome)
+                await restored.settle()
+            await self._resume(ConversationReference.deserialize(record["reference"]), finish)
+            return
+        if card is None:
+            self.store.notify("build", str(build_id), outcome)   # The owner finishes it
+            return
+        card.set(**outcome)
+        await card.settle()
+
+    async def _build_finished_elsewhere(self, build_id: str, outcome: dict = None):
+        """Change feed: another worker took the Jenkins callback for one of this worker's builds."""
+        card = self._tracked.pop(int(build_id), None)
+        if card is not None and outcome is not None:
+            card.set(**outcome)
+            await card.settle()
+
+    # ─────────────────────────────────────────────────────────────
+    # Restarts — called by the shutdown coordinator and at warm-up
+    # ─────────────────────────────────────────────────────────────
+    async def drain(self, timeout: float) -> int:
+        """
+        Give running commands (job queue, batches, promotions) up to `timeout`
+        seconds to finish and the card updates they queued whatever is left of it,
+        then cancel the rest. Returns how many were cancelled.
+        """
+        self._draining = True
+        deadline = time.monotonic() + timeout
+        queue = asyncio.ensure_future(self.jobs.join())
+        await asyncio.wait({queue, *self._background}, timeout=timeout)
+        queue.cancel()
+        # Batches and promotions first, so none is left waiting on a job cancelled under it
+        background = [task for task in self._background if not task.done()]
+        for task in background:
+            task.cancel()
+        if background:
+            await asyncio.wait(background, timeout=max(deadline - time.monotonic(), 1.0))
+        abandoned = len(background) + await self.jobs.close(timeout=max(deadline - time.monotonic(), 1.0))
+        await self.outbound.flush(deadline - time.monotonic())
+        return abandoned
+
+    async def checkpoint(self, store: SharedStore) -> tuple[int, int]:
+        """
+        Leave pending approvals and builds waiting for Jenkins in `store` for the
+        next process to resume. Returns how many of each.
+        """
+        if store is self.store:
+            return await store.release()   # Kept there all along; only the owner changes
+        approvals = await self.approvals.checkpoint(store)
+        builds = 0
+        for app, cards in self._builds.items():
+            # A line of a batch card goes with its batch, which did not survive
+            for card in cards:
+                if isinstance(card, LiveCard):
+                    await store.add_build(app, self._build_record(card.turn_context, card), owner=RELEASED)
+                    builds += 1
+        return approvals, builds
+
+    async def resume(self, store: SharedStore):
+        """Take over the approvals and build cards a previous process left in `store`."""
+        approvals, builds = await store.adopt(remove=store is not self.store)
+        resumed = {"approval": 0, "build": 0}
+        for approval_id, record, expires_at in approvals:
+            try:
+                await self._resume(ConversationReference.deserialize(record["reference"]),
+                                   partial(self.approvals.adopt, approval_id, record, expires_at))
+                resumed["approval"] += 1
+            except Exception as e:
+                print(f"[STARTUP] Could not resume approval {approval_id}: {e}")
+        for build_id, app, record in builds:
+            if record["card"] is None:
+                continue
+            try:
+                await self._resume(ConversationReference.deserialize(record["reference"]),
+                                   partial(self._adopt_build, build_id, app, record["card"]))
+                resumed["build"] += 1
+            except Exception as e:
+                print(f"[STARTUP] Could not resume the {app} build card: {e}")
+        if approvals or builds:
+            print(f"[STARTUP] Resumed {resumed['approval']} approval(s) and {resumed['build']} build card(s) "
+                  f"left by the previous process")
 
-    async def _handle_deploy(self, turn_context, cmd, user, user_id):
+    async def _adopt_build(self, build_id: int, app: str, card: dict, turn_context: TurnContext):
+        restored = LiveCard.restore(self.outbound, turn_context, card)
+        if self.store is None:
+            self._builds.setdefault(app, deque()).append(restored)
+        else:
+            self._tracked[build_id] = restored
+
+    async def _handle_deploy(self, turn_context, cmd, user, row=None):
         env = cmd.environment
         if env not in settings.APPROVAL_REQUIRED_ENVS:
-            await turn_context.send_activity(
-                MessageFactory.attachment(deploy_triggered_card(app=cmd.app, build=cmd.build_number, env=env, user=user))
-            )
-            result = await self.octopus.deploy(app=cmd.app, build_number=cmd.build_number, environment=env)
+            card = self._live_card(turn_context, OperationCard(
+                kind="deploy", app=cmd.app, build=cmd.build_number, env=env, user=user, stage="deploying"), row)
+            await card.post()
+            result = await self.deploys.deploy(app=cmd.app, build_number=cmd.build_number,
+                                               environment=env, requested_by=user)
+            card.set(**deploy_outcome(result))
             await self.audit.log(user=user, action="deploy", app=cmd.app,
                                  details={"build": cmd.build_number, "env": env}, result=result)
+            self.reads.invalidate(cmd.app)
+            await card.settle()
             return
-        approval_id = await self.approvals.create(
+        # The approval card is posted by the manager and updated in place from then on
+        await self.approvals.create(
             app=cmd.app, build_number=cmd.build_number, environment=env,
             requested_by=user, turn_context=turn_context,
         )
-        await turn_context.send_activity(
-            MessageFactory.attachment(approval_request_card(
-                approval_id=approval_id, app=cmd.app, build=cmd.build_number,
-                env=env, requested_by=user,
-            ))
-        )
+        if row:
+            row.show("⏳ Waiting for approval (see the approval card)")
 
-    async def _handle_status(self, turn_context, cmd, user):
-        status_data = await self.octopus.get_status(app=cmd.app)
-        await turn_context.send_activity(
+    async def _handle_status(self, turn_context, cmd, user, row=None):
+        # Concurrent `status` calls for one app share a single Octopus lookup
+        status_data = await self.reads.get(
+            "status", cmd.app,
+            lambda: self.octopus.get_status(app=cmd.app),
+            cacheable=lambda data: "error" not in data,
+        )
+        if row:
+            if "error" in status_data:
+                row.show(f"❌ {status_data['error']}")
+            else:
+                row.show(" · ".join(f"{env.upper()}: {info.get('release', 'N/A')} {info.get('state', 'Unknown')}"
+                                    for env, info in status_data.items()) or "No deployments found")
+            return
+        await self.outbound.send(
+            turn_context,
             MessageFactory.attachment(status_card(app=cmd.app, data=status_data))
         )
 
-    async def _handle_rollback(self, turn_context, cmd, user):
-        approval_id = await self.approvals.create(
+    async def _handle_rollback(self, turn_context, cmd, user, row=None):
+        await self.approvals.create(
             app=cmd.app, build_number="previous", environment=cmd.environment,
             requested_by=user, turn_context=turn_context, is_rollback=True,
         )
-        await turn_context.send_activity(
-            MessageFactory.attachment(approval_request_card(
-                approval_id=approval_id, app=cmd.app, build="previous",
-                env=cmd.environment, requested_by=user, is_rollback=True,
-            ))
-        )
+        if row:
+            row.show("⏳ Waiting for approval (see the approval card)")
+
+    async def _handle_promote(self, turn_context, cmd, user, row=None):
+        await self.promotions.run(turn_context, cmd.app, cmd.build_number, cmd.stages, user)
 
-    async def _handle_history(self, turn_context, cmd):
-        records = await self.audit.get_history(app=cmd.app, limit=10)
+    async def _handle_history(self, turn_context, cmd, user, row=None):
+        records = await self.reads.get(
+            "history", cmd.app, lambda: self.audit.get_history(app=cmd.app, limit=10),
+        )
+        if row:
+            last = f", last `{records[0]['action']}` by {records[0]['user']} → {records[0]['result']}" if records else ""
+            row.show(f"{len(records)} recent actions{last}")
+            return
         lines = [f"📋 **Last {len(records)} actions for `{cmd.app}`:**\n"]
         for r in records:
             lines.append(f"• `{r['action']}` by **{r['user']}** → {r['result']} _{r['timestamp']}_")
-        await turn_context.send_activity(MessageFactory.text("\n".join(lines)))
\ No newline at end of file
+        await self.outbound.send(turn_context, MessageFactory.text("\n".join(lines)))
\ No newline at end of file
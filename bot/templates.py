@@ -0,0 +1,29 @@
+"""
+bot/templates.py
+The Adaptive Card envelope shared by every card builder.
+
+Dynamic cards (bot/cards.py) are dict-literal builders: CPython builds a literal
+faster than a precompiled template can be filled per call. The parts of a card
+that never change — fixed TextBlocks, action styles — are module-level dicts
+that every rendered card shares, and a card with nothing to fill in (help) is
+built once at import.
+
+Rendered cards share those parts with each other: treat them as read-only.
+"""
+from botbuilder.schema import Attachment
+
+
+ADAPTIVE_CARD_CONTENT_TYPE = "application/vnd.microsoft.card.adaptive"
+ADAPTIVE_CARD_SCHEMA = "http://adaptivecards.io/schemas/adaptive-card.json"
+
+
+def adaptive_card(body: list, actions: list = None) -> Attachment:
+    card = {
+        "type": "AdaptiveCard",
+        "$schema": ADAPTIVE_CARD_SCHEMA,
+        "version": "1.4",
+        "body": body,
+    }
+    if actions:
+        card["actions"] = actions
+    return Attachment(content_type=ADAPTIVE_CARD_CONTENT_TYPE, content=card)
@@ -0,0 +1,132 @@
+"""
+cache/readthrough.py
+Coalescing read cache for slow upstream lookups (`status`, `history`).
+
+  SingleFlight     — concurrent calls for the same key share one in-flight call
+  ReadThroughCache — short-TTL cache with stale-while-revalidate on top of it
+
+Entries are served fresh for `ttl` seconds; for a further `stale` seconds the
+old value is returned immediately while one background refresh runs. After a
+write (deploy / rollback) the bot calls `invalidate(app)`, which drops the
+entries and makes sure a lookup already in flight cannot put pre-deploy data
+back into the cache.
+
+With a shared store (several worker processes), `invalidate(app)` is passed
+on through its change feed, so the other workers drop their copies too.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+from config.settings import settings
+from metrics.registry import REGISTRY
+
+
+LOOKUPS = REGISTRY.counter(
+    "deploybot_read_cache_lookups_total", "Read cache lookups by kind and outcome", ["kind", "outcome"])
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `fn()` unless a call for `key` is already in flight, in which case
+        wait for that one. A cancelled waiter does not cancel the shared call.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+
+class ReadThroughCache:
+
+    def __init__(self, ttl: float = None, stale: float = None, store=None):
+        self.ttl = settings.READ_CACHE_TTL_SECONDS if ttl is None else ttl
+        self.stale = settings.READ_CACHE_STALE_SECONDS if stale is None else stale
+        self._flight = SingleFlight()
+        self._entries: dict[tuple, tuple[float, Any]] = {}   # (kind, app) → (fetched_at, value)
+        self._generation: dict[str, int] = {}                # app → bumped on every invalidate
+        self._outcomes = {}
+        self.store = store
+        if store is not None:
+            store.subscribe("reads", lambda app, _: self._drop(app))
+
+    async def get(
+        self,
+        kind: str,
+        app: str,
+        fetch: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        """
+        Return the cached `kind` result for `app`, fetching it with `fetch()` when
+        missing or expired. Results for which `cacheable(value)` is False (errors)
+        are returned to the caller but not stored.
+        """
+        key = (kind, app)
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self._count(kind, "hit")
+                return entry[1]
+            if age < self.ttl + self.stale:
+                self._count(kind, "stale")
+                if not self._flight.in_flight(self._flight_key(key, app)):
+                    asyncio.ensure_future(self._background_refresh(key, app, fetch, cacheable))
+                return entry[1]
+
+        self._count(kind, "coalesced" if self._flight.in_flight(self._flight_key(key, app)) else "miss")
+        return await self._refresh(key, app, fetch, cacheable)
+
+    def invalidate(self, app: str):
+        """Drop every cached result for `app` (call after a deploy or rollback), in every worker."""
+        self._drop(app)
+        if self.store is not None:
+            self.store.notify("reads", app)
+
+    def _drop(self, app: str):
+        self._generation[app] = self._generation.get(app, 0) + 1
+        for key in [k for k in self._entries if k[1] == app]:
+            del self._entries[key]
+
+    def _flight_key(self, key: tuple, app: str) -> tuple:
+        return key, self._generation.get(app, 0)
+
+    async def _background_refresh(self, key: tuple, app: str, fetch, cacheable):
+        try:
+            await self._refresh(key, app, fetch, cacheable)
+        except Exception as e:
+            self._count(key[0], "refresh_failed")
+            print(f"[CACHE] Background refresh of {key} failed: {e}")
+
+    async def _refresh(self, key: tuple, app: str, fetch, cacheable) -> Any:
+        generation = self._generation.get(app, 0)
+
+        async def load():
+            value = await fetch()
+            # Skip the store if the app was invalidated while we were fetching
+            if cacheable(value) and self._generation.get(app, 0) == generation:
+                self._entries[key] = (time.monotonic(), value)
+            return value
+
+        return await self._flight.do((key, generation), load)
+
+    def _count(self, kind: str, outcome: str):
+        child = self._outcomes.get((kind, outcome))
+        if child is None:
+            child = self._outcomes[(kind, outcome)] = LOOKUPS.labels(kind, outcome)
+        child.inc()
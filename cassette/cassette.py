@@ -0,0 +1,212 @@
+"""
+cassette/cassette.py
+Recorded Jenkins / Octopus HTTP exchanges, for replaying production traffic locally.
+
+A cassette is NDJSON, one exchange per line, gzip-compressed when the path
+ends in .gz:
+
+  {"upstream": "octopus", "method": "GET", "url": ".../api/Spaces-1/projects/Projects-1/releases?take=100",
+   "status": 200, "reason": "OK", "headers": {"Content-Type": "application/json"},
+   "body": "...", "at_ms": 1520.4, "elapsed_ms": 84.2}
+
+at_ms is when the request started, counted from when recording began;
+elapsed_ms is how long the upstream took to answer it.
+
+No credentials are written: request headers are not recorded, and of the
+response headers only those in KEPT_HEADERS are. Bodies that are not UTF-8
+are stored base64-encoded under "body_b64".
+
+Replay matches on upstream, method and path + query. The host is ignored, and
+when no exchange has the exact query (Jenkins' buildWithParameters carries the
+callback URL), the path alone is matched. Repeated requests get their recorded
+exchanges in order, cycling, so a short recording can drive a long benchmark.
+
+    python -m cassette.cassette summary prod-slowdown.ndjson.gz
+"""
+import base64
+import gzip
+import json
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Optional
+from urllib.parse import urlsplit
+
+from config.settings import settings
+
+
+KEPT_HEADERS = {"content-type", "location", "retry-after", "x-jenkins"}
+
+
+class CassetteMiss(Exception):
+    """A replayed request has no recorded exchange."""
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _keys(upstream: str, method: str, url: str) -> tuple[tuple, tuple]:
+    """(exact key on path + query, fallback key on path alone)"""
+    parts = urlsplit(url)
+    target = f"{parts.path}?{parts.query}" if parts.query else parts.path
+    return (upstream, method.upper(), target), (upstream, method.upper(), parts.path)
+
+
+def body_of(exchange: dict) -> bytes:
+    if "body_b64" in exchange:
+        return base64.b64decode(exchange["body_b64"])
+    return exchange.get("body", "").encode("utf-8")
+
+
+class Cassette:
+
+    def __init__(self, path: str, mode: str):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Cassette mode must be record or replay, not `{mode}`")
+        self.path = path
+        self.mode = mode
+        self.exchanges: list[dict] = []
+        self._lock = threading.Lock()   # Jenkins calls record and replay from worker threads
+        self._started = time.perf_counter()
+        self._file = None
+        # key → indexes into self.exchanges, in recorded order
+        self._exact: dict[tuple, list[int]] = defaultdict(list)
+        self._by_path: dict[tuple, list[int]] = defaultdict(list)
+        self._served: Counter = Counter()
+        if mode == "replay":
+            self._load()
+        else:
+            self._file = _open(path, "a")
+
+    def _load(self):
+        try:
+            with _open(self.path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+        except EOFError:
+            # A recording cut off mid-write (the process was killed): keep what was complete
+            print(f"[CASSETTE] {self.path} is truncated; replaying the first {len(self.exchanges)} exchanges")
+
+    def _index(self, exchange: dict):
+        exact, by_path = _keys(exchange["upstream"], exchange["method"], exchange["url"])
+        self._exact[exact].append(len(self.exchanges))
+        self._by_path[by_path].append(len(self.exchanges))
+        self.exchanges.append(exchange)
+
+    # ─────────────────────────────────────────────────────────────
+    # Recording
+    # ─────────────────────────────────────────────────────────────
+    def record(self, upstream: str, method: str, url: str, status: int, reason: str, headers,
+               body: bytes, started: float, elapsed: float):
+        """Append one exchange. `started` is a perf_counter() reading, `elapsed` in seconds."""
+        exchange = {
+            "upstream": upstream,
+            "method": method.upper(),
+            "url": url,
+            "status": status,
+            "reason": reason,
+            "headers": {k: v for k, v in headers.items() if k.lower() in KEPT_HEADERS},
+            "at_ms": round((started - self._started) * 1000, 1),
+            "elapsed_ms": round(elapsed * 1000, 1),
+        }
+        try:
+            exchange["body"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            exchange["body_b64"] = base64.b64encode(body).decode("ascii")
+        line = json.dumps(exchange, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            if not self.path.endswith(".gz"):
+                self._file.flush()   # Plain files stay complete if the bot is killed
+            self.exchanges.append(exchange)
+
+    # ─────────────────────────────────────────────────────────────
+    # Replay
+    # ─────────────────────────────────────────────────────────────
+    def match(self, upstream: str, method: str, url: str) -> dict:
+        """The next recorded exchange for this request. Raises CassetteMiss if there is none."""
+        exact, by_path = _keys(upstream, method, url)
+        if exact in self._exact:
+            key, options = ("exact", exact), self._exact[exact]
+        else:
+            key, options = ("path", by_path), self._by_path.get(by_path)
+        if not options:
+            raise CassetteMiss(f"No recorded {upstream} exchange for {method.upper()} {exact[2]}")
+        with self._lock:
+            index = options[self._served[key] % len(options)]
+            self._served[key] += 1
+        return self.exchanges[index]
+
+    def delay(self, exchange: dict) -> float:
+        """Seconds to wait before answering with `exchange`, per CASSETTE_TIME_SCALE."""
+        return exchange.get("elapsed_ms", 0) / 1000 * settings.CASSETTE_TIME_SCALE
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ─────────────────────────────────────────────────────────────
+    # Summary
+    # ─────────────────────────────────────────────────────────────
+    def summary(self) -> list[dict]:
+        """Per upstream / method / path: count, latency and response size, slowest total first."""
+        groups = defaultdict(list)
+        for exchange in self.exchanges:
+            groups[_keys(exchange["upstream"], exchange["method"], exchange["url"])[1]].append(exchange)
+        rows = []
+        for (upstream, method, path), exchanges in groups.items():
+            elapsed = sorted(e.get("elapsed_ms", 0) for e in exchanges)
+            rows.append({
+                "upstream": upstream,
+                "request": f"{method} {path}",
+                "count": len(exchanges),
+                "p50_ms": elapsed[len(elapsed) // 2],
+                "max_ms": elapsed[-1],
+                "total_ms": round(sum(elapsed), 1),
+                "mean_kb": round(sum(len(body_of(e)) for e in exchanges) / len(exchanges) / 1024, 1),
+                "errors": sum(1 for e in exchanges if e["status"] >= 400),
+            })
+        return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+
+# ─────────────────────────────────────────────────────────────
+# The cassette chosen by CASSETTE_MODE / CASSETTE_PATH, shared by both clients
+# ─────────────────────────────────────────────────────────────
+_active: Optional[Cassette] = None
+
+
+def active_cassette() -> Optional[Cassette]:
+    """The configured cassette, opened on first use; None when CASSETTE_MODE is unset."""
+    global _active
+    if _active is None and settings.CASSETTE_MODE:
+        if not settings.CASSETTE_PATH:
+            raise ValueError("CASSETTE_MODE is set but CASSETTE_PATH is not")
+        _active = Cassette(settings.CASSETTE_PATH, settings.CASSETTE_MODE)
+        print(f"[CASSETTE] {settings.CASSETTE_MODE.capitalize()}ing upstream exchanges "
+              f"{'to' if _active.mode == 'record' else 'from'} {settings.CASSETTE_PATH}")
+    return _active
+
+
+def close_active_cassette():
+    global _active
+    if _active is not None:
+        _active.close()
+        _active = None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "summary":
+        sys.exit("usage: python -m cassette.cassette summary CASSETTE")
+    rows = Cassette(sys.argv[2], "replay").summary()
+    print(f"{'upstream':<10} {'request':<60} {'count':>6} {'p50 ms':>8} {'max ms':>8} {'total ms':>10} "
+          f"{'mean KB':>8} {'errors':>6}")
+    for r in rows:
+        print(f"{r['upstream']:<10} {r['request'][:60]:<60} {r['count']:>6} {r['p50_ms']:>8} {r['max_ms']:>8} "
+              f"{r['total_ms']:>10} {r['mean_kb']:>8} {r['errors']:>6}")
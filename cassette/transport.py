@@ -0,0 +1,160 @@
+"""
+cassette/transport.py
+The HTTP transports the upstream clients send through, so a cassette can sit
+between them and the network:
+
+  OctopusClient  — aiohttp; takes a `transport` with
+                   `async request(method, url, headers, payload) -> HttpResponse`
+                   (AiohttpTransport, RecordingTransport or ReplayTransport)
+  JenkinsClient  — python-jenkins uses a requests Session; takes a requests
+                   transport adapter (RecordingAdapter or ReplayAdapter)
+
+octopus_transport() / jenkins_adapter() pick the right one for CASSETTE_MODE.
+"""
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import aiohttp
+import requests
+from multidict import CIMultiDict, CIMultiDictProxy
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from yarl import URL
+
+from cassette.cassette import Cassette, active_cassette, body_of
+
+
+@dataclass
+class HttpResponse:
+    method: str
+    url: str
+    status: int
+    reason: str = ""
+    headers: dict = field(default_factory=dict)
+    body: bytes = b""
+
+    def raise_for_status(self):
+        """Raise aiohttp.ClientResponseError for 4xx/5xx, as aiohttp's own response would."""
+        if self.status >= 400:
+            headers = CIMultiDictProxy(CIMultiDict(self.headers))
+            info = aiohttp.RequestInfo(URL(self.url), self.method, CIMultiDictProxy(CIMultiDict()), URL(self.url))
+            raise aiohttp.ClientResponseError(info, (), status=self.status, message=self.reason, headers=headers)
+
+    def json(self):
+        return json.loads(self.body) if self.body else None
+
+
+# ─────────────────────────────────────────────────────────────
+# aiohttp side (Octopus)
+# ─────────────────────────────────────────────────────────────
+class AiohttpTransport:
+    """Straight to the network."""
+
+    def __init__(self, timeout: aiohttp.ClientTimeout = None):
+        self.timeout = timeout or aiohttp.ClientTimeout()
+
+    async def request(self, method: str, url: str, headers: dict, payload: dict = None) -> HttpResponse:
+        async with aiohttp.ClientSession(headers=headers, timeout=self.timeout) as session:
+            async with session.request(method, url, json=payload) as resp:
+                return HttpResponse(method, url, resp.status, resp.reason or "", dict(resp.headers),
+                                    await resp.read())
+
+
+class RecordingTransport:
+    """Passes requests on to `inner` and writes each exchange to the cassette."""
+
+    def __init__(self, cassette: Cassette, upstream: str, inner=None):
+        self.cassette = cassette
+        self.upstream = upstream
+        self.inner = inner or AiohttpTransport()
+
+    async def request(self, method: str, url: str, headers: dict, payload: dict = None) -> HttpResponse:
+        started = time.perf_counter()
+        resp = await self.inner.request(method, url, headers, payload)
+        self.cassette.record(self.upstream, method, url, resp.status, resp.reason, resp.headers, resp.body,
+                             started, time.perf_counter() - started)
+        return resp
+
+
+class ReplayTransport:
+    """Answers from the cassette, after the recorded latency (scaled)."""
+
+    def __init__(self, cassette: Cassette, upstream: str):
+        self.cassette = cassette
+        self.upstream = upstream
+
+    async def request(self, method: str, url: str, headers: dict, payload: dict = None) -> HttpResponse:
+        exchange = self.cassette.match(self.upstream, method, url)
+        delay = self.cassette.delay(exchange)
+        if delay:
+            await asyncio.sleep(delay)
+        return HttpResponse(method, url, exchange["status"], exchange.get("reason", ""),
+                            dict(exchange.get("headers", {})), body_of(exchange))
+
+
+def octopus_transport(timeout: aiohttp.ClientTimeout = None):
+    cassette = active_cassette()
+    if cassette is None:
+        return AiohttpTransport(timeout)
+    if cassette.mode == "record":
+        return RecordingTransport(cassette, "octopus", AiohttpTransport(timeout))
+    return ReplayTransport(cassette, "octopus")
+
+
+# ─────────────────────────────────────────────────────────────
+# requests side (Jenkins) — these run on the "jenkins" BoundedExecutor threads (resilience/executors.py)
+# ─────────────────────────────────────────────────────────────
+class RecordingAdapter(HTTPAdapter):
+
+    def __init__(self, cassette: Cassette, upstream: str):
+        super().__init__()
+        self.cassette = cassette
+        self.upstream = upstream
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        self.cassette.record(self.upstream, request.method, request.url, response.status_code,
+                             response.reason or "", response.headers, response.content,
+                             started, time.perf_counter() - started)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+
+    def __init__(self, cassette: Cassette, upstream: str):
+        super().__init__()
+        self.cassette = cassette
+        self.upstream = upstream
+
+    def send(self, request, **kwargs):
+        exchange = self.cassette.match(self.upstream, request.method, request.url)
+        delay = self.cassette.delay(exchange)
+        if delay:
+            time.sleep(delay)
+        response = requests.Response()
+        response.status_code = exchange["status"]
+        response.reason = exchange.get("reason", "")
+        response.headers = CaseInsensitiveDict(exchange.get("headers", {}))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body_of(exchange)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def jenkins_adapter() -> Optional[BaseAdapter]:
+    """The adapter to mount on python-jenkins' session, or None to leave it on the network."""
+    cassette = active_cassette()
+    if cassette is None:
+        return None
+    if cassette.mode == "record":
+        return RecordingAdapter(cassette, "jenkins")
+    return ReplayAdapter(cassette, "jenkins")
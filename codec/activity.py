@@ -0,0 +1,73 @@
+"""
+codec/activity.py
+Incoming activity decoding for /api/messages.
+
+Activity().deserialize walks the whole msrest model for every field Teams
+sends (~300us for a typical message). The bot and the adapter only read a
+handful of them, so message and invoke activities are built straight from
+the JSON instead (~10us): the fields in _FIELDS and the accounts are mapped,
+the ones in _SKIPPED (timestamps, entities, formatting hints) are left out.
+Any other activity type, or a field outside both sets (attachments,
+membersAdded, ...), goes through full deserialization as before.
+"""
+from botbuilder.schema import Activity, ActivityTypes, ChannelAccount, ConversationAccount
+
+from config.settings import settings
+from metrics.registry import REGISTRY
+
+
+ACTIVITY_DECODES = REGISTRY.counter(
+    "deploybot_activity_decodes_total", "Incoming activities by how they were decoded", ["path"])
+_LEAN, _FULL = ACTIVITY_DECODES.labels("lean"), ACTIVITY_DECODES.labels("full")
+
+_LEAN_TYPES = {ActivityTypes.message, ActivityTypes.invoke}
+
+# JSON name → Activity attribute, for plain values
+_FIELDS = {
+    "type": "type",
+    "id": "id",
+    "text": "text",
+    "value": "value",
+    "name": "name",
+    "channelId": "channel_id",
+    "serviceUrl": "service_url",
+    "replyToId": "reply_to_id",
+    "locale": "locale",
+    "deliveryMode": "delivery_mode",
+    "channelData": "channel_data",
+}
+_ACCOUNTS = {"from": "from_property", "recipient": "recipient", "conversation": "conversation"}
+_SKIPPED = {"timestamp", "localTimestamp", "localTimezone", "entities", "textFormat", "attachmentLayout"}
+_KNOWN = set(_FIELDS) | set(_ACCOUNTS) | _SKIPPED
+
+
+def _account(data: dict) -> ChannelAccount:
+    return ChannelAccount(id=data.get("id"), name=data.get("name"), aad_object_id=data.get("aadObjectId"),
+                          role=data.get("role"))
+
+
+def _conversation(data: dict) -> ConversationAccount:
+    return ConversationAccount(id=data.get("id"), name=data.get("name"), is_group=data.get("isGroup"),
+                               conversation_type=data.get("conversationType"), tenant_id=data.get("tenantID"),
+                               aad_object_id=data.get("aadObjectId"), role=data.get("role"))
+
+
+def _leanable(body) -> bool:
+    if not isinstance(body, dict) or body.get("type") not in _LEAN_TYPES or not _KNOWN.issuperset(body):
+        return False
+    return all(isinstance(body.get(key), (dict, type(None))) for key in _ACCOUNTS)
+
+
+def decode_activity(body) -> Activity:
+    if settings.FAST_CODEC and _leanable(body):
+        _LEAN.inc()
+        activity = Activity(**{attr: body[key] for key, attr in _FIELDS.items() if key in body})
+        if body.get("from") is not None:
+            activity.from_property = _account(body["from"])
+        if body.get("recipient") is not None:
+            activity.recipient = _account(body["recipient"])
+        if body.get("conversation") is not None:
+            activity.conversation = _conversation(body["conversation"])
+        return activity
+    _FULL.inc()
+    return Activity().deserialize(body)
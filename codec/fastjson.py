@@ -0,0 +1,42 @@
+"""
+codec/fastjson.py
+JSON for the /api/messages request and response paths: orjson when it is
+installed and FAST_CODEC is on, the stdlib json module otherwise.
+
+orjson is optional — `pip install orjson` to enable it.
+"""
+import json
+
+from aiohttp import web
+
+from config.settings import settings
+
+try:
+    import orjson
+except ImportError:   # Optional dependency
+    orjson = None
+
+
+def fast() -> bool:
+    return orjson is not None and settings.FAST_CODEC
+
+
+def loads(data: bytes):
+    """Parse a request body. Raises ValueError on invalid JSON, whichever parser is used."""
+    if fast():
+        return orjson.loads(data)   # orjson.JSONDecodeError is a ValueError
+    return json.loads(data)
+
+
+def dumps(obj) -> bytes:
+    if fast():
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass   # Something orjson will not serialise (e.g. non-str keys): the stdlib's rules apply
+    return json.dumps(obj).encode()
+
+
+def json_response(data, status: int = 200) -> web.Response:
+    """web.json_response, encoded with dumps()."""
+    return web.Response(body=dumps(data), status=status, content_type="application/json")
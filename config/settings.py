@@ -28,6 +28,138 @@ class Settings:
     # Approval
     APPROVAL_TIMEOUT_MINUTES: int = int(os.getenv("APPROVAL_TIMEOUT_MINUTES", "30"))
 
+    # Command queue — slow commands run on a bounded background worker pool
+    COMMAND_WORKERS: int = int(os.getenv("COMMAND_WORKERS", "8"))
+    COMMAND_QUEUE_SIZE: int = int(os.getenv("COMMAND_QUEUE_SIZE", "200"))
+    # A queued command's Jenkins / Octopus calls are cut short once it is this old (0 = no limit).
+    # `promote` and multi-command coordinators wait on purpose and have no deadline
+    COMMAND_DEADLINE_SECONDS: float = float(os.getenv("COMMAND_DEADLINE_SECONDS", "120"))
+
+    # Upstream calls — connect / read timeouts per upstream; idempotent GETs are retried up to
+    # UPSTREAM_RETRIES times with jittered backoff; after UPSTREAM_BREAKER_FAILURES faults in a row
+    # an upstream's circuit opens and its calls fail fast for UPSTREAM_BREAKER_RESET_SECONDS
+    JENKINS_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("JENKINS_CONNECT_TIMEOUT_SECONDS", "5"))
+    JENKINS_READ_TIMEOUT_SECONDS: float = float(os.getenv("JENKINS_READ_TIMEOUT_SECONDS", "30"))
+    OCTOPUS_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("OCTOPUS_CONNECT_TIMEOUT_SECONDS", "5"))
+    OCTOPUS_READ_TIMEOUT_SECONDS: float = float(os.getenv("OCTOPUS_READ_TIMEOUT_SECONDS", "30"))
+    UPSTREAM_RETRIES: int = int(os.getenv("UPSTREAM_RETRIES", "2"))
+    UPSTREAM_RETRY_BACKOFF_SECONDS: float = float(os.getenv("UPSTREAM_RETRY_BACKOFF_SECONDS", "0.5"))
+    UPSTREAM_BREAKER_FAILURES: int = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+    UPSTREAM_BREAKER_RESET_SECONDS: float = float(os.getenv("UPSTREAM_BREAKER_RESET_SECONDS", "30"))
+
+    # Thread pools for blocking work, one per subsystem (python-jenkins calls; audit / idempotency
+    # SQLite queries). Once WORKERS calls run and QUEUE more wait, further calls wait for a slot
+    # (ON_FULL=wait) or fail straight away (ON_FULL=reject)
+    JENKINS_EXECUTOR_WORKERS: int = int(os.getenv("JENKINS_EXECUTOR_WORKERS", "8"))
+    JENKINS_EXECUTOR_QUEUE: int = int(os.getenv("JENKINS_EXECUTOR_QUEUE", "32"))
+    JENKINS_EXECUTOR_ON_FULL: str = os.getenv("JENKINS_EXECUTOR_ON_FULL", "wait")
+    SQLITE_EXECUTOR_WORKERS: int = int(os.getenv("SQLITE_EXECUTOR_WORKERS", "4"))
+    SQLITE_EXECUTOR_QUEUE: int = int(os.getenv("SQLITE_EXECUTOR_QUEUE", "200"))
+    SQLITE_EXECUTOR_ON_FULL: str = os.getenv("SQLITE_EXECUTOR_ON_FULL", "wait")
+
+    # Idempotency — remembers handled activity IDs so Bot Framework retries are not re-run.
+    # They are shared between worker processes through IDEMPOTENCY_DB_PATH, or STATE_DB_PATH if unset.
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
+    IDEMPOTENCY_MAX_ENTRIES: int = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+    IDEMPOTENCY_DB_PATH: str = os.getenv("IDEMPOTENCY_DB_PATH", "")
+
+    # Read cache for `status` / `history` — fresh for TTL, then served stale while refreshing
+    READ_CACHE_TTL_SECONDS: float = float(os.getenv("READ_CACHE_TTL_SECONDS", "5"))
+    READ_CACHE_STALE_SECONDS: float = float(os.getenv("READ_CACHE_STALE_SECONDS", "30"))
+
+    # Outbound messages — per-conversation pacing to stay under Teams throttling. With
+    # WEB_CONCURRENCY workers each one paces a conversation at a WEB_CONCURRENCY-th of the
+    # rate and burst, so together they stay under it
+    OUTBOUND_RATE_PER_SECOND: float = float(os.getenv("OUTBOUND_RATE_PER_SECOND", "2"))
+    OUTBOUND_BURST: int = int(os.getenv("OUTBOUND_BURST", "7"))
+    OUTBOUND_QUEUE_LIMIT: int = int(os.getenv("OUTBOUND_QUEUE_LIMIT", "100"))
+    OUTBOUND_MAX_RETRIES: int = int(os.getenv("OUTBOUND_MAX_RETRIES", "5"))
+
+    # Cards for long-running operations are edited in place; quick transitions within
+    # this window collapse into one update
+    CARD_UPDATE_DEBOUNCE_SECONDS: float = float(os.getenv("CARD_UPDATE_DEBOUNCE_SECONDS", "1.0"))
+
+    # Multi-command messages ("build api main; build web main") — commands for different
+    # apps run concurrently up to BATCH_CONCURRENCY, commands for the same app in order
+    BATCH_MAX_COMMANDS: int = int(os.getenv("BATCH_MAX_COMMANDS", "10"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+    # `promote` — how often to poll Octopus for a stage's result, and how long a stage may run
+    PROMOTE_POLL_SECONDS: float = float(os.getenv("PROMOTE_POLL_SECONDS", "10"))
+    PROMOTE_STAGE_TIMEOUT_MINUTES: int = int(os.getenv("PROMOTE_STAGE_TIMEOUT_MINUTES", "60"))
+
+    # Diagnostics — how often the event-loop lag is sampled (see /metrics), and the
+    # window its percentiles in /health cover
+    LOOP_MONITOR_INTERVAL_SECONDS: float = float(os.getenv("LOOP_MONITOR_INTERVAL_SECONDS", "0.5"))
+    LOOP_LAG_WINDOW_SECONDS: float = float(os.getenv("LOOP_LAG_WINDOW_SECONDS", "60"))
+    # A callback holding the loop longer than this gets its stack recorded (0 = off)
+    LOOP_SLOW_CALLBACK_MS: float = float(os.getenv("LOOP_SLOW_CALLBACK_MS", "100"))
+    # /health?ready=1 fails while the median lag over the window stays above the limit
+    LOOP_LAG_READY_LIMIT_MS: float = float(os.getenv("LOOP_LAG_READY_LIMIT_MS", "250"))
+    LOOP_LAG_READY_WINDOW_SECONDS: float = float(os.getenv("LOOP_LAG_READY_WINDOW_SECONDS", "10"))
+
+    # Tracing — the last TRACE_BUFFER_SIZE command traces are kept for /debug/traces;
+    # set TRACE_EXPORT_PATH to also append them to a file as OTLP JSON
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACE_BUFFER_SIZE: int = int(os.getenv("TRACE_BUFFER_SIZE", "500"))
+    TRACE_EXPORT_PATH: str = os.getenv("TRACE_EXPORT_PATH", "")
+
+    # /ready — per-dependency probe timeout, and how long results are reused between probes
+    READY_PROBE_TIMEOUT_SECONDS: float = float(os.getenv("READY_PROBE_TIMEOUT_SECONDS", "2"))
+    READY_CACHE_SECONDS: float = float(os.getenv("READY_CACHE_SECONDS", "5"))
+
+    # /debug/profile — needs `Authorization: Bearer <DEBUG_ADMIN_TOKEN>`; disabled while unset
+    DEBUG_ADMIN_TOKEN: str = os.getenv("DEBUG_ADMIN_TOKEN", "")
+    PROFILE_MAX_SECONDS: int = int(os.getenv("PROFILE_MAX_SECONDS", "300"))
+    PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "10"))
+    PROFILE_ALLOC_FRAMES: int = int(os.getenv("PROFILE_ALLOC_FRAMES", "25"))
+
+    # /api/messages fast path — orjson (when installed) for request and response JSON, and
+    # a lean decoder for the activity fields the bot reads; false = stdlib json + msrest
+    FAST_CODEC: bool = os.getenv("FAST_CODEC", "true").lower() == "true"
+
+    # Bot Framework tokens on /api/messages — verified tokens are reused until they expire,
+    # rejected ones are refused without re-checking for AUTH_REJECT_CACHE_SECONDS, and the
+    # OpenID signing keys are refetched in the background every AUTH_KEYS_REFRESH_HOURS
+    # (botbuilder would otherwise refetch them on the request path once they are a day old)
+    AUTH_TOKEN_CACHE_SIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "1000"))
+    AUTH_REJECT_CACHE_SECONDS: float = float(os.getenv("AUTH_REJECT_CACHE_SECONDS", "60"))
+    AUTH_KEYS_REFRESH_HOURS: float = float(os.getenv("AUTH_KEYS_REFRESH_HOURS", "6"))
+
+    # Upstream cassettes — CASSETTE_MODE=record appends every Jenkins/Octopus exchange to
+    # CASSETTE_PATH (NDJSON, gzipped if it ends in .gz); CASSETTE_MODE=replay answers from
+    # it without network, each response delayed by its recorded latency × CASSETTE_TIME_SCALE
+    # (1 = original timing, 0 = instant)
+    CASSETTE_MODE: str = os.getenv("CASSETTE_MODE", "")
+    CASSETTE_PATH: str = os.getenv("CASSETTE_PATH", "")
+    CASSETTE_TIME_SCALE: float = float(os.getenv("CASSETTE_TIME_SCALE", "1.0"))
+
+    # Worker processes — `python app.py` forks WEB_CONCURRENCY workers that share the port
+    # (SO_REUSEPORT); gunicorn reads the same variable. Approvals, tracked builds, idempotency
+    # keys and cache invalidations are then shared through STATE_DB_PATH (SQLite, WAL mode),
+    # and each worker polls it for other workers' changes every STATE_POLL_SECONDS
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    STATE_DB_PATH: str = os.getenv("STATE_DB_PATH", "state.db" if WEB_CONCURRENCY > 1 else "")
+    STATE_POLL_SECONDS: float = float(os.getenv("STATE_POLL_SECONDS", "0.5"))
+    STATE_BUSY_TIMEOUT_SECONDS: float = float(os.getenv("STATE_BUSY_TIMEOUT_SECONDS", "5"))
+    # Each worker also publishes its metrics there every METRICS_PUBLISH_SECONDS, so /metrics
+    # lists every worker's samples (labelled worker="host:pid") whichever worker the scrape reaches
+    METRICS_PUBLISH_SECONDS: float = float(os.getenv("METRICS_PUBLISH_SECONDS", "5"))
+    # Deploys to one environment wait their turn in STATE_DB_PATH whichever worker took them;
+    # a worker that stops renewing its place for DEPLOY_LEASE_SECONDS (it died) loses it.
+    # Keep it above COMMAND_DEADLINE_SECONDS, so a deploy still running is never overtaken
+    DEPLOY_LEASE_SECONDS: float = float(os.getenv("DEPLOY_LEASE_SECONDS", "300"))
+
+    # Shutdown — on SIGTERM running commands get SHUTDOWN_DRAIN_SECONDS to finish (keep it under
+    # the platform's stop timeout, e.g. docker stop -t or gunicorn --graceful-timeout). Pending
+    # approvals and tracked builds are left in CHECKPOINT_PATH and picked up by the next process
+    # to start: STATE_DB_PATH when that is set, else checkpoint.db next to audit.db (SQLite; keep
+    # it on a volume that outlives the process). CHECKPOINT_PATH=off drops them on restart instead
+    SHUTDOWN_DRAIN_SECONDS: float = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "20"))
+    CHECKPOINT_PATH: str = os.getenv("CHECKPOINT_PATH", STATE_DB_PATH or "checkpoint.db")
+    if CHECKPOINT_PATH.lower() == "off":
+        CHECKPOINT_PATH = ""
+
     # Callback
     BOT_CALLBACK_URL: str = os.getenv("BOT_CALLBACK_URL", "")
 
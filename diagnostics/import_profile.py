@@ -0,0 +1,70 @@
+"""
+diagnostics/import_profile.py
+`python app.py --import-profile` — where startup time goes.
+
+Runs a fresh interpreter under `-X importtime` that imports app.py (everything
+loaded before the port is bound), then the modules warm_up() loads in the
+background, and reports each phase's total and its slowest imports.
+"""
+import os
+import subprocess
+import sys
+
+MARKER = "deploybot-import-profile: warm-up"
+
+_SCRIPT = f"""
+import importlib, sys
+import app
+print({MARKER!r}, file=sys.stderr, flush=True)
+for name in app.WARM_UP_MODULES:
+    importlib.import_module(name)
+"""
+
+
+def parse(lines: list[str]) -> list[dict]:
+    """`import time: self | cumulative | name` lines → [{module, self_us, cumulative_us, depth}]"""
+    rows = []
+    for line in lines:
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        rows.append({
+            "module": name.strip(),
+            "self_us": int(own),
+            "cumulative_us": int(cumulative),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+        })
+    return rows
+
+
+def measure() -> dict:
+    """{"startup": rows, "warm_up": rows} from a fresh interpreter."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _SCRIPT], cwd=root,
+                          capture_output=True, text=True)
+    lines = proc.stderr.splitlines()
+    if proc.returncode != 0 or MARKER not in lines:
+        raise RuntimeError(f"Import profile run failed:\n{proc.stderr[-2000:]}")
+    split = lines.index(MARKER)
+    return {"startup": parse(lines[:split]), "warm_up": parse(lines[split + 1:])}
+
+
+def report(top: int = 15) -> str:
+    phases = measure()
+    out = []
+    titles = {"startup": "Before the port is bound (import app)",
+              "warm_up": "Background warm-up (after the port is bound)"}
+    for phase, rows in phases.items():
+        total = sum(r["cumulative_us"] for r in rows if r["depth"] == 0)
+        out.append(f"{titles[phase]}: {total / 1000:.0f} ms, {len(rows)} modules")
+        out.append(f"  {'cumulative':>10}  {'self':>8}  module")
+        # Top-level imports and their biggest children, by cumulative time
+        for r in sorted((r for r in rows if r["depth"] <= 1), key=lambda r: r["cumulative_us"], reverse=True)[:top]:
+            out.append(f"  {r['cumulative_us'] / 1000:>8.1f}ms  {r['self_us'] / 1000:>6.1f}ms  "
+                       f"{'  ' * r['depth']}{r['module']}")
+        out.append("")
+    everything = [r for rows in phases.values() for r in rows]
+    out.append("Slowest modules by their own import time:")
+    for r in sorted(everything, key=lambda r: r["self_us"], reverse=True)[:top]:
+        out.append(f"  {r['self_us'] / 1000:>8.1f}ms  {r['module']}")
+    return "\n".join(out)
@@ -0,0 +1,159 @@
+"""
+diagnostics/loop_monitor.py
+Measures event-loop lag — how late a timer fires compared to when it was due —
+and catches the callbacks that cause it.
+
+Everything in the bot shares one event loop, so a blocking call anywhere (a
+synchronous SQLite query, a CPU-heavy render) delays every other conversation.
+
+  - Lag is sampled every LOOP_MONITOR_INTERVAL_SECONDS by a background task;
+    the last LOOP_LAG_WINDOW_SECONDS of samples give the percentiles in /health.
+  - A watchdog thread pings the loop; when a ping is not answered within
+    LOOP_SLOW_CALLBACK_MS, the loop thread's stack is recorded — that is the
+    code holding the loop — along with how long the stall lasted (measured
+    from the unanswered ping, so a lower bound).
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+from config.settings import settings
+from metrics.registry import REGISTRY
+
+
+LOOP_LAG = REGISTRY.histogram(
+    "deploybot_event_loop_lag_seconds", "How late event-loop timers fire",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+LOOP_LAG_LAST = REGISTRY.gauge(
+    "deploybot_event_loop_lag_last_seconds", "Most recent event-loop lag sample")
+SLOW_CALLBACKS = REGISTRY.counter(
+    "deploybot_event_loop_slow_callbacks_total", "Times one callback held the event loop past LOOP_SLOW_CALLBACK_MS")
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class SlowCallbackDetector(threading.Thread):
+    """Watchdog thread that records the loop thread's stack whenever the loop stops answering."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, threshold: float, keep: int = 20):
+        super().__init__(name="deploybot-loop-watchdog", daemon=True)
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self.threshold = threshold
+        self.recent: deque[dict] = deque(maxlen=keep)   # Latest stalls, oldest first
+        self.count = 0
+        self._halt = threading.Event()
+
+    def stop(self):
+        self._halt.set()
+
+    def run(self):
+        while not self._halt.is_set():
+            answered = threading.Event()
+            sent = time.perf_counter()
+            try:
+                self.loop.call_soon_threadsafe(answered.set)
+            except RuntimeError:
+                return   # Loop closed
+            if answered.wait(self.threshold):
+                self._halt.wait(self.threshold)
+                continue
+
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = traceback.format_list(traceback.extract_stack(frame)[-12:]) if frame else []
+            while not answered.wait(0.05) and not self._halt.is_set():
+                pass
+            self._record(time.perf_counter() - sent, stack)
+
+    def _record(self, seconds: float, stack: list[str]):
+        self.count += 1
+        SLOW_CALLBACKS.inc()
+        where = stack[-1].strip().splitlines()[0] if stack else "unknown"
+        print(f"[LOOP] Event loop blocked for at least {seconds * 1000:.0f} ms at {where}")
+        self.recent.append({
+            "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "blocked_ms": round(seconds * 1000, 1),
+            "stack": [line.rstrip() for line in stack],
+        })
+
+
+class LoopMonitor:
+
+    def __init__(self, interval: float = None):
+        self.interval = interval or settings.LOOP_MONITOR_INTERVAL_SECONDS
+        self.last = 0.0
+        # (loop time, lag) for the last LOOP_LAG_WINDOW_SECONDS
+        self.samples: deque[tuple[float, float]] = deque(
+            maxlen=max(1, int(settings.LOOP_LAG_WINDOW_SECONDS / self.interval)))
+        self.detector: Optional[SlowCallbackDetector] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        if settings.LOOP_SLOW_CALLBACK_MS and (self.detector is None or not self.detector.is_alive()):
+            self.detector = SlowCallbackDetector(asyncio.get_running_loop(), settings.LOOP_SLOW_CALLBACK_MS / 1000)
+            self.detector.start()
+
+    async def stop(self):
+        if self.detector is not None:
+            self.detector.stop()
+            self.detector = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            lag = max(0.0, now - due)
+            self.last = lag
+            self.samples.append((now, lag))
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_LAST.set(lag)
+
+    # ─────────────────────────────────────────────────────────────
+    # Reporting — /health
+    # ─────────────────────────────────────────────────────────────
+    def _lags(self, window: float = None) -> list[float]:
+        if window is None:
+            return sorted(lag for _, lag in self.samples)
+        since = asyncio.get_running_loop().time() - window
+        return sorted(lag for at, lag in self.samples if at >= since)
+
+    def snapshot(self) -> dict:
+        lags = self._lags()
+        report = {"samples": len(lags)}
+        if lags:
+            report["lag_ms"] = {
+                "p50": round(_percentile(lags, 0.50) * 1000, 2),
+                "p95": round(_percentile(lags, 0.95) * 1000, 2),
+                "p99": round(_percentile(lags, 0.99) * 1000, 2),
+                "max": round(lags[-1] * 1000, 2),
+            }
+        if self.detector is not None:
+            report["slow_callbacks"] = self.detector.count
+            report["recent_slow_callbacks"] = list(self.detector.recent)[-3:]
+        return report
+
+    def lagging(self) -> Optional[str]:
+        """Why the loop counts as overloaded, or None: median lag over the readiness window above the limit."""
+        lags = self._lags(settings.LOOP_LAG_READY_WINDOW_SECONDS)
+        limit = settings.LOOP_LAG_READY_LIMIT_MS / 1000
+        if lags and _percentile(lags, 0.5) > limit:
+            return (f"event-loop lag p50 {_percentile(lags, 0.5) * 1000:.0f} ms over the last "
+                    f"{settings.LOOP_LAG_READY_WINDOW_SECONDS:g}s (limit {settings.LOOP_LAG_READY_LIMIT_MS:g} ms)")
+        return None
@@ -0,0 +1,164 @@
+"""
+diagnostics/profiler.py
+On-demand profiling of the running bot — served by /debug/profile.
+
+  cpu   — a background thread samples the stacks of the event-loop thread,
+          the asyncio.to_thread workers and the bounded executors' threads
+          (resilience/executors.py) every PROFILE_SAMPLE_INTERVAL_MS
+          (sys._current_frames, so nothing is hooked into the code being run).
+          Idle pool threads are skipped; an idle event loop shows up as
+          time in `select`.
+  alloc — tracemalloc snapshots at the start and end of the window; the result
+          is the memory that was allocated and is still held, by call stack.
+
+Both return collapsed stacks ("frame;frame;frame count" per line), which
+flamegraph.pl, speedscope and most flame-graph viewers read as-is. CPU counts
+are samples, alloc counts are bytes.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from config.settings import settings
+from resilience.executors import THREAD_PREFIX
+
+
+class ProfilerBusy(Exception):
+    """Another profile is already running."""
+
+
+_lock = threading.Lock()
+
+# Longest sys.path prefixes first, so frames read "aiohttp/client.py" rather than a full path
+_PATH_PREFIXES = sorted({os.path.join(os.path.abspath(p), "") for p in sys.path if p}, key=len, reverse=True)
+
+_POOL_WORKER_FILE = os.path.join("concurrent", "futures", "thread.py")
+
+
+def _short(filename: str) -> str:
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+async def profile(mode: str, seconds: float) -> str:
+    """Profile for `seconds` in `mode` ("cpu" or "alloc"). Raises ProfilerBusy if one is running."""
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        if mode == "alloc":
+            return await _profile_alloc(seconds)
+        return await _profile_cpu(seconds)
+    finally:
+        _lock.release()
+
+
+# ─────────────────────────────────────────────────────────────
+# CPU — stack sampling
+# ─────────────────────────────────────────────────────────────
+class _Sampler(threading.Thread):
+
+    def __init__(self, loop_thread_id: int, interval: float):
+        super().__init__(name="deploybot-profiler", daemon=True)
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._halt = threading.Event()
+        self._labels: dict = {}   # code object → "function (file:line)"
+
+    def stop(self):
+        self._halt.set()
+
+    def run(self):
+        while not self._halt.wait(self.interval):
+            threads = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                name = threads.get(thread_id, "")
+                if thread_id == self.loop_thread_id:
+                    root = "event-loop"
+                elif name.startswith("asyncio_"):
+                    root = "to_thread"
+                elif name.startswith(THREAD_PREFIX):
+                    root = name.rpartition("_")[0]   # executor-jenkins_3 → executor-jenkins
+                else:
+                    continue
+                stack = self._stack(frame)
+                if root != "event-loop" and not any(
+                        label.startswith("run ") and _POOL_WORKER_FILE in label for label in stack):
+                    continue   # Pool worker waiting for work
+                stack.append(root)
+                stack.reverse()
+                self.stacks[";".join(stack)] += 1
+            self.samples += 1
+
+    def _stack(self, frame) -> list[str]:
+        """Frame labels, innermost first."""
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = f"{code.co_name} ({_short(code.co_filename)}:{code.co_firstlineno})"
+            labels.append(label)
+            frame = frame.f_back
+        return labels
+
+
+async def _profile_cpu(seconds: float) -> str:
+    sampler = _Sampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stop()
+        await asyncio.to_thread(sampler.join)
+    print(f"[PROFILE] cpu: {sampler.samples} samples in {time.perf_counter() - started:.1f}s")
+    return "".join(f"{stack} {count}\n" for stack, count in sampler.stacks.most_common())
+
+
+# ─────────────────────────────────────────────────────────────
+# Allocations — tracemalloc snapshot diff
+# ─────────────────────────────────────────────────────────────
+_ALLOC_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_ALLOC_FILTERS)
+
+
+def _collapse_alloc(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> str:
+    lines = []
+    for stat in after.compare_to(before, "traceback"):
+        if stat.size_diff <= 0:
+            continue
+        # Traceback frames are oldest first, as collapsed stacks want them
+        stack = ";".join(f"{_short(frame.filename)}:{frame.lineno}" for frame in stat.traceback)
+        lines.append(f"{stack} {stat.size_diff}\n")
+    return "".join(lines)
+
+
+async def _profile_alloc(seconds: float) -> str:
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(settings.PROFILE_ALLOC_FRAMES)
+    try:
+        # Snapshots walk every traced block — keep that off the event loop
+        before = await asyncio.to_thread(_snapshot)
+        await asyncio.sleep(seconds)
+        after = await asyncio.to_thread(_snapshot)
+        return await asyncio.to_thread(_collapse_alloc, before, after)
+    finally:
+        if started_here:
+            tracemalloc.stop()
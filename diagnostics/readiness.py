@@ -0,0 +1,73 @@
+"""
+diagnostics/readiness.py
+Deep readiness check behind /ready — can this instance do useful work?
+
+Jenkins, Octopus and the audit database are probed concurrently, each with
+a READY_PROBE_TIMEOUT_SECONDS limit. Results are cached for READY_CACHE_SECONDS,
+and callers arriving while a probe round is running share it, so however
+often the load balancer asks, the upstreams see at most one probe each per
+cache period.
+
+/health stays a cheap liveness check that touches none of this.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+from config.settings import settings
+from metrics.registry import REGISTRY
+
+
+DEPENDENCY_UP = REGISTRY.gauge(
+    "deploybot_dependency_up", "1 if the last readiness probe of a dependency succeeded", ["dependency"])
+
+
+class ReadinessCheck:
+
+    def __init__(self, probes: dict[str, Callable[[], Awaitable]], ttl: float = None, timeout: float = None):
+        self.probes = probes   # name → async probe, raises when the dependency is unusable
+        self.ttl = settings.READY_CACHE_SECONDS if ttl is None else ttl
+        self.timeout = timeout or settings.READY_PROBE_TIMEOUT_SECONDS
+        self._gauges = {name: DEPENDENCY_UP.labels(name) for name in probes}
+        self._result: Optional[dict] = None
+        self._checked_at = 0.0
+        self._running: Optional[asyncio.Task] = None
+
+    async def check(self) -> tuple[bool, dict]:
+        """(ready, report) — from cache when the last round is younger than READY_CACHE_SECONDS."""
+        age = time.monotonic() - self._checked_at
+        if self._result is None or age >= self.ttl:
+            if self._running is None:
+                self._running = asyncio.create_task(self._probe_all())
+                self._running.add_done_callback(self._store)
+            # Shielded: a load balancer hanging up must not cancel the round for everyone else
+            await asyncio.shield(self._running)
+            age = time.monotonic() - self._checked_at
+        report = dict(self._result)
+        return all(c["ok"] for c in report.values()), {"checks": report, "age_s": round(age, 1)}
+
+    def _store(self, task: asyncio.Task):
+        self._running = None
+        if not task.cancelled() and task.exception() is None:
+            self._result = task.result()
+            self._checked_at = time.monotonic()
+
+    async def _probe_all(self) -> dict:
+        names = list(self.probes)
+        results = await asyncio.gather(*(self._probe(name) for name in names))
+        return dict(zip(names, results))
+
+    async def _probe(self, name: str) -> dict:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.probes[name](), self.timeout)
+            result = {"ok": True}
+        except asyncio.TimeoutError:
+            result = {"ok": False, "error": f"timed out after {self.timeout:g}s"}
+        except Exception as e:
+            result = {"ok": False, "error": str(e) or type(e).__name__}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self._gauges[name].set(1 if result["ok"] else 0)
+        if not result["ok"]:
+            print(f"[READY] {name} probe failed: {result['error']}")
+        return result
@@ -0,0 +1,140 @@
+"""
+idempotency/cache.py
+Remembers which Bot Framework activities have already been handled.
+
+Bot Framework resends an activity when the endpoint is slow to answer. Every
+incoming activity is claimed here under (conversation id, activity id); a resend
+finds the existing claim and gets the original outcome back instead of running
+the command a second time.
+
+Claims live in a bounded in-memory TTL cache. When IDEMPOTENCY_DB_PATH (or the
+shared STATE_DB_PATH) is set they are also written to SQLite (on the bounded
+"sqlite" executor), so a retry that lands on another worker process is
+recognised too.
+"""
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Optional
+
+from config.settings import settings
+from metrics.registry import REGISTRY
+from resilience.executors import executor
+from store.shared import connect
+
+
+DUPLICATES = REGISTRY.counter(
+    "deploybot_duplicate_activities_total", "Activities dropped as Bot Framework retries", ["type"])
+
+IN_PROGRESS = {"status": "in_progress"}
+
+
+class IdempotencyCache:
+
+    def __init__(self, ttl_seconds: int = None, max_entries: int = None, db_path: str = None):
+        self.ttl = ttl_seconds or settings.IDEMPOTENCY_TTL_SECONDS
+        self.max_entries = max_entries or settings.IDEMPOTENCY_MAX_ENTRIES
+        self.db_path = (settings.IDEMPOTENCY_DB_PATH or settings.STATE_DB_PATH) if db_path is None else db_path
+        # key → (expires_at, outcome), oldest first
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    @staticmethod
+    def key_for(activity) -> Optional[str]:
+        """Idempotency key for an activity, or None if it cannot be identified."""
+        conversation = getattr(activity.conversation, "id", None) if activity.conversation else None
+        if not activity.id or not conversation:
+            return None
+        return f"{conversation}|{activity.id}"
+
+    # ─────────────────────────────────────────────────────────────
+    # Public API
+    # ─────────────────────────────────────────────────────────────
+    async def claim(self, key: str) -> Optional[dict]:
+        """
+        Claim `key` for the caller.
+        Returns None if the key is new (the caller should run the activity), or
+        the outcome recorded by the first caller if this is a duplicate.
+        """
+        now = time.time()
+        cached = self._entries.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        if self.db_path:
+            existing = await self._db_claim(key, now)
+            if existing is not None:
+                self._remember(key, existing, now)
+                return existing
+
+        self._remember(key, IN_PROGRESS, now)
+        return None
+
+    async def complete(self, key: str, outcome: dict):
+        """Record the outcome that duplicates of `key` should get back."""
+        self._remember(key, outcome, time.time())
+        if self.db_path:
+            await executor("sqlite").run(self._db_execute, "UPDATE idempotency SET outcome = ? WHERE key = ?",
+                                         (json.dumps(outcome), key))
+
+    async def forget(self, key: str):
+        """Drop a claim so a retry of the activity can run (the first attempt failed)."""
+        self._entries.pop(key, None)
+        if self.db_path:
+            await executor("sqlite").run(self._db_execute, "DELETE FROM idempotency WHERE key = ?", (key,))
+
+    # ─────────────────────────────────────────────────────────────
+    # Internal helpers
+    # ─────────────────────────────────────────────────────────────
+    def _remember(self, key: str, outcome: dict, now: float):
+        self._entries.pop(key, None)
+        self._entries[key] = (now + self.ttl, outcome)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # The helpers below run on the sqlite executor
+    def _connect(self) -> closing:
+        return closing(connect(self.db_path))
+
+    @staticmethod
+    def _ensure_table(db: sqlite3.Connection):
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS idempotency (
+                key        TEXT PRIMARY KEY,
+                outcome    TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        db.commit()
+
+    def _db_execute(self, sql: str, params: tuple):
+        with self._connect() as db:
+            db.execute(sql, params)
+            db.commit()
+
+    async def _db_claim(self, key: str, now: float) -> Optional[dict]:
+        """Atomically claim `key` across processes; return the existing outcome if taken."""
+        return await executor("sqlite").run(self._db_claim_sync, key, now)
+
+    def _db_claim_sync(self, key: str, now: float) -> Optional[dict]:
+        with self._connect() as db:
+            self._ensure_table(db)
+            # Insert, or take over a row whose TTL has lapsed
+            cursor = db.execute(
+                """
+                INSERT INTO idempotency (key, outcome, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET outcome = excluded.outcome,
+                                               expires_at = excluded.expires_at
+                WHERE idempotency.expires_at < ?
+                """,
+                (key, json.dumps(IN_PROGRESS), now + self.ttl, now),
+            )
+            claimed = cursor.rowcount == 1
+            if claimed:
+                db.execute("DELETE FROM idempotency WHERE expires_at < ?", (now,))
+            db.commit()
+            if claimed:
+                return None
+            row = db.execute("SELECT outcome FROM idempotency WHERE key = ?", (key,)).fetchone()
+            return json.loads(row[0]) if row else IN_PROGRESS
@@ -2,21 +2,65 @@
 jenkins/client.py
 Triggers Jenkins jobs via the Jenkins REST API.
 Uses python-jenkins library for authentication + job control.
+
+python-jenkins is blocking, so calls run on the bounded "jenkins" executor
+(resilience/executors.py); each goes through UpstreamPolicy
+(resilience/policy.py) for the Jenkins circuit breaker, the command's
+deadline, and retries of the read-only calls.
 """
-import asyncio
 import jenkins
+import requests
+from requests.adapters import BaseAdapter
+from cassette.transport import jenkins_adapter
 from config.settings import settings
+from metrics.upstream import instrumented
+from resilience.executors import executor
+from resilience.policy import UpstreamPolicy
+from tracing.tracer import traced
+
+
+def _http_status(e: BaseException):
+    """Status of the HTTP error behind `e` — python-jenkins re-raises most of them as JenkinsException."""
+    while e is not None:
+        if isinstance(e, requests.HTTPError) and e.response is not None:
+            return e.response.status_code
+        e = e.__cause__ or e.__context__
+    return None
+
+
+def _is_fault(e: BaseException) -> bool:
+    """Errors that say Jenkins itself is unhealthy: no connection, timeouts, 5xx and throttling."""
+    if isinstance(e, (jenkins.TimeoutException, requests.ConnectionError, requests.Timeout)):
+        return True
+    status = _http_status(e)
+    return status is not None and (status >= 500 or status == 429)
 
 
 class JenkinsClient:
 
-    def __init__(self):
+    def __init__(self, adapter: BaseAdapter = None):
         self._server = jenkins.Jenkins(
             url=settings.JENKINS_URL,
             username=settings.JENKINS_USER,
             password=settings.JENKINS_TOKEN,
+            # requests' (connect, read) timeouts, for every call python-jenkins makes
+            timeout=(settings.JENKINS_CONNECT_TIMEOUT_SECONDS, settings.JENKINS_READ_TIMEOUT_SECONDS),
         )
+        self._policy = UpstreamPolicy("jenkins", _is_fault)
+        self._executor = executor("jenkins")
+        # A cassette recording / replaying the traffic (CASSETTE_MODE) goes in as the
+        # transport adapter of python-jenkins' requests session; see cassette/transport.py
+        adapter = adapter or jenkins_adapter()
+        if adapter is not None:
+            self._server._session.mount("http://", adapter)
+            self._server._session.mount("https://", adapter)
 
+    async def _call(self, fn, *args, idempotent: bool = True, **kwargs):
+        """Run a python-jenkins call on the Jenkins executor, through the policy."""
+        return await self._policy.call(lambda: self._executor.run(fn, *args, **kwargs), idempotent=idempotent)
+
+    @instrumented("jenkins", "trigger")
+    @traced("jenkins.trigger_build")
     async def trigger_build(self, app: str, branch: str) -> dict:
         """
         Trigger the Jenkins build job for the given app and branch.
@@ -28,10 +72,12 @@ class JenkinsClient:
             "CALLBACK_URL": settings.BOT_CALLBACK_URL,   # Jenkins notifies bot when done
         }
         try:
-            queue_item = await asyncio.to_thread(
+            # Triggering twice would queue two builds, so this one is never retried
+            queue_item = await self._call(
                 self._server.build_job,
                 settings.JENKINS_BUILD_JOB,
                 parameters=params,
+                idempotent=False,
             )
             return {
                 "status": "triggered",
@@ -41,15 +87,15 @@ class JenkinsClient:
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
+    @instrumented("jenkins", "status")
+    @traced("jenkins.build_status")
     async def get_build_status(self, job_name: str, build_number: int) -> dict:
         """
         Poll the status of a specific Jenkins build.
         Returns building flag, result (SUCCESS/FAILURE/ABORTED), and duration.
         """
         try:
-            info = await asyncio.to_thread(
-                self._server.get_build_info, job_name, build_number
-            )
+            info = await self._call(self._server.get_build_info, job_name, build_number)
             return {
                 "building": info.get("building", False),
                 "result": info.get("result"),         # None if still running
@@ -59,15 +105,15 @@ class JenkinsClient:
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
+    @instrumented("jenkins", "last_success")
+    @traced("jenkins.last_success")
     async def get_last_successful_build(self, app: str) -> dict:
         """
         Fetch the last successful build number for an app's build job.
         Useful for quick re-deploys.
         """
         try:
-            info = await asyncio.to_thread(
-                self._server.get_job_info, settings.JENKINS_BUILD_JOB
-            )
+            info = await self._call(self._server.get_job_info, settings.JENKINS_BUILD_JOB)
             last_ok = info.get("lastSuccessfulBuild") or {}
             return {
                 "build_number": last_ok.get("number"),
@@ -75,3 +121,8 @@ class JenkinsClient:
             }
         except Exception as e:
             return {"status": "error", "message": str(e)}
+
+    async def ping(self) -> str:
+        """Check Jenkins is reachable and the credentials work; returns the user name. Raises on failure."""
+        info = await self._call(self._server.get_whoami)
+        return info.get("id", "")
@@ -0,0 +1,210 @@
+"""
+jobs/deploys.py
+Deploy scheduler in front of OctopusClient.deploy / rollback.
+
+Octopus queues every deployment it is given, so `deploy myapp 41 qa` then 42
+then 43 in quick succession would run three deployments when only the last
+one matters. Requests go through here instead:
+
+  - one Octopus call at a time per (app, environment), in request order
+  - a deploy still waiting for its turn is superseded by a newer deploy for the
+    same app and environment: it never reaches Octopus and its caller gets a
+    `{"status": "superseded", ...}` result naming the build that replaced it
+  - rollbacks are never collapsed, and a deploy never jumps over a rollback
+    queued before it
+
+With several worker processes (a shared store, store/shared.py) each request
+also takes its place in the store's line for the environment, and only calls
+Octopus once it is the oldest there: deploys taken by different workers run one
+at a time too, and a waiting deploy is superseded by a newer one from any worker.
+
+Callers update their card and audit record from the result, so the requesters
+of folded-in deploys see it on their own card. A caller running on the job
+queue gives its worker back while it waits (jobs.queue.off_worker), so deploys
+backed up behind one environment do not hold up other commands.
+"""
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Optional
+
+from config.settings import settings
+from jobs.queue import off_worker
+from metrics.registry import REGISTRY
+from resilience.deadline import current_deadline, within_deadline
+from tracing.tracer import Span, activate, current_span
+
+if TYPE_CHECKING:
+    from octopus_client.client import OctopusClient
+    from store.shared import SharedStore
+
+
+COLLAPSED = REGISTRY.counter(
+    "deploybot_deploys_collapsed_total", "Queued deploys replaced by a newer build before reaching Octopus")
+DEPLOY_WAIT = REGISTRY.histogram(
+    "deploybot_deploy_wait_seconds", "Time a deploy or rollback waited behind another one for the same environment")
+
+
+@dataclass
+class DeployRequest:
+    app: str
+    environment: str
+    build_number: Optional[str]            # None for rollbacks
+    requested_by: str
+    future: asyncio.Future
+    is_rollback: bool = False
+    release_id: Optional[str] = None       # Already resolved (promote), skips the lookup
+    requested_at: int = field(default_factory=time.perf_counter_ns)
+    span: Optional[Span] = field(default_factory=current_span)   # The Octopus calls are traced under it
+    deadline: Optional[float] = field(default_factory=current_deadline)   # ... and bounded by its deadline
+    seq: Optional[int] = None              # Place in the shared store's line, with several workers
+
+
+@dataclass
+class _Slot:
+    waiting: deque = field(default_factory=deque)
+    worker: Optional[asyncio.Task] = None
+    joining: asyncio.Lock = field(default_factory=asyncio.Lock)   # Keeps `waiting` in the store's order
+
+
+def _octopus_client() -> "OctopusClient":
+    from octopus_client.client import OctopusClient
+    return OctopusClient()
+
+
+class DeployScheduler:
+
+    def __init__(self, octopus: Callable[[], "OctopusClient"] = None, store: Optional["SharedStore"] = None):
+        # Factory rather than a client, so the client is only built when first used
+        self._octopus_factory = octopus or _octopus_client
+        self._octopus = None
+        self.store = store
+        self.lease_seconds = settings.DEPLOY_LEASE_SECONDS
+        self._slots: dict[tuple, _Slot] = {}
+
+    @property
+    def octopus(self) -> "OctopusClient":
+        if self._octopus is None:
+            self._octopus = self._octopus_factory()
+        return self._octopus
+
+    # ─────────────────────────────────────────────────────────────
+    # Public API
+    # ─────────────────────────────────────────────────────────────
+    async def deploy(self, app: str, build_number: str, environment: str, requested_by: str,
+                     release_id: str = None) -> dict:
+        """
+        Deploy once earlier requests for this environment are done; may return superseded.
+        Pass `release_id` (OctopusClient.resolve_release) to skip resolving the release again.
+        """
+        return await self._submit(app, environment, build_number, requested_by,
+                                  is_rollback=False, release_id=release_id)
+
+    async def rollback(self, app: str, environment: str, requested_by: str) -> dict:
+        """Roll back once earlier requests for this environment are done."""
+        return await self._submit(app, environment, None, requested_by, is_rollback=True, release_id=None)
+
+    def snapshot(self) -> dict:
+        """(app, environment) → number of requests waiting, for environments with a backlog."""
+        return {f"{app}/{env}": len(slot.waiting) for (app, env), slot in self._slots.items() if slot.waiting}
+
+    # ─────────────────────────────────────────────────────────────
+    # Slots
+    # ─────────────────────────────────────────────────────────────
+    async def _submit(self, app, environment, build_number, requested_by, is_rollback, release_id) -> dict:
+        key = (app, environment)
+        slot = self._slots.setdefault(key, _Slot())
+        request = DeployRequest(
+            app=app, environment=environment, build_number=build_number, requested_by=requested_by,
+            future=asyncio.get_running_loop().create_future(), is_rollback=is_rollback, release_id=release_id,
+        )
+        async with slot.joining:
+            if self.store is not None:
+                request.seq = await self.store.enqueue_deploy(
+                    app, environment, build_number, requested_by, self.lease_seconds)
+            superseded = [] if is_rollback else self._collapse(slot, request)
+            slot.waiting.append(request)
+            if slot.worker is None or slot.worker.done():
+                slot.worker = asyncio.create_task(self._drain(key, slot))
+        for older in superseded:
+            await self._leave_line(older)
+        return await off_worker(asyncio.shield(request.future))
+
+    def _collapse(self, slot: _Slot, newer: DeployRequest) -> list[DeployRequest]:
+        """Supersede the deploys queued after the last waiting rollback; returns them."""
+        superseded = []
+        while slot.waiting and not slot.waiting[-1].is_rollback:
+            older = slot.waiting.pop()
+            COLLAPSED.inc()
+            print(f"[DEPLOY] {older.app} build #{older.build_number} to {older.environment} "
+                  f"superseded by #{newer.build_number}")
+            older.future.set_result({
+                "status": "superseded",
+                "superseded_by": newer.build_number,
+                "superseded_by_user": newer.requested_by,
+            })
+            superseded.append(older)
+        return superseded
+
+    async def _drain(self, key: tuple, slot: _Slot):
+        while slot.waiting:
+            request = slot.waiting.popleft()
+            if request.seq is not None:
+                superseded = await self._wait_turn(request)
+                if superseded is not None:
+                    request.future.set_result(superseded)
+                    continue
+            now = time.perf_counter_ns()
+            DEPLOY_WAIT.observe((now - request.requested_at) / 1e9)
+            if request.span is not None:
+                request.span.child("deploy.wait", request.requested_at, now, environment=request.environment)
+            try:
+                with activate(request.span), within_deadline(request.deadline):
+                    result = await self._call(request)
+            except Exception as e:
+                result = {"status": "error", "message": str(e)}
+            finally:
+                await self._leave_line(request)
+            request.future.set_result(result)
+        # Kept while a request is joining the store's line, so it lands behind the same lock
+        if self._slots.get(key) is slot and not slot.joining.locked():
+            del self._slots[key]
+
+    async def _wait_turn(self, request: DeployRequest) -> Optional[dict]:
+        """Wait until `request` is the oldest in the store's line; its superseded result if it never gets there."""
+        while True:
+            try:
+                turn, superseded = await self.store.deploy_turn(request.seq, self.lease_seconds)
+                if turn == "lost":
+                    await self.store.enqueue_deploy(
+                        request.app, request.environment, request.build_number, request.requested_by,
+                        self.lease_seconds, seq=request.seq)
+            except Exception as e:
+                print(f"[DEPLOY] Could not check the deploy line for {request.app}/{request.environment}: {e}")
+                turn = "wait"
+            if turn == "go":
+                return None
+            if turn == "superseded":
+                COLLAPSED.inc()
+                print(f"[DEPLOY] {request.app} build #{request.build_number} to {request.environment} "
+                      f"superseded by #{superseded['superseded_by']}")
+                return {"status": "superseded", **superseded}
+            await asyncio.sleep(self.store.poll_seconds)
+
+    async def _leave_line(self, request: DeployRequest):
+        if request.seq is None:
+            return
+        try:
+            await self.store.finish_deploy(request.seq)
+        except Exception as e:
+            # It drops out of the line once its lease runs out
+            print(f"[DEPLOY] Could not leave the deploy line for {request.app}/{request.environment}: {e}")
+
+    async def _call(self, request: DeployRequest) -> dict:
+        if request.is_rollback:
+            return await self.octopus.rollback(app=request.app, environment=request.environment)
+        if request.release_id:
+            return await self.octopus.deploy_release(request.release_id, request.environment, request.build_number)
+        return await self.octopus.deploy(
+            app=request.app, build_number=request.build_number, environment=request.environment)
@@ -0,0 +1,240 @@
+"""
+jobs/queue.py
+Background job queue for bot commands.
+
+Teams messages are acknowledged as soon as the command is parsed; the slow
+Jenkins / Octopus / audit work runs here on a bounded pool of workers and the
+results are sent proactively. Jobs that share a serial key — (app, None) for builds
+— run one at a time in submission order, without holding a worker while they
+wait their turn.
+
+Flow:
+  1. Bot calls `submit()` → job goes to the ready queue, or parks behind the
+     job currently running for the same key
+  2. A worker runs the job; when it finishes, the next parked job for that key
+     moves to the ready queue
+
+A job that has to wait on work running elsewhere (a deploy queued behind another
+one for the same environment, in jobs/deploys.py) awaits it through
+`off_worker()`: a stand-in worker takes jobs from the queue meanwhile, so the
+waits do not use up COMMAND_WORKERS.
+"""
+import asyncio
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Hashable, Optional, TypeVar
+
+from config.settings import settings
+from metrics.registry import REGISTRY
+
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    "deploybot_command_queue_depth", "Commands waiting to run (ready + parked behind a serial key)")
+QUEUE_WAIT = REGISTRY.histogram(
+    "deploybot_command_queue_wait_seconds", "Time a command spent queued before a worker started it",
+    ["command"])
+RUN_TIME = REGISTRY.histogram(
+    "deploybot_command_run_seconds", "Time a worker spent running a command", ["command"])
+
+T = TypeVar("T")
+
+
+class QueueFull(Exception):
+    """Raised by `submit()` when the queue is at COMMAND_QUEUE_SIZE."""
+
+
+@dataclass
+class Job:
+    command: str                                  # build | deploy | status | ...
+    run: Callable[[], Awaitable[None]]
+    key: Optional[Hashable] = None                # Serial key, e.g. ("myapp", "qa")
+    enqueued_at: float = field(default_factory=time.monotonic)
+    # Resolves when the job has run: None on success, or the exception it raised.
+    # Cancelled if the job was (by close() at shutdown)
+    done: Optional[asyncio.Future] = None
+    queue: Optional["CommandQueue"] = None
+    lending: bool = False                         # Waiting in off_worker(), a stand-in has its worker
+
+
+# The job the current task is running, set by the worker that runs it
+_current_job: ContextVar[Optional[Job]] = ContextVar("deploybot_job", default=None)
+
+
+async def off_worker(awaitable: Awaitable[T]) -> T:
+    """
+    Await `awaitable` without holding the current job's worker: a stand-in worker
+    runs other jobs until it completes. Outside a job this is a plain await.
+    """
+    job = _current_job.get()
+    if job is None or job.lending or job.done.done():
+        return await awaitable
+    return await job.queue._lend(job, awaitable)
+
+
+class CommandQueue:
+
+    def __init__(self, workers: int = None, max_size: int = None):
+        self.workers = workers or settings.COMMAND_WORKERS
+        self.max_size = max_size or settings.COMMAND_QUEUE_SIZE
+        self._ready: Optional[asyncio.Queue] = None
+        self._parked: dict[Hashable, deque] = {}   # key → jobs waiting behind the running one
+        self._busy_keys: set = set()
+        self._tasks: set[asyncio.Task] = set()
+        self._idle: set[asyncio.Task] = set()       # Workers waiting for a job
+        self._lent = 0                               # Jobs in off_worker(), each covered by a stand-in
+        self._pending = 0                            # ready + parked
+        self.running = 0
+        self._wait_hist = {}
+        self._run_hist = {}
+        QUEUE_DEPTH.set_function(lambda: self._pending)
+
+    # ─────────────────────────────────────────────────────────────
+    # Submission
+    # ─────────────────────────────────────────────────────────────
+    def submit(self, command: str, run: Callable[[], Awaitable[None]],
+               key: Optional[Hashable] = None) -> Job:
+        """
+        Queue `run()` for a background worker. Returns immediately.
+        Raises QueueFull if COMMAND_QUEUE_SIZE commands are already waiting.
+        """
+        if self._pending >= self.max_size:
+            raise QueueFull(f"{self._pending} commands already queued")
+        self._start()
+        job = Job(command=command, run=run, key=key, done=asyncio.get_running_loop().create_future(), queue=self)
+        self._pending += 1
+        if key is not None and key in self._busy_keys:
+            self._parked.setdefault(key, deque()).append(job)
+        else:
+            if key is not None:
+                self._busy_keys.add(key)
+            self._ready.put_nowait(job)
+        return job
+
+    def _start(self):
+        """Start the worker pool on first use (needs a running event loop)."""
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._tasks = {asyncio.create_task(self._worker()) for _ in range(self.workers)}
+
+    # ─────────────────────────────────────────────────────────────
+    # Workers
+    # ─────────────────────────────────────────────────────────────
+    async def _worker(self):
+        me = asyncio.current_task()
+        while len(self._tasks) <= self.workers + self._lent:
+            self._idle.add(me)
+            try:
+                job = await self._ready.get()
+            finally:
+                self._idle.discard(me)
+            self._pending -= 1
+            self.running += 1
+            started = time.monotonic()
+            self._hist(self._wait_hist, QUEUE_WAIT, job.command).observe(started - job.enqueued_at)
+            error = None
+            token = _current_job.set(job)
+            try:
+                await job.run()
+            except asyncio.CancelledError:
+                job.done.cancel()
+                raise
+            except Exception as e:
+                error = e
+                print(f"[ERROR] {job.command} job failed: {e}")
+            finally:
+                if not job.done.done():
+                    job.done.set_result(error)
+                self._hist(self._run_hist, RUN_TIME, job.command).observe(time.monotonic() - started)
+                _current_job.reset(token)
+                self.running -= 1
+                self._release(job.key)
+                self._ready.task_done()
+        # A stand-in whose job came back from off_worker()
+        self._tasks.discard(me)
+
+    async def _lend(self, job: Job, awaitable: Awaitable[T]) -> T:
+        """Start a stand-in worker while `job` waits on `awaitable`; retire one when it is back."""
+        job.lending = True
+        self._lent += 1
+        self._tasks.add(asyncio.create_task(self._worker()))
+        try:
+            return await awaitable
+        finally:
+            job.lending = False
+            self._lent -= 1
+            # An idle worker can go now; a busy one leaves after its current job
+            if self._idle and len(self._tasks) > self.workers + self._lent:
+                spare = self._idle.pop()
+                spare.cancel()
+                self._tasks.discard(spare)
+
+    def _release(self, key: Optional[Hashable]):
+        """Hand the serial key to the next parked job, or free it."""
+        if key is None:
+            return
+        parked = self._parked.get(key)
+        if parked:
+            self._ready.put_nowait(parked.popleft())
+            if not parked:
+                del self._parked[key]
+        else:
+            self._busy_keys.discard(key)
+
+    @staticmethod
+    def _hist(cache: dict, family, command: str):
+        child = cache.get(command)
+        if child is None:
+            child = cache[command] = family.labels(command)
+        return child
+
+    # ─────────────────────────────────────────────────────────────
+    # Shutdown
+    # ─────────────────────────────────────────────────────────────
+    async def join(self):
+        """Wait until every submitted job (parked ones included) has run."""
+        if self._ready is not None:
+            await self._ready.join()
+
+    async def close(self, timeout: float = None) -> int:
+        """
+        Stop the workers, cancelling the jobs they are running, and give those up to
+        `timeout` seconds to wind down. Jobs still queued are cancelled without running.
+        Returns how many jobs never finished.
+        """
+        unfinished = self._pending + self.running
+        for task in self._tasks:
+            task.cancel()
+        # Jobs that never started are cancelled too, so nothing waits on them forever
+        while self._ready is not None and not self._ready.empty():
+            self._ready.get_nowait().done.cancel()
+        for parked in self._parked.values():
+            for job in parked:
+                job.done.cancel()
+        self._parked.clear()
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=timeout)
+        self._tasks = set()
+        return unfinished
+
+    # ─────────────────────────────────────────────────────────────
+    # Introspection
+    # ─────────────────────────────────────────────────────────────
+    def snapshot(self) -> dict:
+        """Queue depth plus mean wait / run time per command type, for /health."""
+        commands = {}
+        for command, wait in self._wait_hist.items():
+            run = self._run_hist.get(command)
+            commands[command] = {
+                "count": wait.count,
+                "wait_avg_ms": round(wait.sum / wait.count * 1000, 1) if wait.count else 0.0,
+                "run_avg_ms": round(run.sum / run.count * 1000, 1) if run and run.count else 0.0,
+            }
+        return {
+            "depth": self._pending,
+            "running": self.running,
+            "workers": self.workers,
+            "commands": commands,
+        }
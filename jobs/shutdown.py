@@ -0,0 +1,79 @@
+"""
+jobs/shutdown.py
+What happens between SIGTERM and the process exiting, and picking up afterwards.
+
+aiohttp closes the listening socket and then runs the application's on_shutdown
+hooks, where `shutdown()` does the rest:
+
+  1. `draining` is set — /api/messages answers 503 from then on (requests can
+     still arrive on kept-alive connections), so Bot Framework retries the
+     activity against a worker that is still up
+  2. running commands — job queue, batches, promotions — get up to
+     SHUTDOWN_DRAIN_SECONDS to finish, and the card updates they queued go out;
+     whatever is still running then is cancelled and counted as abandoned
+  3. pending approvals and builds waiting for their Jenkins callback are left in
+     the shared store, or CHECKPOINT_PATH (checkpoint.db by default) without one;
+     only CHECKPOINT_PATH=off drops them (store/shared.py)
+
+At warm-up `resume()` adopts what the previous process left, so approval cards
+keep working, still expire on time, and build cards are still finished by their
+callback.
+"""
+import os
+import time
+from typing import TYPE_CHECKING, Optional
+
+from config.settings import settings
+from metrics.registry import REGISTRY
+from store.shared import checkpoint_store, shared_store
+
+if TYPE_CHECKING:
+    from bot.deploy_bot import DeployBot
+
+
+DRAIN_TIME = REGISTRY.gauge(
+    "deploybot_shutdown_drain_seconds", "Time the last shutdown spent waiting for running commands")
+ABANDONED = REGISTRY.counter(
+    "deploybot_shutdown_abandoned_total", "Commands cancelled because they outlived the shutdown drain")
+
+
+class ShutdownCoordinator:
+
+    def __init__(self, timeout: float = None):
+        self.timeout = settings.SHUTDOWN_DRAIN_SECONDS if timeout is None else timeout
+        self.draining = False
+        self.report: Optional[dict] = None   # Set once shutdown() has run
+
+    async def shutdown(self, bot: Optional["DeployBot"]) -> dict:
+        """Stop taking commands, drain the running ones and checkpoint the rest. `bot` is None if it never started."""
+        self.draining = True
+        started = time.monotonic()
+        abandoned, approvals, builds = 0, 0, 0
+        if bot is not None:
+            abandoned = await bot.drain(self.timeout)
+        drained = time.monotonic() - started
+        store = checkpoint_store()
+        if bot is not None and store is not None:
+            try:
+                approvals, builds = await bot.checkpoint(store)
+            except Exception as e:
+                print(f"[SHUTDOWN] Could not checkpoint unfinished work: {e}")
+
+        DRAIN_TIME.set(drained)
+        ABANDONED.inc(abandoned)
+        self.report = {"drain_seconds": round(drained, 3), "abandoned": abandoned,
+                       "checkpointed": {"approvals": approvals, "builds": builds}}
+        print(f"[SHUTDOWN] Drained in {drained:.2f}s, {abandoned} task(s) abandoned; "
+              f"{approvals} approval(s) and {builds} build(s) left for the next start")
+        return self.report
+
+    @staticmethod
+    async def resume(bot: "DeployBot"):
+        """Adopt the approvals and builds a previous process left behind."""
+        store = checkpoint_store()
+        if store is None or (store is not shared_store() and not os.path.exists(store.path)):
+            return
+        try:
+            await bot.resume(store)
+        except Exception as e:
+            print(f"[STARTUP] Could not resume unfinished work from {store.path}: {e}")
@@ -0,0 +1,229 @@
+"""
+loadtest/fakes.py
+Local stand-ins for the services DeployBot talks to, for load tests:
+
+  FakeJenkins    — the python-jenkins endpoints JenkinsClient uses. A triggered
+                   build "finishes" after `build_seconds` and calls the bot's
+                   /api/callback like the real job does
+  FakeOctopus    — projects, environments, releases, deployments and tasks
+  FakeConnector  — the Bot Connector REST API that replies and card updates go
+                   to; records when each conversation got its first message
+
+Each one is a small aiohttp app with configurable latency (fixed + random
+jitter) and error injection, and counts calls per operation.
+"""
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+
+
+class FakeUpstream:
+    name = "upstream"
+    error_status = 500
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.url = ""
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+
+    # Subclasses: [(method, path, handler, operation name)]
+    def routes(self) -> list[tuple]:
+        raise NotImplementedError
+
+    def error_response(self) -> web.Response:
+        return web.json_response({"error": "injected failure"}, status=self.error_status)
+
+    def _wrap(self, handler, operation: str):
+        async def handle(req: web.Request) -> web.StreamResponse:
+            self.calls[operation] += 1
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            if delay:
+                await asyncio.sleep(delay / 1000)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors[operation] += 1
+                return self.error_response()
+            return await handler(req)
+        return handle
+
+    async def start(self) -> str:
+        app = web.Application()
+        for method, path, handler, operation in self.routes():
+            app.router.add_route(method, path, self._wrap(handler, operation))
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def report(self) -> dict:
+        return {"calls": dict(self.calls), "errors": dict(self.errors), "total": sum(self.calls.values())}
+
+
+# ─────────────────────────────────────────────────────────────
+# Jenkins
+# ─────────────────────────────────────────────────────────────
+class FakeJenkins(FakeUpstream):
+    name = "jenkins"
+
+    def __init__(self, build_seconds: float = 1.0, build_failure_rate: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.build_seconds = build_seconds
+        self.build_failure_rate = build_failure_rate
+        self._queue_item = 0
+        self._tasks: set[asyncio.Task] = set()
+
+    def routes(self):
+        return [
+            ("GET", "/crumbIssuer/api/json", self._no_crumb, "crumb"),
+            ("GET", "/me/api/json", self._whoami, "whoami"),
+            ("POST", "/job/{job}/buildWithParameters", self._build, "trigger"),
+            ("GET", "/job/{job}/api/json", self._job_info, "job_info"),
+            ("GET", "/job/{job}/{number}/api/json", self._build_info, "build_info"),
+        ]
+
+    async def _no_crumb(self, req):
+        return web.Response(status=404)   # CSRF protection off — python-jenkins then skips crumbs
+
+    async def _whoami(self, req):
+        return web.json_response({"id": "deploybot", "fullName": "DeployBot"})
+
+    async def _build(self, req):
+        self._queue_item += 1
+        callback = req.query.get("CALLBACK_URL")
+        if callback:
+            task = asyncio.create_task(self._finish(callback, req.query.get("APP_NAME"), self._queue_item))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return web.Response(status=201, headers={"Location": f"{self.url}/queue/item/{self._queue_item}/"})
+
+    async def _finish(self, callback: str, app: str, number: int):
+        await asyncio.sleep(self.build_seconds)
+        status = "FAILURE" if self._random.random() < self.build_failure_rate else "SUCCESS"
+        self.calls["callback"] += 1
+        try:
+            async with aiohttp.ClientSession() as session:
+                await session.post(callback, json={
+                    "app": app, "build_number": number, "status": status,
+                    "url": f"{self.url}/job/build/{number}/",
+                })
+        except aiohttp.ClientError:
+            self.errors["callback"] += 1
+
+    async def _job_info(self, req):
+        return web.json_response({"lastSuccessfulBuild": {"number": self._queue_item, "url": ""}})
+
+    async def _build_info(self, req):
+        return web.json_response({"building": False, "result": "SUCCESS", "duration": 1000, "url": ""})
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await super().stop()
+
+
+# ─────────────────────────────────────────────────────────────
+# Octopus
+# ─────────────────────────────────────────────────────────────
+class FakeOctopus(FakeUpstream):
+    name = "octopus"
+    space = "Spaces-1"
+
+    def __init__(self, releases: int = 100, **kwargs):
+        super().__init__(**kwargs)
+        # Newest first, like Octopus: versions 1.0.<releases> … 1.0.1
+        self._releases = [{"Id": f"Releases-{n}", "Version": f"1.0.{n}"} for n in range(releases, 0, -1)]
+        self._deployments = 0
+
+    def routes(self):
+        base = f"/api/{self.space}"
+        return [
+            ("GET", base, self._space, "space"),
+            ("GET", f"{base}/projects", self._projects, "projects"),
+            ("GET", f"{base}/environments", self._environments, "environments"),
+            ("GET", f"{base}/projects/{{project}}/releases", self._releases_page, "releases"),
+            ("POST", f"{base}/deployments", self._create_deployment, "create_deployment"),
+            ("GET", f"{base}/deployments", self._list_deployments, "list_deployments"),
+            ("GET", f"{base}/deployments/{{deployment}}", self._deployment, "deployment"),
+            ("GET", f"{base}/tasks/{{task}}", self._task, "task"),
+        ]
+
+    async def _space(self, req):
+        return web.json_response({"Id": self.space, "Name": "Default"})
+
+    async def _projects(self, req):
+        return web.json_response({"Items": [{"Id": f"Projects-{req.query.get('name', 'x')}"}]})
+
+    async def _environments(self, req):
+        return web.json_response({"Items": [{"Id": f"Environments-{req.query.get('name', 'x')}"}]})
+
+    async def _releases_page(self, req):
+        take = int(req.query.get("take", "30"))
+        return web.json_response({"Items": self._releases[:take]})
+
+    async def _create_deployment(self, req):
+        body = await req.json()
+        self._deployments += 1
+        return web.json_response({"Id": f"Deployments-{self._deployments}", "TaskId": f"ServerTasks-{self._deployments}",
+                                  "ReleaseId": body.get("ReleaseId"), "EnvironmentId": body.get("EnvironmentId")})
+
+    async def _list_deployments(self, req):
+        return web.json_response({"Items": [
+            {"EnvironmentId": env, "ReleaseId": self._releases[0]["Id"], "State": "Success",
+             "Created": "2024-01-01T00:00:00Z"}
+            for env in ("Environments-QA", "Environments-UAT", "Environments-Production")
+        ]})
+
+    async def _deployment(self, req):
+        number = req.match_info["deployment"].rsplit("-", 1)[-1]
+        return web.json_response({"Id": req.match_info["deployment"], "TaskId": f"ServerTasks-{number}"})
+
+    async def _task(self, req):
+        return web.json_response({"Id": req.match_info["task"], "State": "Success", "IsCompleted": True})
+
+
+# ─────────────────────────────────────────────────────────────
+# Bot Connector
+# ─────────────────────────────────────────────────────────────
+class FakeConnector(FakeUpstream):
+    name = "connector"
+    error_status = 429   # Teams throttling is the failure the bot actually sees
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.first_reply: dict[str, float] = {}   # conversation id → perf_counter() of its first message
+        self._activities = 0
+
+    def error_response(self) -> web.Response:
+        return web.json_response({"error": {"code": "Throttled"}}, status=429, headers={"Retry-After": "1"})
+
+    def routes(self):
+        return [
+            ("POST", "/v3/conversations/{conversation}/activities", self._send, "send"),
+            ("POST", "/v3/conversations/{conversation}/activities/{activity}", self._send, "reply"),
+            ("PUT", "/v3/conversations/{conversation}/activities/{activity}", self._update, "update"),
+        ]
+
+    async def _send(self, req):
+        self.first_reply.setdefault(req.match_info["conversation"], time.perf_counter())
+        self._activities += 1
+        return web.json_response({"id": f"activity-{self._activities}"})
+
+    async def _update(self, req):
+        return web.json_response({"id": req.match_info["activity"]})
@@ -0,0 +1,241 @@
+"""
+loadtest/run.py
+End-to-end load test: DeployBot's create_app() in-process against local
+Jenkins / Octopus / Bot Connector stand-ins (loadtest/fakes.py).
+
+Activities from a corpus are posted to /api/messages at a fixed arrival rate
+(open loop — a slow bot does not slow the sender down, and latency is counted
+from when each activity was due, not from when it was sent). Each activity gets
+its own conversation, so the time to its first reply can be measured at the
+fake connector.
+
+The report (JSON) has:
+  - http          status counts and /api/messages latency percentiles
+  - first_reply   time from an activity being due to its first reply or card
+  - throughput    activities acknowledged per second
+  - upstream      calls and injected errors per fake, per operation
+
+Corpus: one activity per line — a JSON object with "text" (a chat message)
+or a full Bot Framework activity ("type": ...). Plain-text lines are read
+as message text, so benchmarks/data/teams_messages.txt works too. The corpus
+is cycled until --count activities have been sent.
+
+Usage:
+    python loadtest/run.py                                  # corpora/release_window.jsonl, 20/s for 10s
+    python loadtest/run.py --rate 50 --duration 30 --out report.json
+    python loadtest/run.py --octopus-latency 200 --octopus-error-rate 0.05 --connector-error-rate 0.02
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadtest.fakes import FakeConnector, FakeJenkins, FakeOctopus
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpora", "release_window.jsonl")
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 1)
+    return {"count": len(ordered), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99),
+            "max": round(ordered[-1], 1)}
+
+
+def load_corpus(path: str) -> list[dict]:
+    """Activity templates from a corpus file (see module docstring)."""
+    templates = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                item = json.loads(line)
+                if "type" in item:
+                    templates.append(item)
+                elif "text" in item:
+                    templates.append({"type": "message", "text": item["text"]})
+            else:
+                templates.append({"type": "message", "text": line})
+    if not templates:
+        raise SystemExit(f"No activities in {path}")
+    return templates
+
+
+def make_activity(template: dict, index: int, service_url: str) -> dict:
+    activity = {
+        "id": f"lt-{index}",
+        "channelId": "msteams",
+        "from": {"id": f"load-user-{index % 25}", "name": f"Load Tester {index % 25}"},
+        "recipient": {"id": "deploybot", "name": "DeployBot"},
+        **template,
+    }
+    activity["conversation"] = {"id": f"lt-conversation-{index}"}
+    activity["serviceUrl"] = service_url
+    return activity
+
+
+# ─────────────────────────────────────────────────────────────
+# Running the bot
+# ─────────────────────────────────────────────────────────────
+async def start_bot(jenkins: FakeJenkins, octopus: FakeOctopus, workdir: str):
+    """Point the settings at the fakes, then start create_app() on a local port."""
+    from config.settings import settings
+    settings.APP_ID = settings.APP_PASSWORD = ""
+    settings.JENKINS_URL = jenkins.url
+    settings.JENKINS_USER = settings.JENKINS_TOKEN = "load"
+    settings.OCTOPUS_URL = octopus.url
+    settings.OCTOPUS_API_KEY = "API-LOAD"
+    settings.OCTOPUS_SPACE_ID = FakeOctopus.space
+    settings.PROMOTE_POLL_SECONDS = 0.2
+
+    settings.CHECKPOINT_PATH = os.path.join(workdir, "checkpoint.db")
+
+    import audit.logger
+    audit.logger.DB_PATH = os.path.join(workdir, "audit.db")
+
+    import app as bot_app
+    runner = web.AppRunner(bot_app.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    settings.BOT_CALLBACK_URL = f"{url}/api/callback"
+    return bot_app.bot, runner, url
+
+
+async def drain(bot, timeout: float) -> bool:
+    """Wait for queued commands and outbound messages to finish. False on timeout."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        queue, outbound = bot.jobs.snapshot(), bot.outbound.snapshot()
+        if not queue["depth"] and not queue["running"] and not outbound["queued"] and not bot._background:
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+# ─────────────────────────────────────────────────────────────
+# Load
+# ─────────────────────────────────────────────────────────────
+async def replay(bot_url: str, activities: list[dict], rate: float) -> tuple[list, Counter, dict]:
+    """Post `activities` at `rate` per second. Returns (latencies ms, status counts, due time per conversation)."""
+    latencies, statuses, due_at = [], Counter(), {}
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+
+        async def send(activity: dict, due: float):
+            try:
+                async with session.post(f"{bot_url}/api/messages", json=activity) as resp:
+                    await resp.read()
+                    statuses[str(resp.status)] += 1
+            except aiohttp.ClientError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - due) * 1000)
+
+        started = time.perf_counter()
+        tasks = []
+        for index, activity in enumerate(activities):
+            due = started + index / rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            due_at[activity["conversation"]["id"]] = due
+            tasks.append(asyncio.create_task(send(activity, due)))
+        await asyncio.gather(*tasks)
+    return latencies, statuses, due_at
+
+
+async def run(args) -> dict:
+    jenkins = FakeJenkins(latency_ms=args.jenkins_latency, jitter_ms=args.jenkins_latency / 2,
+                          error_rate=args.jenkins_error_rate, build_seconds=args.build_seconds, seed=args.seed)
+    octopus = FakeOctopus(latency_ms=args.octopus_latency, jitter_ms=args.octopus_latency / 2,
+                          error_rate=args.octopus_error_rate, seed=args.seed)
+    connector = FakeConnector(latency_ms=args.connector_latency, jitter_ms=args.connector_latency / 2,
+                              error_rate=args.connector_error_rate, seed=args.seed)
+    fakes = (jenkins, octopus, connector)
+    for fake in fakes:
+        await fake.start()
+
+    templates = load_corpus(args.corpus)
+    count = args.count or int(args.rate * args.duration)
+    activities = [make_activity(templates[i % len(templates)], i, connector.url) for i in range(count)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        bot, runner, bot_url = await start_bot(jenkins, octopus, workdir)
+        try:
+            started = time.perf_counter()
+            latencies, statuses, due_at = await replay(bot_url, activities, args.rate)
+            sent_for = time.perf_counter() - started
+            drained = await drain(bot, args.drain_timeout)
+            finished_for = time.perf_counter() - started
+            # Builds still waiting for their Jenkins callback
+            await asyncio.sleep(args.build_seconds if jenkins.calls["trigger"] else 0)
+        finally:
+            await runner.cleanup()
+            for fake in fakes:
+                await fake.stop()
+
+    first_reply = [(connector.first_reply[conv] - due) * 1000
+                   for conv, due in due_at.items() if conv in connector.first_reply]
+    acknowledged = sum(n for status, n in statuses.items() if status.isdigit() and int(status) < 300)
+    return {
+        "config": {
+            "corpus": os.path.relpath(args.corpus), "activities": count, "rate": args.rate,
+            "latency_ms": {"jenkins": args.jenkins_latency, "octopus": args.octopus_latency,
+                           "connector": args.connector_latency},
+            "error_rate": {"jenkins": args.jenkins_error_rate, "octopus": args.octopus_error_rate,
+                           "connector": args.connector_error_rate},
+        },
+        "duration_s": round(finished_for, 2),
+        "throughput_rps": round(acknowledged / sent_for, 1) if sent_for else 0.0,
+        "drained": drained,
+        "http": {"status": dict(statuses), "latency_ms": percentiles(latencies)},
+        "first_reply_ms": {**percentiles(first_reply), "missing": len(due_at) - len(first_reply)},
+        "upstream": {fake.name: fake.report() for fake in fakes},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--rate", type=float, default=20, help="activities per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load (rate × duration activities)")
+    parser.add_argument("--count", type=int, default=0, help="send exactly this many activities instead")
+    parser.add_argument("--drain-timeout", type=float, default=60)
+    parser.add_argument("--build-seconds", type=float, default=1.0, help="fake Jenkins build time")
+    for name, latency in (("jenkins", 50), ("octopus", 80), ("connector", 30)):
+        parser.add_argument(f"--{name}-latency", type=float, default=latency, help="ms, plus up to 50%% jitter")
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--bot-log", default=os.devnull, help="where the bot's own output goes")
+    parser.add_argument("--out", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    with open(args.bot_log, "w") as log, contextlib.redirect_stdout(log):
+        report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
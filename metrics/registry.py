@@ -0,0 +1,260 @@
+"""
+metrics/registry.py
+Minimal in-process metrics (counters, gauges, histograms) in the Prometheus
+text exposition format.
+
+Label children are created once with `.labels(...)` and then reused, so the
+hot path is a couple of attribute updates — no locks, no dict lookups. The bot
+runs on a single event loop, which is what makes the lock-free updates safe.
+
+Each worker process has its own registry. With several workers, each one
+publishes `samples(worker)` through the shared store, and /metrics renders
+every worker's samples, labelled `worker="host:pid"` (sum them by the other
+labels for totals).
+"""
+from bisect import bisect_left
+from typing import Callable, Optional
+
+
+# Default latency buckets in seconds — tuned for chat commands and HTTP calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: tuple, values: tuple, *extra: str) -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    pairs.extend(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ─────────────────────────────────────────────────────────────
+# Children — one per label combination
+# ─────────────────────────────────────────────────────────────
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value", "_fn")
+
+    def __init__(self):
+        self.value = 0
+        self._fn = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set_function(self, fn: Callable[[], float]):
+        """Read the value from `fn()` at scrape time instead of storing it."""
+        self._fn = fn
+
+    def get(self) -> float:
+        return self._fn() if self._fn else self.value
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "buckets", "count", "sum")
+
+    def __init__(self, bounds: tuple):
+        self._bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)   # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.buckets[bisect_left(self._bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Bucket-resolution estimate of the q-quantile (upper bound of its bucket)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for bound, n in zip(self._bounds, self.buckets):
+            running += n
+            if running >= target:
+                return bound
+        return float("inf")
+
+
+# ─────────────────────────────────────────────────────────────
+# Metric families
+# ─────────────────────────────────────────────────────────────
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict = {}
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Return the child for these label values, creating it on first use."""
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def children(self) -> dict:
+        return self._children
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self, *extra: str) -> list[str]:
+        """Sample lines for every child; `extra` are label pairs added to each, e.g. 'worker="a"'."""
+        lines = []
+        for values, child in self._children.items():
+            lines.extend(self._render_child(values, child, extra))
+        return lines
+
+    def render(self) -> list[str]:
+        return self.header() + self.samples()
+
+    def _render_child(self, values: tuple, child, extra: tuple) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self._default.inc(amount)
+
+    def _render_child(self, values, child, extra):
+        return [f"{self.name}{_format_labels(self.labelnames, values, *extra)} {_format_value(child.value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def inc(self, amount: float = 1):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default.dec(amount)
+
+    def set_function(self, fn: Callable[[], float]):
+        self._default.set_function(fn)
+
+    def get(self) -> float:
+        return self._default.get()
+
+    def _render_child(self, values, child, extra):
+        return [f"{self.name}{_format_labels(self.labelnames, values, *extra)} {_format_value(child.get())}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _render_child(self, values, child, extra):
+        lines = []
+        running = 0
+        for bound, n in zip(self.bounds + (float("inf"),), child.buckets):
+            running += n
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, *extra, le)} {running}")
+        labels = _format_labels(self.labelnames, values, *extra)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+# ─────────────────────────────────────────────────────────────
+# Registry
+# ─────────────────────────────────────────────────────────────
+class Registry:
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing   # Module reloads / repeated construction share one family
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self, workers: list[dict] = None) -> str:
+        """
+        The exposition text. With `workers` — each worker process's samples() —
+        every family lists their samples instead of this process's own.
+        """
+        lines = []
+        for name, metric in self._metrics.items():
+            if workers is None:
+                lines.extend(metric.render())
+                continue
+            lines.extend(metric.header())
+            for samples in workers:
+                lines.extend(samples.get(name, ()))
+        return "\n".join(lines) + "\n"
+
+    def samples(self, worker: str) -> dict[str, list[str]]:
+        """Family name → sample lines labelled worker="<worker>", for render(workers=...) in another process."""
+        label = f'worker="{worker}"'
+        return {name: metric.samples(label) for name, metric in self._metrics.items()}
+
+
+REGISTRY = Registry()
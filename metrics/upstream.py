@@ -0,0 +1,50 @@
+"""
+metrics/upstream.py
+Latency and error metrics for calls to Jenkins and Octopus.
+
+Client methods are wrapped with `@instrumented(upstream, operation)`. The label
+children are bound when the decorator is applied, so a call only pays for two
+perf_counter() reads and a histogram observe.
+
+The clients report most failures as `{"status": "error", ...}` / `{"error": ...}`
+results rather than raising, so those count as errors too.
+"""
+import functools
+import time
+
+from metrics.registry import REGISTRY
+
+
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "deploybot_upstream_request_seconds", "Time spent in one Jenkins / Octopus operation",
+    ["upstream", "operation"])
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "deploybot_upstream_errors_total", "Jenkins / Octopus operations that failed",
+    ["upstream", "operation"])
+
+
+def _is_error(result) -> bool:
+    return isinstance(result, dict) and (result.get("status") == "error" or "error" in result)
+
+
+def instrumented(upstream: str, operation: str):
+    """Decorator for async client methods: time each call and count failures."""
+    latency = UPSTREAM_LATENCY.labels(upstream, operation)
+    errors = UPSTREAM_ERRORS.labels(upstream, operation)
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - started)
+            if _is_error(result):
+                errors.inc()
+            return result
+        return wrapper
+    return decorate
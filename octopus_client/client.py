@@ -4,43 +4,81 @@ Interacts with Octopus Cloud (octopus.app) via the Octopus REST API.
 
 Key operations:
   - Create a deployment (trigger release to an environment)
+  - Resolve a release once and deploy it to several environments (promote)
+  - Poll a deployment until Octopus finishes it
   - Get deployment status per environment
   - Trigger rollback (re-deploy previous release)
 
+Every request goes through UpstreamPolicy (resilience/policy.py): the Octopus
+circuit breaker, the command's deadline, and retries for GETs.
+
 Octopus REST API docs: https://octopus.com/docs/octopus-rest-api
 """
 import asyncio
 import aiohttp
+from cassette.transport import octopus_transport
 from config.settings import settings
+from metrics.upstream import instrumented
+from resilience.policy import UpstreamPolicy
+from tracing.tracer import span, traced
+
+
+def _is_fault(e: BaseException) -> bool:
+    """Errors that say Octopus itself is unhealthy: no connection, timeouts, 5xx and throttling."""
+    if isinstance(e, aiohttp.ClientResponseError):
+        return e.status >= 500 or e.status == 429
+    return isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError))
 
 
 class OctopusClient:
 
-    def __init__(self):
+    def __init__(self, transport=None):
         self.base_url = f"{settings.OCTOPUS_URL.rstrip('/')}/api/{settings.OCTOPUS_SPACE_ID}"
         self.headers = {
             "X-Octopus-ApiKey": settings.OCTOPUS_API_KEY,
             "Content-Type": "application/json",
         }
+        # Environment names → IDs; environments are fixed, so they are looked up once
+        self._environment_ids: dict[str, str] = {}
+        # Network, or a cassette recording / replaying it (CASSETTE_MODE); see cassette/transport.py
+        self._transport = transport or octopus_transport(aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=settings.OCTOPUS_CONNECT_TIMEOUT_SECONDS,
+            sock_read=settings.OCTOPUS_READ_TIMEOUT_SECONDS,
+        ))
+        self._policy = UpstreamPolicy("octopus", _is_fault)
 
     # ─────────────────────────────────────────────────────────────
     # Internal helpers
     # ─────────────────────────────────────────────────────────────
     async def _get(self, path: str) -> dict:
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.get(f"{self.base_url}{path}") as resp:
-                resp.raise_for_status()
-                return await resp.json()
+        async def get():
+            resp = await self._transport.request("GET", f"{self.base_url}{path}", self.headers)
+            resp.raise_for_status()
+            return resp.json()
+
+        with span("octopus.GET", path=path):
+            return await self._policy.call(get, idempotent=True)
 
     async def _post(self, path: str, payload: dict) -> dict:
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.post(f"{self.base_url}{path}", json=payload) as resp:
-                resp.raise_for_status()
-                return await resp.json()
+        # Creating a deployment twice would deploy twice, so POSTs are never retried
+        async def post():
+            resp = await self._transport.request("POST", f"{self.base_url}{path}", self.headers, payload)
+            resp.raise_for_status()
+            return resp.json()
+
+        with span("octopus.POST", path=path):
+            return await self._policy.call(post)
+
+    async def ping(self) -> str:
+        """Check Octopus is reachable and the API key can read the space; returns its name. Raises on failure."""
+        space = await self._get("")
+        return space.get("Name", "")
 
     # ─────────────────────────────────────────────────────────────
     # Resolve Octopus IDs from names
     # ─────────────────────────────────────────────────────────────
+    @traced("octopus.project")
     async def _get_project_id(self, app: str) -> str:
         """
         Finds the Octopus project whose Name matches the app name.
@@ -53,19 +91,24 @@ class OctopusClient:
                              f"Make sure the project name in Octopus matches exactly.")
         return items[0]["Id"]
 
+    @traced("octopus.environment")
     async def _get_environment_id(self, environment: str) -> str:
         """
         Finds the Octopus environment ID by name (case-insensitive match on qa/uat/prod).
         """
         ENV_NAME_MAP = {"qa": "QA", "uat": "UAT", "prod": "Production"}
         env_name = ENV_NAME_MAP.get(environment.lower(), environment)
+        if env_name in self._environment_ids:
+            return self._environment_ids[env_name]
         data = await self._get(f"/environments?name={env_name}&take=1")
         items = data.get("Items", [])
         if not items:
             raise ValueError(f"No Octopus environment found for `{environment}`. "
                              f"Expected environment named `{env_name}` in Octopus.")
+        self._environment_ids[env_name] = items[0]["Id"]
         return items[0]["Id"]
 
+    @traced("octopus.release_scan")
     async def _get_release_id(self, project_id: str, build_number: str) -> str:
         """
         Finds the Octopus release matching the Jenkins build number.
@@ -84,15 +127,39 @@ class OctopusClient:
     # ─────────────────────────────────────────────────────────────
     # Deploy
     # ─────────────────────────────────────────────────────────────
+    @instrumented("octopus", "resolve")
+    @traced("octopus.resolve_release")
+    async def resolve_release(self, app: str, build_number: str) -> dict:
+        """
+        Looks up the project and release for an app build once, so the same
+        release can be deployed to several environments without resolving it again.
+        Raises ValueError if either is missing.
+        """
+        project_id = await self._get_project_id(app)
+        release_id = await self._get_release_id(project_id, build_number)
+        return {"project_id": project_id, "release_id": release_id}
+
     async def deploy(self, app: str, build_number: str, environment: str) -> dict:
         """
         Creates an Octopus deployment for the given app, build, and environment.
         This triggers the full Octopus deployment process.
         """
         try:
-            project_id = await self._get_project_id(app)
+            release = await self.resolve_release(app, build_number)
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+        except Exception as e:
+            return {"status": "error", "message": f"Octopus API error: {str(e)}"}
+        return await self.deploy_release(release["release_id"], environment, build_number)
+
+    @instrumented("octopus", "deploy")
+    @traced("octopus.deploy_release")
+    async def deploy_release(self, release_id: str, environment: str, build_number: str) -> dict:
+        """
+        Deploys an already-resolved release (see resolve_release) to an environment.
+        """
+        try:
             environment_id = await self._get_environment_id(environment)
-            release_id = await self._get_release_id(project_id, build_number)
 
             payload = {
                 "ReleaseId": release_id,
@@ -110,9 +177,49 @@ class OctopusClient:
         except Exception as e:
             return {"status": "error", "message": f"Octopus API error: {str(e)}"}
 
+    # ─────────────────────────────────────────────────────────────
+    # Deployment progress
+    # ─────────────────────────────────────────────────────────────
+    @instrumented("octopus", "deployment_state")
+    @traced("octopus.deployment_state")
+    async def get_deployment_state(self, deployment_id: str) -> dict:
+        """
+        Returns the state of the server task running a deployment:
+        {"state": "Queued" | "Executing" | "Success" | "Failed" | "Canceled" | "TimedOut" | ...,
+         "completed": bool, "error": str}
+        """
+        deployment = await self._get(f"/deployments/{deployment_id}")
+        task = await self._get(f"/tasks/{deployment['TaskId']}")
+        return {
+            "state": task.get("State", "Unknown"),
+            "completed": bool(task.get("IsCompleted")),
+            "error": task.get("ErrorMessage") or "",
+        }
+
+    @traced("octopus.wait")
+    async def wait_for_deployment(self, deployment_id: str, poll_seconds: float, timeout_seconds: float) -> dict:
+        """
+        Polls a deployment until Octopus finishes it (see get_deployment_state).
+        Gives up with state "TimedOut" after `timeout_seconds`.
+        """
+        deadline = asyncio.get_running_loop().time() + timeout_seconds
+        while True:
+            try:
+                state = await self.get_deployment_state(deployment_id)
+                if state["completed"]:
+                    return state
+            except Exception as e:
+                print(f"[OCTOPUS] Could not read state of {deployment_id}: {e}")
+            if asyncio.get_running_loop().time() + poll_seconds > deadline:
+                return {"state": "TimedOut", "completed": False,
+                        "error": f"Still running after {timeout_seconds / 60:.0f} minutes"}
+            await asyncio.sleep(poll_seconds)
+
     # ─────────────────────────────────────────────────────────────
     # Status
     # ─────────────────────────────────────────────────────────────
+    @instrumented("octopus", "status")
+    @traced("octopus.status")
     async def get_status(self, app: str) -> dict:
         """
         Returns the latest deployment state for each environment (QA, UAT, Prod).
@@ -139,6 +246,8 @@ class OctopusClient:
     # ─────────────────────────────────────────────────────────────
     # Rollback — re-deploy the previous release
     # ─────────────────────────────────────────────────────────────
+    @instrumented("octopus", "rollback")
+    @traced("octopus.rollback")
     async def rollback(self, app: str, environment: str) -> dict:
         """
         Finds the second-latest release for the project and redeploys it.
@@ -0,0 +1,111 @@
+"""
+outbound/live_card.py
+A card that is posted once and then edited in place as its operation progresses.
+
+Flow:
+  1. `post()` sends the first render and keeps the activity ID Teams assigns
+  2. `set(**changes)` updates the OperationCard state and schedules a re-render;
+     transitions that arrive within CARD_UPDATE_DEBOUNCE_SECONDS collapse into
+     a single `update_activity` call
+  3. `settle()` waits until the latest state has been delivered
+
+If the channel did not return an activity ID, updates fall back to new messages.
+
+`record()` / `LiveCard.restore()` let another worker process (or a later turn)
+pick up a posted card and keep editing it.
+"""
+import asyncio
+from dataclasses import asdict
+from typing import Optional
+
+from botbuilder.core import MessageFactory, TurnContext
+
+from bot.cards import OperationCard
+from config.settings import settings
+from outbound.scheduler import OutboundScheduler
+
+
+class LiveCard:
+
+    def __init__(self, outbound: OutboundScheduler, turn_context: TurnContext,
+                 state: OperationCard, debounce: float = None, activity_id: str = None):
+        self.outbound = outbound
+        self.turn_context = turn_context
+        self.state = state
+        self.debounce = settings.CARD_UPDATE_DEBOUNCE_SECONDS if debounce is None else debounce
+        self.activity_id: Optional[str] = activity_id
+        self._flush: Optional[asyncio.Task] = None
+        self._dirty = False
+
+    async def post(self):
+        """Send the first render of the card."""
+        response = await self.outbound.send(self.turn_context, MessageFactory.attachment(self.state.render()))
+        self.activity_id = getattr(response, "id", None) or None
+
+    def set(self, **changes):
+        """Apply state changes; the re-render goes out after the debounce window."""
+        for name, value in changes.items():
+            setattr(self.state, name, value)
+        self._dirty = True
+        if self._flush is None or self._flush.done():
+            self._flush = asyncio.ensure_future(self._flush_later())
+
+    async def settle(self):
+        """Wait for any scheduled re-render to be delivered."""
+        while self._flush is not None and not self._flush.done():
+            await asyncio.shield(self._flush)
+
+    def record(self) -> dict:
+        """The posted card's activity ID and state, as JSON-ready data."""
+        return {"activity_id": self.activity_id, "state": asdict(self.state)}
+
+    @classmethod
+    def restore(cls, outbound: OutboundScheduler, turn_context: TurnContext, record: dict) -> "LiveCard":
+        """A LiveCard for a card posted elsewhere; `turn_context` must be in the card's conversation."""
+        return cls(outbound, turn_context, OperationCard(**record["state"]), activity_id=record["activity_id"])
+
+    async def _flush_later(self):
+        # Changes made while an update is in flight get one more pass
+        while self._dirty:
+            await asyncio.sleep(self.debounce)
+            self._dirty = False
+            activity = MessageFactory.attachment(self.state.render())
+            try:
+                if self.activity_id:
+                    await self.outbound.update(self.turn_context, self.activity_id, activity)
+                else:
+                    await self.outbound.send(self.turn_context, activity)
+            except Exception as e:
+                print(f"[CARD] Could not update {self.state.kind} card for {self.state.app}: {e}")
+
+
+class LiveRow:
+    """
+    One line of a batch summary card. Stands in for a command's own LiveCard
+    when it runs as part of a multi-command message: `post()` / `set()` /
+    `settle()` edit the line instead of posting a separate card.
+    """
+
+    def __init__(self, summary: LiveCard, index: int):
+        self.summary = summary
+        self.index = index
+        self.state: Optional[OperationCard] = None
+
+    def attach(self, state: OperationCard) -> "LiveRow":
+        self.state = state
+        return self
+
+    async def post(self):
+        self.show(self.state.status_line)
+
+    def set(self, **changes):
+        for name, value in changes.items():
+            setattr(self.state, name, value)
+        self.show(self.state.status_line)
+
+    def show(self, status: str):
+        self.summary.state.rows[self.index].status = status
+        self.summary.set()
+
+    async def settle(self):
+        await self.summary.settle()
@@ -0,0 +1,252 @@
+"""
+outbound/scheduler.py
+Paces everything the bot sends to Teams, one lane per conversation.
+
+Teams throttles bots per conversation. Instead of calling `send_activity`
+directly, DeployBot and ApprovalManager hand activities to `send()`, which
+queues them on the conversation's lane:
+
+  - each lane drains through a token bucket (OUTBOUND_RATE_PER_SECOND / OUTBOUND_BURST,
+    split evenly between the WEB_CONCURRENCY workers, which each pace their own lanes)
+  - consecutive plain-text messages still waiting in a lane go out as one message
+  - `update()` replaces a card already posted; a newer update for the same card
+    supersedes one still waiting in the lane
+  - a 429 pauses the lane for the `Retry-After` the connector asked for, then retries;
+    after OUTBOUND_MAX_RETRIES the message is dropped and counted
+"""
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Optional, Union
+
+from botbuilder.core import MessageFactory, TurnContext
+from botbuilder.schema import Activity, ActivityTypes, ResourceResponse
+
+from config.settings import settings
+from metrics.registry import REGISTRY
+
+
+DELIVERY_LATENCY = REGISTRY.histogram(
+    "deploybot_outbound_delivery_seconds", "Time from queueing an outbound message to Teams accepting it")
+DROPPED = REGISTRY.counter(
+    "deploybot_outbound_dropped_total", "Outbound messages given up on", ["reason"])
+THROTTLED = REGISTRY.counter(
+    "deploybot_outbound_throttled_total", "429 responses received from the Bot Connector")
+MERGED = REGISTRY.counter(
+    "deploybot_outbound_merged_total", "Text messages folded into a neighbouring message")
+
+_DROPPED_OVERFLOW = DROPPED.labels("queue_full")
+_DROPPED_THROTTLED = DROPPED.labels("throttled")
+
+
+class _TokenBucket:
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def drain(self):
+        self._refill()
+        self.tokens = 0.0
+
+
+@dataclass
+class _Outgoing:
+    activity: Activity
+    turn_context: TurnContext
+    future: asyncio.Future
+    update_of: Optional[str] = None        # Activity ID this replaces (update_activity)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def mergeable(self) -> bool:
+        a = self.activity
+        return self.update_of is None and a.type == ActivityTypes.message and bool(a.text) and not a.attachments
+
+
+@dataclass
+class _Lane:
+    bucket: _TokenBucket
+    queue: deque = field(default_factory=deque)
+    worker: Optional[asyncio.Task] = None
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class OutboundScheduler:
+
+    def __init__(self):
+        # A conversation's messages can come from any worker: each gets its share of the budget
+        workers = max(1, settings.WEB_CONCURRENCY)
+        self.rate = settings.OUTBOUND_RATE_PER_SECOND / workers
+        self.burst = max(1, settings.OUTBOUND_BURST // workers)
+        self.queue_limit = settings.OUTBOUND_QUEUE_LIMIT
+        self.max_retries = settings.OUTBOUND_MAX_RETRIES
+        self._lanes: dict[str, _Lane] = {}
+
+    # ─────────────────────────────────────────────────────────────
+    # Public API
+    # ─────────────────────────────────────────────────────────────
+    async def send(
+        self, turn_context: TurnContext, activity: Union[Activity, str],
+    ) -> Optional[ResourceResponse]:
+        """
+        Queue `activity` for the conversation of `turn_context` and wait until Teams
+        accepts it. Returns the connector's ResourceResponse, or None if dropped.
+        """
+        if isinstance(activity, str):
+            activity = MessageFactory.text(activity)
+        return await self._enqueue(turn_context, activity)
+
+    async def update(
+        self, turn_context: TurnContext, activity_id: str, activity: Activity,
+    ) -> Optional[ResourceResponse]:
+        """
+        Queue a replacement for the already-posted activity `activity_id`.
+        If an older replacement for it is still waiting, that one is superseded.
+        """
+        lane = self._lanes.get(turn_context.activity.conversation.id)
+        if lane is not None:
+            for item in lane.queue:
+                if item.update_of == activity_id:
+                    item.activity = activity
+                    return await item.future
+        return await self._enqueue(turn_context, activity, update_of=activity_id)
+
+    async def _enqueue(self, turn_context: TurnContext, activity: Activity,
+                       update_of: str = None) -> Optional[ResourceResponse]:
+        conversation_id = turn_context.activity.conversation.id
+        lane = self._lane(conversation_id)
+        if len(lane.queue) >= self.queue_limit:
+            _DROPPED_OVERFLOW.inc()
+            print(f"[OUTBOUND] Queue full for {conversation_id}, dropping message")
+            return None
+
+        item = _Outgoing(activity, turn_context, asyncio.get_running_loop().create_future(), update_of)
+        lane.queue.append(item)
+        if lane.worker is None or lane.worker.done():
+            lane.worker = asyncio.create_task(self._drain(conversation_id, lane))
+        return await item.future
+
+    async def flush(self, timeout: float):
+        """Wait up to `timeout` seconds for every lane to deliver what is queued on it."""
+        workers = [lane.worker for lane in self._lanes.values() if lane.worker and not lane.worker.done()]
+        if workers and timeout > 0:
+            await asyncio.wait(workers, timeout=timeout)
+
+    def snapshot(self) -> dict:
+        return {
+            "conversations": len(self._lanes),
+            "queued": sum(len(lane.queue) for lane in self._lanes.values()),
+        }
+
+    # ─────────────────────────────────────────────────────────────
+    # Lanes
+    # ─────────────────────────────────────────────────────────────
+    def _lane(self, conversation_id: str) -> _Lane:
+        lane = self._lanes.get(conversation_id)
+        if lane is None:
+            self._prune()
+            lane = self._lanes[conversation_id] = _Lane(_TokenBucket(self.rate, self.burst))
+        lane.last_used = time.monotonic()
+        return lane
+
+    def _prune(self, idle_seconds: float = 600):
+        cutoff = time.monotonic() - idle_seconds
+        for cid in [c for c, lane in self._lanes.items() if not lane.queue and lane.last_used < cutoff]:
+            del self._lanes[cid]
+
+    async def _drain(self, conversation_id: str, lane: _Lane):
+        while lane.queue:
+            wait = lane.bucket.wait_time()
+            if wait:
+                await asyncio.sleep(wait)
+            batch = self._next_batch(lane.queue)
+            lane.bucket.take()
+            await self._deliver(conversation_id, lane, batch)
+
+    def _next_batch(self, queue: deque) -> list[_Outgoing]:
+        """Pop the head of the lane plus any plain-text messages queued right behind it."""
+        batch = [queue.popleft()]
+        if batch[0].mergeable:
+            while queue and queue[0].mergeable:
+                batch.append(queue.popleft())
+        if len(batch) > 1:
+            MERGED.inc(len(batch) - 1)
+        return batch
+
+    async def _deliver(self, conversation_id: str, lane: _Lane, batch: list[_Outgoing]):
+        head = batch[0]
+        activity = head.activity
+        if len(batch) > 1:
+            activity = MessageFactory.text("\n\n".join(item.activity.text for item in batch))
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                if head.update_of:
+                    activity.id = head.update_of
+                    response = await head.turn_context.update_activity(activity)
+                else:
+                    response = await head.turn_context.send_activity(activity)
+            except Exception as e:
+                retry_after = _retry_after(e)
+                if retry_after is None:
+                    for item in batch:
+                        if not item.future.done():
+                            item.future.set_exception(e)
+                    return
+                THROTTLED.inc()
+                lane.bucket.drain()
+                print(f"[OUTBOUND] 429 for {conversation_id}, retrying in {retry_after:.1f}s")
+                await asyncio.sleep(retry_after if retry_after else 2 ** attempt)
+                continue
+
+            now = time.monotonic()
+            for item in batch:
+                DELIVERY_LATENCY.observe(now - item.enqueued_at)
+                if not item.future.done():
+                    item.future.set_result(response)
+            return
+
+        _DROPPED_THROTTLED.inc(len(batch))
+        print(f"[OUTBOUND] Giving up on {len(batch)} message(s) for {conversation_id} after repeated 429s")
+        for item in batch:
+            if not item.future.done():
+                item.future.set_result(None)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """
+    If `error` is a 429 from the Bot Connector, return how long to wait before
+    retrying (0 when the server gave no hint). Otherwise None.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(response, "status", None)
+    if status != 429:
+        return None
+    value = (getattr(response, "headers", None) or {}).get("Retry-After")
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
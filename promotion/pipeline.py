@@ -0,0 +1,168 @@
+"""
+promotion/pipeline.py
+`promote <app> <build#> qa>uat>prod` — one release through several environments.
+
+Flow:
+  1. The release is resolved in Octopus once; every stage deploys that release ID
+  2. Each stage starts as soon as the previous one has finished successfully in
+     Octopus (not just been triggered)
+  3. A stage that needs approval gets its approval card when the stage before it
+     starts deploying, so approvers sign off while it runs instead of after
+  4. A failed, rejected, expired or superseded stage stops the promotion; later
+     stages are cancelled, along with any approval already raised for them
+
+Progress is shown on one promotion card with a line per environment; approval
+cards are edited in step with their line.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+
+from botbuilder.core import TurnContext
+
+from approval.manager import ApprovalManager
+from audit.logger import AuditLogger
+from bot.cards import BatchRow, OperationCard, PromotionCard, deploy_outcome
+from config.settings import settings
+from jobs.deploys import DeployScheduler
+from outbound.live_card import LiveCard, LiveRow
+from outbound.scheduler import OutboundScheduler
+
+
+@dataclass
+class _Stage:
+    env: str
+    row: LiveRow
+    card: Optional[LiveCard] = None                 # Approval card, for stages that need one
+    approval_id: Optional[str] = None
+    decision: Optional[asyncio.Future] = None       # → (approved, approver)
+    approver: Optional[str] = None
+
+    def set(self, **changes):
+        self.row.set(**changes)
+        if self.card is not None:
+            self.card.set(**changes)
+
+
+class PromotionPipeline:
+
+    def __init__(self, deploys: DeployScheduler, approvals: ApprovalManager,
+                 outbound: OutboundScheduler, audit: AuditLogger = None, reads=None):
+        self.deploys = deploys
+        self.approvals = approvals
+        self.outbound = outbound
+        self.audit = audit or AuditLogger()
+        self.reads = reads
+
+    async def run(self, turn_context: TurnContext, app: str, build_number: str,
+                  environments: list[str], user: str):
+        states = [
+            OperationCard(kind="deploy", app=app, build=build_number, env=env, user=user, stage="waiting",
+                          detail=environments[index - 1].upper() if index else "the release lookup")
+            for index, env in enumerate(environments)
+        ]
+        summary = LiveCard(self.outbound, turn_context, PromotionCard(
+            app=app, build=build_number, user=user,
+            rows=[BatchRow(state.env.upper(), state.status_line) for state in states]))
+        await summary.post()
+        stages = [_Stage(env=state.env, row=LiveRow(summary, index).attach(state))
+                  for index, state in enumerate(states)]
+
+        try:
+            release = await self.deploys.octopus.resolve_release(app, build_number)
+        except Exception as e:
+            stages[0].set(stage="deploy_failed", detail=f"Could not find the release: {e}")
+            await self._stop(stages[1:], f"{environments[0].upper()} could not start")
+            await summary.settle()
+            return
+
+        if self._needs_approval(stages[0]):
+            await self._raise_approval(turn_context, stages[0], app, build_number, user, previous=None)
+
+        for index, stage in enumerate(stages):
+            later = stages[index + 1:]
+            if stage.decision is not None:
+                approved, approver = await stage.decision
+                if not approved:
+                    stage.set(stage="rejected" if approver else "expired", approver=approver)
+                    await self._stop(later, f"{stage.env.upper()} was not approved")
+                    break
+                stage.approver = approver
+
+            # Raise the next approval now, while this stage runs
+            if later and self._needs_approval(later[0]):
+                await self._raise_approval(turn_context, later[0], app, build_number, user, previous=stage)
+
+            if not await self._deploy(stage, app, build_number, release["release_id"], user):
+                await self._stop(later, f"{stage.env.upper()} did not succeed")
+                break
+        else:
+            print(f"[PROMOTE] {app} build #{build_number} promoted through {'>'.join(environments)}")
+
+        await summary.settle()
+        for stage in stages:
+            if stage.card is not None:
+                await stage.card.settle()
+
+    # ─────────────────────────────────────────────────────────────
+    # Stages
+    # ─────────────────────────────────────────────────────────────
+    async def _deploy(self, stage: _Stage, app: str, build_number: str, release_id: str, user: str) -> bool:
+        """Deploy one stage and wait for Octopus to finish it. True if it succeeded."""
+        stage.set(stage="deploying")
+        result = await self.deploys.deploy(app=app, build_number=build_number, environment=stage.env,
+                                           requested_by=user, release_id=release_id)
+        if result.get("status") == "triggered":
+            state = await self.deploys.octopus.wait_for_deployment(
+                result["deployment_id"],
+                poll_seconds=settings.PROMOTE_POLL_SECONDS,
+                timeout_seconds=settings.PROMOTE_STAGE_TIMEOUT_MINUTES * 60,
+            )
+            if state["state"] == "Success":
+                stage.set(stage="deploy_succeeded", detail=result.get("url") or "")
+            else:
+                result = {"status": "error", "deployment_id": result["deployment_id"],
+                          "message": f"Octopus deployment {state['state']} {state['error']}".strip()}
+                stage.set(stage="deploy_failed", detail=result["message"])
+        else:
+            stage.set(**deploy_outcome(result))
+
+        await self.audit.log(user=user, action="promote", app=app,
+                             details={"build": build_number, "env": stage.env, "approved_by": stage.approver},
+                             result=result)
+        if self.reads is not None:
+            self.reads.invalidate(app)
+        return stage.row.state.stage == "deploy_succeeded"
+
+    @staticmethod
+    def _needs_approval(stage: _Stage) -> bool:
+        return stage.env in settings.APPROVAL_REQUIRED_ENVS
+
+    async def _raise_approval(self, turn_context: TurnContext, stage: _Stage, app: str,
+                              build_number: str, user: str, previous: Optional[_Stage]):
+        stage.decision = asyncio.get_running_loop().create_future()
+
+        async def on_response(approved: bool, approver: Optional[str]):
+            if not stage.decision.done():
+                stage.decision.set_result((approved, approver))
+            if approved:
+                changes = {"approver": approver}
+                # Approved ahead of time: say so until the previous stage finishes
+                if previous is not None and previous.row.state.stage == "deploying":
+                    changes.update(stage="approved", detail=f"{previous.env.upper()} to finish")
+                stage.set(**changes)
+
+        stage.approval_id = await self.approvals.create(
+            app=app, build_number=build_number, environment=stage.env,
+            requested_by=user, turn_context=turn_context, on_response=on_response,
+        )
+        stage.card = self.approvals.peek(stage.approval_id).card
+        stage.row.set(stage="awaiting_approval")
+
+    async def _stop(self, stages: list[_Stage], reason: str):
+        """Cancel stages that will not run, withdrawing their approval requests."""
+        for stage in stages:
+            if stage.approval_id and self.approvals.peek(stage.approval_id):
+                await self.approvals.cancel(stage.approval_id, reason)
+                stage.card = None
+            stage.set(stage="cancelled", detail=reason)
@@ -0,0 +1,121 @@
+"""
+resilience/breaker.py
+One circuit breaker per upstream (Octopus, Jenkins).
+
+  closed     calls go through; UPSTREAM_BREAKER_FAILURES failures in a row
+             open the circuit
+  open       calls fail straight away with CircuitOpen, for
+             UPSTREAM_BREAKER_RESET_SECONDS
+  half_open  one trial call goes through; success closes the circuit again,
+             failure opens it for another period
+
+Only faults of the upstream itself count as failures — connection errors,
+timeouts, 5xx and 429 answers (see the clients' `_is_fault`). A 404 or a
+validation error means it answered, and counts as a success.
+
+Breakers are shared by every client instance of an upstream: `breaker(name)`.
+State is exported as deploybot_upstream_breaker_state and shown in /health.
+"""
+import time
+from typing import Optional
+
+from config.settings import settings
+from metrics.registry import REGISTRY
+
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = REGISTRY.gauge(
+    "deploybot_upstream_breaker_state", "Circuit breaker per upstream: 0 closed, 1 half-open, 2 open", ["upstream"])
+BREAKER_OPENED = REGISTRY.counter(
+    "deploybot_upstream_breaker_opened_total", "Times an upstream's circuit opened", ["upstream"])
+BREAKER_REJECTED = REGISTRY.counter(
+    "deploybot_upstream_breaker_rejected_total", "Calls failed fast because the upstream's circuit was open",
+    ["upstream"])
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+class CircuitBreaker:
+
+    def __init__(self, upstream: str, failures: int = None, reset_seconds: float = None):
+        self.upstream = upstream
+        self.threshold = failures or settings.UPSTREAM_BREAKER_FAILURES
+        self.reset_seconds = settings.UPSTREAM_BREAKER_RESET_SECONDS if reset_seconds is None else reset_seconds
+        self.failures = 0                  # In a row
+        self._opened_at: Optional[float] = None
+        self._trial = False                # A half-open trial call is in flight
+        self._opened = BREAKER_OPENED.labels(upstream)
+        self._rejected = BREAKER_REJECTED.labels(upstream)
+        BREAKER_STATE.labels(upstream).set_function(lambda: _STATE_VALUES[self.state])
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        if time.monotonic() - self._opened_at < self.reset_seconds:
+            return OPEN
+        return HALF_OPEN
+
+    # ─────────────────────────────────────────────────────────────
+    # Around each call
+    # ─────────────────────────────────────────────────────────────
+    def allow(self):
+        """Raise CircuitOpen unless a call may go through now."""
+        state = self.state
+        if state == CLOSED:
+            return
+        if state == HALF_OPEN and not self._trial:
+            self._trial = True
+            return
+        self._rejected.inc()
+        wait = max(self._opened_at + self.reset_seconds - time.monotonic(), 0)
+        raise CircuitOpen(f"{self.upstream.capitalize()} is failing — not calling it for another {wait:.0f}s "
+                          f"(circuit open after {self.failures} failures in a row)")
+
+    def record(self, ok: Optional[bool]):
+        """
+        Outcome of a call that allow() let through: True if the upstream answered,
+        False on a fault, None when it says nothing either way (the caller's
+        deadline cut it short, or it was cancelled).
+        """
+        self._trial = False
+        if ok is None:
+            return
+        if ok:
+            if self._opened_at is not None:
+                print(f"[BREAKER] {self.upstream} circuit closed")
+            self.failures = 0
+            self._opened_at = None
+            return
+        self.failures += 1
+        if self._opened_at is not None or self.failures >= self.threshold:
+            if self._opened_at is None or self.state == HALF_OPEN:
+                self._opened.inc()
+                print(f"[BREAKER] {self.upstream} circuit open after {self.failures} failures in a row")
+            self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        state = self.state
+        body = {"state": state, "failures": self.failures}
+        if state == OPEN:
+            body["retry_in_s"] = round(self._opened_at + self.reset_seconds - time.monotonic(), 1)
+        return body
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def breaker(upstream: str) -> CircuitBreaker:
+    """The breaker shared by every client of `upstream`."""
+    if upstream not in _breakers:
+        _breakers[upstream] = CircuitBreaker(upstream)
+    return _breakers[upstream]
+
+
+def snapshot() -> dict:
+    """upstream → breaker state, for /health."""
+    return {name: b.snapshot() for name, b in _breakers.items()}
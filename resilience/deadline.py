@@ -0,0 +1,52 @@
+"""
+resilience/deadline.py
+Per-command deadlines that follow the work into every upstream call.
+
+DeployBot gives each queued command COMMAND_DEADLINE_SECONDS from the moment
+it was received. The deadline lives in a contextvar, like the current trace
+span, so it reaches the Octopus / Jenkins calls made anywhere below the
+handler; UpstreamPolicy (resilience/policy.py) cuts those calls short when
+it passes, and does not start new ones after it.
+
+  with within_deadline(deadline_after(120)):
+      ...                                   # remaining() counts down from 120s
+
+Long-lived worker tasks outlive the command that started them, so work handed
+to one carries its deadline across with `within_deadline(request.deadline)`.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deploybot_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of calling an upstream, or while waiting on one, once the command's deadline has passed."""
+
+
+def deadline_after(seconds: Optional[float]) -> Optional[float]:
+    """The deadline `seconds` from now, or None (no deadline) for None / 0."""
+    return time.monotonic() + seconds if seconds else None
+
+
+def current_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+@contextmanager
+def within_deadline(deadline: Optional[float]):
+    """Make `deadline` the current one inside a `with` block (None = no deadline), replacing any inherited one."""
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (negative once it has passed), or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
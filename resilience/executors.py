@@ -0,0 +1,177 @@
+"""
+resilience/executors.py
+Named, bounded thread pools for blocking work, one per subsystem:
+
+  jenkins  — python-jenkins calls (JenkinsClient)
+  sqlite   — audit log and idempotency database queries
+
+asyncio.to_thread shares the loop's default executor between everything, so a
+build storm's Jenkins calls used to queue in front of every other blocking
+call. Here each subsystem has its own <NAME>_EXECUTOR_WORKERS threads and
+room for <NAME>_EXECUTOR_QUEUE calls waiting for one. Beyond that, a call
+either waits for a slot (<NAME>_EXECUTOR_ON_FULL=wait) or fails straight away
+with ExecutorBusy (=reject). Waiting callers stay bounded by their command's
+deadline, since UpstreamPolicy wraps the whole call.
+
+  rows = await executor("sqlite").run(fetch_rows, app)
+
+Like asyncio.to_thread, the call runs in a copy of the caller's context, so
+trace spans and deadlines follow it. A caller that gives up (cancelled, or out
+of time) gets its call dropped if no thread has started it yet; a call already
+running keeps its slot until it returns.
+"""
+import asyncio
+import contextvars
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from config.settings import settings
+from metrics.registry import REGISTRY
+
+
+EXECUTOR_QUEUED = REGISTRY.gauge(
+    "deploybot_executor_queued", "Calls waiting for a thread of a bounded executor", ["executor"])
+EXECUTOR_RUNNING = REGISTRY.gauge(
+    "deploybot_executor_running", "Calls running on a bounded executor", ["executor"])
+EXECUTOR_WAIT = REGISTRY.histogram(
+    "deploybot_executor_wait_seconds", "Time from submitting a call to a thread starting it", ["executor"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0))
+EXECUTOR_REJECTED = REGISTRY.counter(
+    "deploybot_executor_rejected_total", "Calls refused because a bounded executor was full", ["executor"])
+
+THREAD_PREFIX = "executor-"
+ON_FULL = ("wait", "reject")
+
+T = TypeVar("T")
+
+
+class ExecutorBusy(Exception):
+    """Raised by `run()` when the executor is full and its policy is to reject."""
+
+
+class BoundedExecutor:
+
+    def __init__(self, name: str, workers: int, queue_size: int, on_full: str = "wait"):
+        if on_full not in ON_FULL:
+            raise ValueError(f"{name} executor: on_full must be one of {', '.join(ON_FULL)}, not {on_full!r}")
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self.on_full = on_full
+        self.in_flight = 0                         # Submitted to the pool: queued there or running
+        self._waiters: deque[asyncio.Future] = deque()   # Callers waiting for a slot (on_full=wait)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._wait = EXECUTOR_WAIT.labels(name)
+        self._rejected = EXECUTOR_REJECTED.labels(name)
+        EXECUTOR_QUEUED.labels(name).set_function(lambda: self.queued)
+        EXECUTOR_RUNNING.labels(name).set_function(lambda: min(self.in_flight, self.workers))
+
+    @property
+    def queued(self) -> int:
+        # The pool starts a call as soon as a thread is free, so anything past `workers` is waiting
+        return max(self.in_flight - self.workers, 0) + len(self._waiters)
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run `fn(*args, **kwargs)` on one of this executor's threads. Raises ExecutorBusy when full and rejecting."""
+        submitted = time.perf_counter()
+        await self._admit()
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        started = None
+
+        def call():
+            nonlocal started
+            started = time.perf_counter()
+            return context.run(fn, *args, **kwargs)
+
+        def finished(_):
+            # Runs on the worker thread (or wherever the future was cancelled)
+            try:
+                loop.call_soon_threadsafe(self._finished, submitted, started)
+            except RuntimeError:   # Loop already closed
+                self.in_flight -= 1
+
+        try:
+            future = self._executor().submit(call)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(finished)
+        return await asyncio.wrap_future(future)
+
+    # ─────────────────────────────────────────────────────────────
+    # Slots
+    # ─────────────────────────────────────────────────────────────
+    async def _admit(self):
+        if self.in_flight < self.workers + self.queue_size and not self._waiters:
+            self.in_flight += 1
+            return
+        if self.on_full == "reject":
+            self._rejected.inc()
+            raise ExecutorBusy(f"Too much {self.name} work in progress ({min(self.in_flight, self.workers)} running, "
+                               f"{self.queued} waiting) — try again shortly")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter   # _release() hands its slot over
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()   # Got the slot just as the caller gave up: pass it on
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def _release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _finished(self, submitted: float, started: Optional[float]):
+        if started is not None:
+            self._wait.observe(started - submitted)
+        self._release()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix=f"{THREAD_PREFIX}{self.name}")
+        return self._pool
+
+    def shutdown(self, wait: bool = True):
+        """Stop the threads once the calls already submitted are done."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=not wait)
+            self._pool = None
+
+    def snapshot(self) -> dict:
+        return {"workers": self.workers, "running": min(self.in_flight, self.workers), "queued": self.queued}
+
+
+_executors: dict[str, BoundedExecutor] = {}
+
+
+def executor(name: str) -> BoundedExecutor:
+    """The executor for subsystem `name`, sized from <NAME>_EXECUTOR_WORKERS / _QUEUE / _ON_FULL."""
+    if name not in _executors:
+        prefix = f"{name.upper()}_EXECUTOR"
+        _executors[name] = BoundedExecutor(
+            name,
+            workers=getattr(settings, f"{prefix}_WORKERS"),
+            queue_size=getattr(settings, f"{prefix}_QUEUE"),
+            on_full=getattr(settings, f"{prefix}_ON_FULL"),
+        )
+    return _executors[name]
+
+
+def snapshot() -> dict:
+    """executor name → threads, running and queued calls, for /health."""
+    return {name: pool.snapshot() for name, pool in _executors.items()}
+
+
+def shutdown_all(wait: bool = True):
+    for pool in _executors.values():
+        pool.shutdown(wait=wait)
@@ -0,0 +1,93 @@
+"""
+resilience/policy.py
+How the upstream clients make a call: behind the upstream's circuit breaker,
+within the current command's deadline, and — for idempotent GETs only —
+retried on upstream faults.
+
+  policy = UpstreamPolicy("octopus", is_fault=_is_fault)
+  data = await policy.call(lambda: transport.request("GET", ...), idempotent=True)
+
+Retries wait a random 0..UPSTREAM_RETRY_BACKOFF_SECONDS × 2^attempt ("full
+jitter", so callers that failed together do not come back together), and stop
+early when the wait would run past the deadline or the circuit has opened.
+Connect / read timeouts are set on each client's own transport; the deadline
+bounds the whole call on top of them.
+"""
+import asyncio
+import random
+from typing import Awaitable, Callable, TypeVar
+
+from config.settings import settings
+from metrics.registry import REGISTRY
+from resilience.breaker import OPEN, breaker
+from resilience.deadline import DeadlineExceeded, remaining
+from resilience.executors import ExecutorBusy
+
+
+RETRIES = REGISTRY.counter(
+    "deploybot_upstream_retries_total", "Idempotent upstream calls retried after a fault", ["upstream"])
+DEADLINE_EXCEEDED = REGISTRY.counter(
+    "deploybot_upstream_deadline_exceeded_total", "Upstream calls cut short or skipped by the command deadline",
+    ["upstream"])
+
+T = TypeVar("T")
+
+
+class UpstreamPolicy:
+
+    def __init__(self, upstream: str, is_fault: Callable[[BaseException], bool],
+                 retries: int = None, backoff: float = None):
+        self.upstream = upstream
+        self.is_fault = is_fault            # True for errors that say the upstream is unhealthy
+        self.retries = settings.UPSTREAM_RETRIES if retries is None else retries
+        self.backoff = settings.UPSTREAM_RETRY_BACKOFF_SECONDS if backoff is None else backoff
+        self.breaker = breaker(upstream)
+        self._retried = RETRIES.labels(upstream)
+        self._deadline_exceeded = DEADLINE_EXCEEDED.labels(upstream)
+
+    async def call(self, fn: Callable[[], Awaitable[T]], idempotent: bool = False) -> T:
+        """Await `fn()`; raises CircuitOpen, DeadlineExceeded or the last error from `fn`."""
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt(fn)
+            except (DeadlineExceeded, asyncio.CancelledError):
+                raise
+            except Exception as e:
+                if not idempotent or attempt >= self.retries or not self.is_fault(e):
+                    raise
+                delay = random.uniform(0, self.backoff * 2 ** attempt)
+                left = remaining()
+                if (left is not None and delay >= left) or self.breaker.state == OPEN:
+                    raise
+                attempt += 1
+                self._retried.inc()
+                print(f"[RETRY] {self.upstream} attempt {attempt + 1} in {delay:.2f}s after: {e}")
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]]) -> T:
+        left = remaining()
+        if left is not None and left <= 0:
+            self._deadline_exceeded.inc()
+            raise DeadlineExceeded(f"Not calling {self.upstream.capitalize()}: the command's deadline has passed")
+        self.breaker.allow()
+        ok = None
+        try:
+            async with asyncio.timeout(left) as scope:
+                result = await fn()
+            ok = True
+            return result
+        except TimeoutError as e:
+            if scope.expired():
+                self._deadline_exceeded.inc()
+                raise DeadlineExceeded(
+                    f"{self.upstream.capitalize()} did not answer before the command's deadline") from e
+            ok = False
+            raise
+        except ExecutorBusy:
+            raise   # Never reached the upstream
+        except Exception as e:
+            ok = not self.is_fault(e)
+            raise
+        finally:
+            self.breaker.record(ok)
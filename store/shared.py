@@ -0,0 +1,430 @@
+"""
+store/shared.py
+State the bot's worker processes share, in one SQLite database in WAL mode
+(STATE_DB_PATH), so a click or a Jenkins callback can be handled by whichever
+worker it reaches:
+
+  approvals — pending approval requests. Deciding (or expiring) one deletes its
+              row, so exactly one worker wins a double click or a click that
+              races the expiry timer
+  builds    — build cards waiting for their Jenkins callback, oldest first
+  changes   — a change feed. `notify(topic, key, data)` appends to it, and every
+              worker reads the other workers' entries every STATE_POLL_SECONDS
+              and passes them to the handlers registered with `subscribe(topic, handler)`
+  metrics   — each worker's latest metric samples, so /metrics can answer for
+              all of them whichever worker the scrape reaches
+  deploys   — deploys and rollbacks in request order per (app, environment),
+              whichever worker took them. Only the oldest one calls Octopus, so
+              two workers never deploy to one environment at once, and a waiting
+              deploy is superseded by a newer one from any worker (jobs/deploys.py)
+
+Rows name the worker that created them (`owner`). Work that only that process
+can finish — a promotion waiting on its approval gate, one line of a batch
+card — is handed to it through the change feed. A worker that shuts down
+`release()`s its rows, and the next worker to start `adopt()`s them; a single
+process without a shared store leaves them the same way in CHECKPOINT_PATH
+(checkpoint.db unless turned off; see checkpoint_store()).
+
+Queries run on the bounded "sqlite" executor. With STATE_DB_PATH unset,
+shared_store() is None and the bot keeps this state in process memory.
+Claims use DELETE ... RETURNING, so the store needs SQLite 3.35 or later.
+"""
+import asyncio
+import inspect
+import json
+import os
+import socket
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, Callable, Optional
+
+from config.settings import settings
+from metrics.registry import REGISTRY
+from resilience.executors import executor
+
+
+CHANGES_APPLIED = REGISTRY.counter(
+    "deploybot_state_changes_applied_total", "Change feed entries from other worker processes", ["topic"])
+
+# Owner of the rows a worker left behind when it shut down, until another worker adopts them
+RELEASED = ""
+
+# Change feed entries are pruned once they are this old; a worker reads them well within a second
+CHANGE_RETENTION_SECONDS = 300
+
+
+def worker_id() -> str:
+    """This process, as recorded in the rows it owns."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """A connection to a database that other worker processes write to as well."""
+    db = sqlite3.connect(path, timeout=settings.STATE_BUSY_TIMEOUT_SECONDS)
+    # WAL: readers do not wait for the writer. The mode is stored in the file, so
+    # this only does something on first use; NORMAL skips the fsync per commit
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = NORMAL")
+    return db
+
+
+class SharedStore:
+
+    def __init__(self, path: str, poll_seconds: float = None):
+        if sqlite3.sqlite_version_info < (3, 35):
+            raise RuntimeError(f"The shared state store needs SQLite 3.35 or later (for RETURNING); "
+                               f"this Python is linked against SQLite {sqlite3.sqlite_version}")
+        self.path = path
+        self.poll_seconds = settings.STATE_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self.worker = worker_id()
+        self._handlers: dict[str, list[Callable]] = {}
+        self._outbox: list[tuple] = []                   # Changes waiting to be written
+        self._flushing: Optional[asyncio.Task] = None
+        self._poller: Optional[asyncio.Task] = None
+        self._tasks: set[asyncio.Task] = set()           # Async handlers still running
+        self._schema_ready = False
+
+    # ─────────────────────────────────────────────────────────────
+    # Approvals
+    # ─────────────────────────────────────────────────────────────
+    async def add_approval(self, approval_id: str, record: dict, expires_at: float, owner: str = None):
+        await executor("sqlite").run(
+            self._execute, "INSERT INTO approvals (id, owner, record, expires_at) VALUES (?, ?, ?, ?)",
+            (approval_id, self.worker if owner is None else owner, json.dumps(record), expires_at))
+
+    async def update_approval(self, approval_id: str, record: dict):
+        await executor("sqlite").run(
+            self._execute, "UPDATE approvals SET record = ? WHERE id = ?", (json.dumps(record), approval_id))
+
+    async def claim_approval(self, approval_id: str, unexpired: bool = True) -> Optional[tuple[str, dict]]:
+        """
+        Take a pending approval off the store: (owner, record), or None if another
+        worker already decided, cancelled or expired it. With `unexpired`, an
+        approval past its expiry time cannot be claimed either.
+        """
+        row = await executor("sqlite").run(
+            self._fetch_one, "DELETE FROM approvals WHERE id = ? AND expires_at > ? RETURNING owner, record",
+            (approval_id, time.time() if unexpired else float("-inf")))
+        return (row[0], json.loads(row[1])) if row else None
+
+    # ─────────────────────────────────────────────────────────────
+    # Builds waiting for their Jenkins callback
+    # ─────────────────────────────────────────────────────────────
+    async def add_build(self, app: str, record: dict, owner: str = None) -> int:
+        row = await executor("sqlite").run(
+            self._fetch_one, "INSERT INTO builds (app, owner, record) VALUES (?, ?, ?) RETURNING id",
+            (app, self.worker if owner is None else owner, json.dumps(record)))
+        return row[0]
+
+    async def claim_build(self, app: str) -> Optional[tuple[int, str, dict]]:
+        """Take the oldest build waiting for `app`: (build id, owner, record), or None."""
+        row = await executor("sqlite").run(
+            self._fetch_one,
+            """
+            DELETE FROM builds
+            WHERE id = (SELECT id FROM builds WHERE app = ? ORDER BY id LIMIT 1)
+            RETURNING id, owner, record
+            """,
+            (app,))
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    # ─────────────────────────────────────────────────────────────
+    # Handing work over across a restart
+    # ─────────────────────────────────────────────────────────────
+    async def release(self) -> tuple[int, int]:
+        """Shutdown: leave this worker's approvals and builds to the next worker that adopts them."""
+        return await executor("sqlite").run(self._release)
+
+    async def adopt(self, remove: bool = False) -> tuple[list[tuple[str, dict, float]], list[tuple[int, str, dict]]]:
+        """
+        Startup: make the rows released by workers that shut down this worker's.
+        Returns the approvals as (id, record, expires_at) and the builds as
+        (id, app, record), oldest first. With `remove` the rows are deleted
+        instead, for a checkpoint file that only this process reads.
+        """
+        approvals, builds = await executor("sqlite").run(self._adopt, remove)
+        return ([(row[0], json.loads(row[1]), row[2]) for row in approvals],
+                [(row[0], row[1], json.loads(row[2])) for row in sorted(builds)])
+
+    # ─────────────────────────────────────────────────────────────
+    # Deploys, one environment at a time across workers
+    # ─────────────────────────────────────────────────────────────
+    async def enqueue_deploy(self, app: str, environment: str, build_number: Optional[str], requested_by: str,
+                             lease_seconds: float, seq: int = None) -> int:
+        """
+        Join the line for (app, environment); `build_number` None for a rollback.
+        Returns the place in it. Pass `seq` to rejoin at a place that was lost.
+        """
+        row = await executor("sqlite").run(
+            self._fetch_one,
+            "INSERT INTO deploys (seq, app, env, build, requested_by, owner, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) RETURNING seq",
+            (seq, app, environment, build_number, requested_by, self.worker, time.time() + lease_seconds))
+        return row[0]
+
+    async def deploy_turn(self, seq: int, lease_seconds: float) -> tuple[str, Optional[dict]]:
+        """
+        Whether deploy `seq` may call Octopus now:
+          ("go", None)          — it is the oldest in line; its environment is held for `lease_seconds`
+          ("wait", None)        — an older deploy or rollback, from any worker, is ahead of it
+          ("superseded", {...}) — a newer deploy, with no rollback between, replaced it and it left the line
+          ("lost", None)        — it was dropped from the line (see below); enqueue it again at `seq`
+        Entries whose worker stopped renewing them for `lease_seconds` — it died — are
+        dropped first; this worker's waiting entries are renewed.
+        """
+        return await executor("sqlite").run(self._deploy_turn, seq, lease_seconds)
+
+    async def finish_deploy(self, seq: int):
+        """Leave the line: the Octopus call is done, or the request was superseded here."""
+        await executor("sqlite").run(self._execute, "DELETE FROM deploys WHERE seq = ?", (seq,))
+
+    # ─────────────────────────────────────────────────────────────
+    # Metrics of every worker
+    # ─────────────────────────────────────────────────────────────
+    async def publish_metrics(self, samples: dict):
+        """Replace this worker's published samples (metrics.registry.Registry.samples)."""
+        await executor("sqlite").run(self._publish_metrics, json.dumps(samples))
+
+    async def worker_metrics(self, max_age: float) -> list[dict]:
+        """The samples the other workers published in the last `max_age` seconds (older ones are gone workers)."""
+        rows = await executor("sqlite").run(self._worker_metrics, time.time() - max_age)
+        return [json.loads(row[0]) for row in rows]
+
+    # ─────────────────────────────────────────────────────────────
+    # Change feed
+    # ─────────────────────────────────────────────────────────────
+    def subscribe(self, topic: str, handler: Callable[[str, Any], Any]):
+        """Call `handler(key, data)` (a coroutine function is fine) for other workers' `topic` changes."""
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def notify(self, topic: str, key: str, data: Any = None):
+        """Tell the other workers about a change. Written in the background, batched with any others."""
+        self._outbox.append((topic, key, None if data is None else json.dumps(data), self.worker, time.time()))
+        if self._flushing is None or self._flushing.done():
+            self._flushing = asyncio.ensure_future(self._flush())
+
+    def start(self):
+        """Start following the change feed (from now on; earlier entries are skipped)."""
+        if self._poller is None:
+            self._poller = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+        if self._flushing is not None:
+            await self._flushing
+
+    async def _flush(self):
+        while self._outbox:
+            batch, self._outbox = self._outbox, []
+            try:
+                await executor("sqlite").run(self._append_changes, batch)
+            except Exception as e:
+                print(f"[STATE] Could not publish {len(batch)} change(s): {e}")
+
+    async def _poll(self):
+        last = await executor("sqlite").run(self._latest_change)
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                changes = await executor("sqlite").run(self._changes_since, last)
+            except Exception as e:
+                print(f"[STATE] Could not read the change feed: {e}")
+                continue
+            for seq, topic, key, data in changes:
+                last = seq
+                self._apply(topic, key, None if data is None else json.loads(data))
+
+    def _apply(self, topic: str, key: str, data: Any):
+        CHANGES_APPLIED.labels(topic).inc()
+        for handler in self._handlers.get(topic, ()):
+            try:
+                result = handler(key, data)
+            except Exception as e:
+                print(f"[STATE] {topic} change for {key} failed: {e}")
+                continue
+            if inspect.isawaitable(result):
+                task = asyncio.ensure_future(result)
+                self._tasks.add(task)
+                task.add_done_callback(self._handled)
+
+    def _handled(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[STATE] Change handler failed: {task.exception()}")
+
+    # ─────────────────────────────────────────────────────────────
+    # Database — these run on the sqlite executor
+    # ─────────────────────────────────────────────────────────────
+    def _connect(self) -> closing:
+        db = connect(self.path)
+        if not self._schema_ready:
+            self._ensure_schema(db)
+            self._schema_ready = True
+        return closing(db)
+
+    @staticmethod
+    def _ensure_schema(db: sqlite3.Connection):
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS approvals (
+                id         TEXT PRIMARY KEY,
+                owner      TEXT NOT NULL,
+                record     TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS builds (
+                id     INTEGER PRIMARY KEY AUTOINCREMENT,
+                app    TEXT NOT NULL,
+                owner  TEXT NOT NULL,
+                record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_builds_app_id ON builds (app, id);
+            CREATE TABLE IF NOT EXISTS changes (
+                seq    INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic  TEXT NOT NULL,
+                key    TEXT NOT NULL,
+                data   TEXT,
+                origin TEXT NOT NULL,
+                at     REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS metrics (
+                worker  TEXT PRIMARY KEY,
+                samples TEXT NOT NULL,
+                at      REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS deploys (
+                seq          INTEGER PRIMARY KEY AUTOINCREMENT,
+                app          TEXT NOT NULL,
+                env          TEXT NOT NULL,
+                build        TEXT,
+                requested_by TEXT NOT NULL,
+                owner        TEXT NOT NULL,
+                started      INTEGER NOT NULL DEFAULT 0,
+                expires_at   REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_deploys_env_seq ON deploys (app, env, seq);
+        """)
+
+    def _execute(self, sql: str, params: tuple):
+        with self._connect() as db:
+            db.execute(sql, params)
+            db.commit()
+
+    def _fetch_one(self, sql: str, params: tuple) -> Optional[tuple]:
+        with self._connect() as db:
+            row = db.execute(sql, params).fetchone()
+            db.commit()
+            return row
+
+    def _release(self) -> tuple[int, int]:
+        with self._connect() as db:
+            approvals = db.execute("UPDATE approvals SET owner = ? WHERE owner = ?", (RELEASED, self.worker)).rowcount
+            builds = db.execute("UPDATE builds SET owner = ? WHERE owner = ?", (RELEASED, self.worker)).rowcount
+            # Deploys still in line were not drained in time; let the other workers' go ahead
+            db.execute("DELETE FROM deploys WHERE owner = ?", (self.worker,))
+            db.commit()
+            return approvals, builds
+
+    def _adopt(self, remove: bool) -> tuple[list[tuple], list[tuple]]:
+        take = "DELETE FROM {table} WHERE owner = ?" if remove else "UPDATE {table} SET owner = ? WHERE owner = ?"
+        params = (RELEASED,) if remove else (self.worker, RELEASED)
+        with self._connect() as db:
+            approvals = db.execute(take.format(table="approvals") + " RETURNING id, record, expires_at",
+                                   params).fetchall()
+            builds = db.execute(take.format(table="builds") + " RETURNING id, app, record", params).fetchall()
+            db.commit()
+            return approvals, builds
+
+    def _deploy_turn(self, seq: int, lease_seconds: float) -> tuple[str, Optional[dict]]:
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM deploys WHERE expires_at < ?", (now,))
+            db.execute("UPDATE deploys SET expires_at = ? WHERE owner = ? AND NOT started",
+                       (now + lease_seconds, self.worker))
+            mine = db.execute("SELECT app, env, build FROM deploys WHERE seq = ?", (seq,)).fetchone()
+            if mine is None:
+                db.commit()
+                return "lost", None
+            app, env, build = mine
+            if build is not None:
+                newer = db.execute(
+                    """
+                    SELECT build, requested_by FROM deploys
+                    WHERE app = ? AND env = ? AND seq > ? AND build IS NOT NULL
+                      AND NOT EXISTS (SELECT 1 FROM deploys AS rollback
+                                      WHERE rollback.app = deploys.app AND rollback.env = deploys.env
+                                        AND rollback.seq > ? AND rollback.seq < deploys.seq
+                                        AND rollback.build IS NULL)
+                    ORDER BY seq LIMIT 1
+                    """,
+                    (app, env, seq, seq)).fetchone()
+                if newer is not None:
+                    db.execute("DELETE FROM deploys WHERE seq = ?", (seq,))
+                    db.commit()
+                    return "superseded", {"superseded_by": newer[0], "superseded_by_user": newer[1]}
+            head, running = db.execute(
+                "SELECT MIN(seq), MAX(started) FROM deploys WHERE app = ? AND env = ?", (app, env)).fetchone()
+            if head != seq or running:
+                db.commit()
+                return "wait", None
+            db.execute("UPDATE deploys SET started = 1, expires_at = ? WHERE seq = ?", (now + lease_seconds, seq))
+            db.commit()
+            return "go", None
+
+    def _append_changes(self, batch: list[tuple]):
+        with self._connect() as db:
+            db.executemany("INSERT INTO changes (topic, key, data, origin, at) VALUES (?, ?, ?, ?, ?)", batch)
+            db.execute("DELETE FROM changes WHERE at < ?", (time.time() - CHANGE_RETENTION_SECONDS,))
+            db.commit()
+
+    def _publish_metrics(self, samples: str):
+        now = time.time()
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO metrics (worker, samples, at) VALUES (?, ?, ?)",
+                       (self.worker, samples, now))
+            db.execute("DELETE FROM metrics WHERE at < ?", (now - CHANGE_RETENTION_SECONDS,))
+            db.commit()
+
+    def _worker_metrics(self, since: float) -> list[tuple]:
+        with self._connect() as db:
+            return db.execute("SELECT samples FROM metrics WHERE worker != ? AND at >= ? ORDER BY worker",
+                              (self.worker, since)).fetchall()
+
+    def _latest_change(self) -> int:
+        with self._connect() as db:
+            return db.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def _changes_since(self, seq: int) -> list[tuple]:
+        with self._connect() as db:
+            return db.execute(
+                "SELECT seq, topic, key, data FROM changes WHERE seq > ? AND origin != ? ORDER BY seq",
+                (seq, self.worker),
+            ).fetchall()
+
+
+_store: Optional[SharedStore] = None
+
+
+def shared_store() -> Optional[SharedStore]:
+    """The store for STATE_DB_PATH, or None when the bot runs as a single process without one."""
+    global _store
+    if _store is None and settings.STATE_DB_PATH:
+        _store = SharedStore(settings.STATE_DB_PATH)
+    return _store
+
+
+def checkpoint_store() -> Optional[SharedStore]:
+    """
+    Where unfinished work is left at shutdown and looked for at startup: the
+    shared store, else a store at CHECKPOINT_PATH (None if that is turned off).
+    """
+    if shared_store() is not None:
+        return _store
+    return SharedStore(settings.CHECKPOINT_PATH) if settings.CHECKPOINT_PATH else None
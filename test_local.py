@@ -12,7 +12,7 @@ import io
 # Fix Windows console encoding
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
 
-from bot.command_parser import parse_command
+from bot.command_parser import parse_command, parse_commands
 
 # ── Colours for terminal output ──────────────────────────────
 GREEN  = "\033[92m"
@@ -84,6 +84,54 @@ def run_parser_tests():
     return failed == 0
 
 
+def run_batch_tests():
+    print(f"\n{BOLD}{'='*55}")
+    print("  MULTI-COMMAND MESSAGE TESTS")
+    print(f"{'='*55}{RESET}\n")
+
+    tests = [
+        # (input message,                                  expected actions,                 which have errors)
+        ("build api main; build web main",                 ["build", "build"],               [False, False]),
+        ("build api main\ndeploy worker 17 qa",            ["build", "deploy"],              [False, False]),
+        ("status api\r\nhistory api;help",                 ["status", "history", "help"],    [False, False, False]),
+        ("build api main;;  ; \n\nstatus api",              ["build", "status"],              [False, False]),  # empty segments
+        ("build api main;",                                ["build"],                        [False]),         # trailing separator
+        (" ; \n ",                                         ["help"],                         [False]),         # only separators
+        ("build api main; deploy api 17 staging; frobnicate; status api",
+                                                           ["build", "deploy", "unknown", "status"],
+                                                                                             [False, True, True, False]),
+        ("<at>DeployBot</at> build api main; build web",   ["build", "build"],               [False, True]),   # Teams @mention
+    ]
+
+    passed = 0
+    failed = 0
+
+    for message, expected_actions, expect_errors in tests:
+        cmds = parse_commands(message)
+        actions = [cmd.action for cmd in cmds]
+        errors = [bool(cmd.error) for cmd in cmds]
+
+        if actions == expected_actions and errors == expect_errors:
+            status = f"{GREEN}[PASS]{RESET}"
+            passed += 1
+        else:
+            status = f"{RED}[FAIL]{RESET}"
+            failed += 1
+
+        display_msg = message.replace("\r", "\\r").replace("\n", "\\n")
+        display_msg = display_msg[:45] + "..." if len(display_msg) > 45 else display_msg
+        print(f"  {status}  {YELLOW}\"{display_msg}\"{RESET}")
+
+        if actions != expected_actions:
+            print(f"         actions: expected={expected_actions}  got={actions}")
+        if errors != expect_errors:
+            print(f"         errors:  expected={expect_errors}  got={errors}")
+        print()
+
+    print(f"{BOLD}Results: {GREEN}{passed} passed{RESET}{BOLD}, {RED}{failed} failed{RESET}\n")
+    return failed == 0
+
+
 def run_settings_check():
     print(f"\n{BOLD}{'='*55}")
     print("  SETTINGS / .ENV CHECK")
@@ -120,6 +168,7 @@ def run_settings_check():
 
 if __name__ == "__main__":
     parser_ok = run_parser_tests()
+    parser_ok = run_batch_tests() and parser_ok
     run_settings_check()
 
     if parser_ok:
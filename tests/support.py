@@ -0,0 +1,51 @@
+"""
+tests/support.py
+Stand-ins shared by the tests: an adapter that records what the bot sends
+instead of calling the Bot Connector, and incoming Teams activities.
+"""
+import asyncio
+import itertools
+
+from botbuilder.core import BotAdapter, TurnContext
+from botbuilder.schema import Activity, ChannelAccount, ConversationAccount, ResourceResponse
+
+_ids = itertools.count(1)
+
+
+class FakeAdapter(BotAdapter):
+    """Records sent / updated activities and the conversations continued proactively."""
+
+    def __init__(self):
+        super().__init__()
+        self.sent: list[Activity] = []
+        self.updated: list[Activity] = []
+        self.continued: list[str] = []   # Conversation IDs passed to continue_conversation
+
+    async def send_activities(self, context: TurnContext, activities: list) -> list:
+        self.sent.extend(activities)
+        return [ResourceResponse(id=f"activity-{next(_ids)}") for _ in activities]
+
+    async def update_activity(self, context: TurnContext, activity: Activity):
+        self.updated.append(activity)
+        return ResourceResponse(id=activity.id)
+
+    async def delete_activity(self, context: TurnContext, reference):
+        pass
+
+    async def continue_conversation(self, reference, callback, bot_id=None, claims_identity=None, audience=None):
+        self.continued.append(reference.conversation.id)
+        return await super().continue_conversation(reference, callback, bot_id, claims_identity, audience)
+
+    def incoming(self, text: str, conversation: str = "conv-1", user: str = "Dev") -> TurnContext:
+        """A turn for a Teams message `text` arriving in `conversation`."""
+        # Type as a plain string, the way activities arrive off the wire
+        return TurnContext(self, Activity(
+            type="message", id=f"msg-{next(_ids)}", channel_id="msteams", text=text,
+            service_url="https://smba.example/", from_property=ChannelAccount(id="u1", name=user),
+            recipient=ChannelAccount(id="bot", name="DeployBot"), conversation=ConversationAccount(id=conversation),
+        ))
+
+
+def run(coroutine):
+    """Run one test scenario on a fresh event loop."""
+    return asyncio.run(coroutine)
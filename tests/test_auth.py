@@ -0,0 +1,130 @@
+"""
+tests/test_auth.py
+The token cache in front of the adapter's validation (auth/tokens.py), on a fake clock.
+"""
+from types import SimpleNamespace
+
+import pytest
+from botframework.connector.auth import ClaimsIdentity
+
+import auth.tokens
+from auth.tokens import TokenValidator
+from tests.support import run
+
+TOKEN = "Bearer header.payload.signature"
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+
+class FakeAdapter:
+    """The adapter's own validation: answers with the queued outcomes, counting calls."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def _authenticate_request(self, activity, auth_header: str) -> ClaimsIdentity:
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def identity(expires: float) -> ClaimsIdentity:
+    return ClaimsIdentity({"exp": expires, "aud": "app-id"}, True)
+
+
+def activity(channel: str = "msteams", service_url: str = "https://smba.example/") -> SimpleNamespace:
+    return SimpleNamespace(channel_id=channel, service_url=service_url)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(auth.tokens, "time", clock)
+    return clock
+
+
+def validator(adapter: FakeAdapter, reject_seconds: float = 60) -> TokenValidator:
+    tokens = TokenValidator(adapter, max_entries=10, reject_seconds=reject_seconds)
+    tokens.disabled = False   # As with a MicrosoftAppId configured
+    return tokens
+
+
+def test_a_verified_token_is_reused_only_for_its_channel_and_service_url(clock):
+    verified = identity(clock.now + 3600)
+    adapter = FakeAdapter(verified, identity(clock.now + 3600), identity(clock.now + 3600))
+    tokens = validator(adapter)
+
+    async def scenario():
+        assert await tokens.authenticate(activity(), TOKEN) is verified
+        assert await tokens.authenticate(activity(), TOKEN) is verified
+        assert adapter.calls == 1
+
+        await tokens.authenticate(activity(service_url="https://smba.elsewhere/"), TOKEN)
+        assert adapter.calls == 2
+        await tokens.authenticate(activity(channel="emulator"), TOKEN)
+        assert adapter.calls == 3
+    run(scenario())
+
+
+def test_a_cached_identity_expires_with_its_token(clock):
+    first, second = identity(clock.now + 600), identity(clock.now + 4200)
+    adapter = FakeAdapter(first, second)
+    tokens = validator(adapter)
+
+    async def scenario():
+        assert await tokens.authenticate(activity(), TOKEN) is first
+        clock.now += 599
+        assert await tokens.authenticate(activity(), TOKEN) is first
+        clock.now += 1
+        assert await tokens.authenticate(activity(), TOKEN) is second
+        assert adapter.calls == 2
+    run(scenario())
+
+
+def test_a_rejected_token_stays_rejected_until_the_reject_ttl_passes(clock):
+    later = identity(clock.now + 3600)
+    adapter = FakeAdapter(PermissionError("Unauthorized Access. Request is not authorized"), later)
+    tokens = validator(adapter, reject_seconds=60)
+
+    async def scenario():
+        with pytest.raises(PermissionError):
+            await tokens.authenticate(activity(), TOKEN)
+        # Refused from the cache — the adapter, which would now accept it, is not asked
+        clock.now += 59
+        with pytest.raises(PermissionError, match="rejected"):
+            await tokens.authenticate(activity(), TOKEN)
+        assert adapter.calls == 1
+
+        clock.now += 1
+        assert await tokens.authenticate(activity(), TOKEN) is later
+        assert adapter.calls == 2
+    run(scenario())
+
+
+def test_a_failed_key_fetch_is_never_cached_as_a_rejection(clock):
+    verified = identity(clock.now + 3600)
+    adapter = FakeAdapter(ConnectionError("login.botframework.com unreachable"), verified)
+    tokens = validator(adapter)
+
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            await tokens.authenticate(activity(), TOKEN)
+        assert await tokens.authenticate(activity(), TOKEN) is verified
+        assert adapter.calls == 2
+    run(scenario())
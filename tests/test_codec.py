@@ -0,0 +1,92 @@
+"""
+tests/test_codec.py
+The /api/messages codec (codec/): JSON round trips through orjson and the stdlib
+fallback alike, and the lean activity decoder against full deserialization.
+"""
+import json
+
+import pytest
+from botbuilder.schema import Activity
+
+import codec.fastjson
+from codec.activity import ACTIVITY_DECODES, decode_activity
+from codec.fastjson import dumps, json_response, loads
+from config.settings import settings
+
+MESSAGE = {
+    "type": "message",
+    "id": "1700000000000",
+    "timestamp": "2024-11-14T22:13:20.000Z",
+    "localTimestamp": "2024-11-14T23:13:20.000+01:00",
+    "localTimezone": "Europe/Berlin",
+    "serviceUrl": "https://smba.trafficmanager.net/emea/",
+    "channelId": "msteams",
+    "from": {"id": "29:1abc", "name": "Dana Ops", "aadObjectId": "aad-user-1"},
+    "conversation": {"isGroup": True, "conversationType": "channel", "tenantId": "tenant-1",
+                     "id": "19:deploys@thread.tacv2;messageid=1700000000000"},
+    "recipient": {"id": "28:bot-id", "name": "DeployBot"},
+    "textFormat": "plain",
+    "locale": "de-DE",
+    "text": "<at>DeployBot</at> deploy myapp 42 prod — «Ärger» 🚀",
+    "entities": [{"type": "clientInfo", "locale": "de-DE", "country": "DE", "platform": "Web"}],
+    "channelData": {"tenant": {"id": "tenant-1"}, "teamsChannelId": "19:deploys@thread.tacv2"},
+}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def parser(request, monkeypatch) -> str:
+    """Each test runs with orjson, when it is installed, and with the stdlib fallback."""
+    monkeypatch.setattr(settings, "FAST_CODEC", True)
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(codec.fastjson, "orjson", None)
+    assert codec.fastjson.fast() == (request.param == "orjson")
+    return request.param
+
+
+def test_json_round_trips_the_same_through_either_parser(parser):
+    body = json.dumps(MESSAGE, ensure_ascii=False).encode()
+    assert loads(body) == MESSAGE
+    assert loads(dumps(MESSAGE)) == MESSAGE
+    assert json.loads(dumps(MESSAGE)) == MESSAGE
+
+    # What orjson will not encode (non-str keys) still goes out, by the stdlib's rules
+    assert json.loads(dumps({1: "one", "two": [2.5, None, False]})) == {"1": "one", "two": [2.5, None, False]}
+
+    response = json_response({"status": "queued", "command": "deploy"}, status=202)
+    assert response.status == 202
+    assert response.content_type == "application/json"
+    assert json.loads(response.body) == {"status": "queued", "command": "deploy"}
+
+
+@pytest.mark.parametrize("body", [b"", b"{", b'{"type": "message",}', b"\xff\xfe"])
+def test_invalid_json_raises_value_error_from_either_parser(parser, body):
+    with pytest.raises(ValueError):
+        loads(body)
+
+
+def test_the_lean_decoder_matches_full_deserialization(parser):
+    lean = ACTIVITY_DECODES.labels("lean").value
+    body = loads(dumps(MESSAGE))
+
+    activity = decode_activity(body)
+    assert ACTIVITY_DECODES.labels("lean").value == lean + 1
+
+    full = Activity().deserialize(body)
+    skipped = {"timestamp", "localTimestamp", "localTimezone", "entities", "textFormat"}
+    assert activity.serialize() == {key: value for key, value in full.serialize().items() if key not in skipped}
+    assert activity.from_property.name == "Dana Ops"
+    assert activity.conversation.is_group is True
+
+
+def test_other_activities_and_unknown_fields_take_the_full_path(parser, monkeypatch):
+    full = ACTIVITY_DECODES.labels("full").value
+    update = dict(MESSAGE, type="conversationUpdate", membersAdded=[{"id": "28:bot-id"}])
+    attachment = dict(MESSAGE, attachments=[{"contentType": "text/html", "content": "<p>hi</p>"}])
+
+    assert decode_activity(update).members_added[0].id == "28:bot-id"
+    assert decode_activity(attachment).attachments[0].content_type == "text/html"
+    monkeypatch.setattr(settings, "FAST_CODEC", False)
+    assert decode_activity(MESSAGE).timestamp is not None
+    assert ACTIVITY_DECODES.labels("full").value == full + 3
@@ -0,0 +1,192 @@
+"""
+tests/test_deploys.py
+The deploy scheduler (jobs/deploys.py): collapsing queued deploys, the rollback
+barrier, job queue workers given back while a deploy waits, and deploys taken
+by different worker processes sharing one store.
+"""
+import asyncio
+import sqlite3
+from contextlib import closing
+
+from jobs.deploys import COLLAPSED, DeployScheduler
+from jobs.queue import CommandQueue
+from store.shared import SharedStore
+from tests.support import run
+
+
+class FakeOctopus:
+    """Records each call; every call waits until the test releases it."""
+
+    def __init__(self):
+        self.calls: list[str] = []
+        self._gates: list[asyncio.Event] = []
+
+    async def deploy(self, app: str, build_number: str, environment: str) -> dict:
+        return await self._call(f"deploy {app} #{build_number} {environment}")
+
+    async def rollback(self, app: str, environment: str) -> dict:
+        return await self._call(f"rollback {app} {environment}")
+
+    async def _call(self, name: str) -> dict:
+        gate = asyncio.Event()
+        self.calls.append(name)
+        self._gates.append(gate)
+        await gate.wait()
+        return {"status": "deployed", "call": name}
+
+    async def release(self):
+        """Let the oldest call finish, then give the scheduler a moment to start the next."""
+        self._gates.pop(0).set()
+        await asyncio.sleep(0.01)
+
+
+def submit(scheduler: DeployScheduler, build_number: str = None, user: str = "Dev") -> asyncio.Task:
+    """A deploy of `build_number` to myapp/qa, or a rollback when it is None."""
+    if build_number is None:
+        call = scheduler.rollback(app="myapp", environment="qa", requested_by=user)
+    else:
+        call = scheduler.deploy(app="myapp", build_number=build_number, environment="qa", requested_by=user)
+    return asyncio.ensure_future(call)
+
+
+def test_waiting_deploys_are_superseded_by_the_newest_build():
+    async def scenario():
+        octopus = FakeOctopus()
+        scheduler = DeployScheduler(octopus=lambda: octopus)
+        collapsed = COLLAPSED.labels().value
+
+        first = submit(scheduler, "41")
+        await asyncio.sleep(0.01)
+        second = submit(scheduler, "42", user="Ann")
+        third = submit(scheduler, "43", user="Bob")
+        await asyncio.sleep(0.01)
+
+        # 42 never reaches Octopus: 43 replaced it while 41 was still deploying
+        assert await second == {"status": "superseded", "superseded_by": "43", "superseded_by_user": "Bob"}
+        assert scheduler.snapshot() == {"myapp/qa": 1}
+        await octopus.release()
+        await octopus.release()
+
+        assert (await first)["call"] == "deploy myapp #41 qa"
+        assert (await third)["call"] == "deploy myapp #43 qa"
+        assert octopus.calls == ["deploy myapp #41 qa", "deploy myapp #43 qa"]
+        assert COLLAPSED.labels().value == collapsed + 1
+        assert scheduler.snapshot() == {}
+    run(scenario())
+
+
+def test_rollbacks_are_never_collapsed_or_jumped():
+    async def scenario():
+        octopus = FakeOctopus()
+        scheduler = DeployScheduler(octopus=lambda: octopus)
+
+        running = submit(scheduler, "41")
+        await asyncio.sleep(0.01)
+        before = submit(scheduler, "42")
+        rollbacks = [submit(scheduler), submit(scheduler)]
+        after = submit(scheduler, "43")
+        latest = submit(scheduler, "44")
+        await asyncio.sleep(0.01)
+
+        # 43 can fold into 44, but not into anything queued before the rollbacks
+        assert (await after)["status"] == "superseded"
+        for _ in range(5):
+            await octopus.release()
+        assert octopus.calls == [
+            "deploy myapp #41 qa", "deploy myapp #42 qa",
+            "rollback myapp qa", "rollback myapp qa", "deploy myapp #44 qa",
+        ]
+        for task in (running, before, *rollbacks, latest):
+            assert (await task)["status"] == "deployed"
+    run(scenario())
+
+
+def test_a_waiting_deploy_gives_its_worker_back():
+    async def scenario():
+        octopus = FakeOctopus()
+        scheduler = DeployScheduler(octopus=lambda: octopus)
+        queue = CommandQueue(workers=1)
+        results, ran = [], []
+
+        async def deploy(build_number: str):
+            results.append(await scheduler.deploy(app="myapp", build_number=build_number,
+                                                  environment="qa", requested_by="Dev"))
+
+        async def status():
+            ran.append("status")
+
+        queue.submit("deploy", lambda: deploy("41"))
+        queue.submit("deploy", lambda: deploy("42"))
+        queue.submit("status", status)
+        await asyncio.sleep(0.01)
+
+        # Both deploys are waiting on Octopus, and the one worker still got to `status`
+        assert ran == ["status"]
+        assert octopus.calls == ["deploy myapp #41 qa"]
+        await octopus.release()
+        await octopus.release()
+        await queue.join()
+
+        assert [result["call"] for result in results] == ["deploy myapp #41 qa", "deploy myapp #42 qa"]
+        assert len(queue._tasks) == 1   # The stand-in workers have retired
+        await queue.close()
+    run(scenario())
+
+
+async def calls_reach(octopus: FakeOctopus, count: int):
+    """Wait for the schedulers, polling their shared store, to have made `count` Octopus calls."""
+    for _ in range(200):
+        if len(octopus.calls) >= count:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"only {octopus.calls} reached Octopus")
+
+
+async def in_line(path: str, count: int):
+    """Wait until `count` deploys are in the shared store's line, so the next one joins behind them."""
+    for _ in range(200):
+        with closing(sqlite3.connect(path)) as db:
+            if db.execute("SELECT COUNT(*) FROM deploys").fetchone()[0] >= count:
+                return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"fewer than {count} deploys joined the line")
+
+
+def test_workers_sharing_a_store_deploy_one_at_a_time(tmp_path):
+    async def scenario():
+        octopus = FakeOctopus()
+        workers = []
+        for name in ("host:1", "host:2"):
+            store = SharedStore(str(tmp_path / "state.db"), poll_seconds=0.01)
+            store.worker = name
+            workers.append(DeployScheduler(octopus=lambda: octopus, store=store))
+        one, two = workers
+
+        path = str(tmp_path / "state.db")
+        first = submit(one, "41")
+        await calls_reach(octopus, 1)
+        second = submit(two, "42", user="Ann")
+        rollback = submit(two)
+        await in_line(path, 3)
+        third = submit(one, "43", user="Bob")
+        await in_line(path, 4)
+        fourth = submit(two, "44", user="Cy")
+        await in_line(path, 5)
+        await asyncio.sleep(0.05)
+        # host:2 waits for host:1's deploy, although it has nothing of its own running
+        assert octopus.calls == ["deploy myapp #41 qa"]
+
+        await octopus.release()
+        # 43 (host:1) gives way to 44 (host:2); 42 was queued before the rollback and stays
+        assert await asyncio.wait_for(third, 2) == {
+            "status": "superseded", "superseded_by": "44", "superseded_by_user": "Cy"}
+        for count in (2, 3, 4):
+            await calls_reach(octopus, count)
+            await octopus.release()
+        assert octopus.calls == [
+            "deploy myapp #41 qa", "deploy myapp #42 qa", "rollback myapp qa", "deploy myapp #44 qa",
+        ]
+        for task in (first, second, rollback, fourth):
+            assert (await task)["status"] == "deployed"
+        assert await one.store.deploy_turn(1, 60) == ("lost", None)   # The line is empty again
+    run(scenario())
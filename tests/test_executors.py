@@ -0,0 +1,119 @@
+"""
+tests/test_executors.py
+Bounded thread pools for blocking calls (resilience/executors.py): what happens
+once every thread is busy and the queue behind them is full.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from resilience.executors import EXECUTOR_REJECTED, BoundedExecutor, ExecutorBusy
+from tests.support import run
+
+
+class Blocking:
+    """Blocking calls that hold their thread until the test opens the gate."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.started: list[str] = []
+
+    def call(self, name: str) -> str:
+        self.started.append(name)
+        self.gate.wait(5)
+        return name
+
+
+async def settled():
+    """Give the pool's threads a moment to pick up (or finish) their calls."""
+    await asyncio.sleep(0.05)
+
+
+def test_a_full_rejecting_executor_fails_fast_and_recovers_once_calls_finish():
+    pool = BoundedExecutor("test-reject", workers=1, queue_size=1, on_full="reject")
+    blocking = Blocking()
+    rejected = EXECUTOR_REJECTED.labels("test-reject").value
+
+    async def scenario():
+        calls = [asyncio.ensure_future(pool.run(blocking.call, name)) for name in ("running", "queued")]
+        await settled()
+        assert pool.snapshot() == {"workers": 1, "running": 1, "queued": 1}
+
+        with pytest.raises(ExecutorBusy, match="1 running, 1 waiting"):
+            await pool.run(blocking.call, "refused")
+        assert EXECUTOR_REJECTED.labels("test-reject").value == rejected + 1
+
+        blocking.gate.set()
+        assert await asyncio.gather(*calls) == ["running", "queued"]
+        assert blocking.started == ["running", "queued"]
+        assert await pool.run(blocking.call, "later") == "later"
+        assert pool.in_flight == 0
+
+    try:
+        run(scenario())
+    finally:
+        blocking.gate.set()
+        pool.shutdown()
+
+
+def test_a_full_waiting_executor_queues_callers_in_order_and_skips_ones_that_gave_up():
+    pool = BoundedExecutor("test-wait", workers=1, queue_size=1, on_full="wait")
+    blocking = Blocking()
+
+    async def scenario():
+        calls = [asyncio.ensure_future(pool.run(blocking.call, name))
+                 for name in ("running", "queued", "waiting-1", "gives-up", "waiting-2")]
+        await settled()
+        # Two calls are with the pool; three callers wait for a slot without submitting
+        assert pool.in_flight == 2
+        assert pool.snapshot() == {"workers": 1, "running": 1, "queued": 4}
+
+        calls[3].cancel()
+        await settled()
+        assert pool.snapshot()["queued"] == 3
+
+        blocking.gate.set()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        assert isinstance(results[3], asyncio.CancelledError)
+        assert [r for r in results if isinstance(r, str)] == ["running", "queued", "waiting-1", "waiting-2"]
+        assert blocking.started == ["running", "queued", "waiting-1", "waiting-2"]
+        assert pool.in_flight == 0
+        assert pool.snapshot() == {"workers": 1, "running": 0, "queued": 0}
+
+    try:
+        run(scenario())
+    finally:
+        blocking.gate.set()
+        pool.shutdown()
+
+
+def test_a_caller_that_gives_up_drops_its_call_if_no_thread_has_started_it():
+    pool = BoundedExecutor("test-dropped", workers=1, queue_size=1)
+    blocking = Blocking()
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.run(blocking.call, "running"))
+        queued = asyncio.ensure_future(pool.run(blocking.call, "queued"))
+        await settled()
+        queued.cancel()
+        await settled()
+
+        blocking.gate.set()
+        assert await running == "running"
+        await settled()
+        # The queued call never ran, and its slot came back
+        assert blocking.started == ["running"]
+        assert pool.in_flight == 0
+        assert await pool.run(blocking.call, "next") == "next"
+
+    try:
+        run(scenario())
+    finally:
+        blocking.gate.set()
+        pool.shutdown()
+
+
+def test_on_full_must_be_wait_or_reject():
+    with pytest.raises(ValueError, match="on_full must be one of wait, reject"):
+        BoundedExecutor("test-invalid", workers=1, queue_size=1, on_full="drop")
@@ -0,0 +1,77 @@
+"""
+tests/test_idempotency.py
+Dropping Bot Framework retries: idempotency/cache.py and the DeployBot.on_turn guard.
+"""
+from botbuilder.core import TurnContext
+
+import idempotency.cache
+from bot.deploy_bot import DeployBot
+from idempotency.cache import DUPLICATES, IN_PROGRESS, IdempotencyCache
+from tests.support import FakeAdapter, run
+
+
+class FakeClock:
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+def test_redelivered_activity_is_handled_once():
+    async def scenario():
+        adapter = FakeAdapter()
+        bot = DeployBot(adapter)
+        first = adapter.incoming("help")
+        duplicates = DUPLICATES.labels("message").value
+
+        await bot.on_turn(first)
+        # Bot Framework resends the same activity (same id, same conversation)
+        await bot.on_turn(TurnContext(adapter, first.activity))
+
+        assert len(adapter.sent) == 1
+        assert DUPLICATES.labels("message").value == duplicates + 1
+    run(scenario())
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(idempotency.cache, "time", clock)
+
+    async def scenario():
+        cache = IdempotencyCache(ttl_seconds=60, db_path="")
+        assert await cache.claim("conv|1") is None
+        assert await cache.claim("conv|1") == IN_PROGRESS
+        await cache.complete("conv|1", {"status": "queued"})
+
+        clock.now += 59
+        assert await cache.claim("conv|1") == {"status": "queued"}
+        clock.now += 2
+        assert await cache.claim("conv|1") is None   # Lapsed: handled as a new activity
+    run(scenario())
+
+
+def test_caches_sharing_a_database_dedupe_across_processes(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(idempotency.cache, "time", clock)
+    path = str(tmp_path / "idempotency.db")
+
+    async def scenario():
+        worker_a = IdempotencyCache(ttl_seconds=60, db_path=path)
+        worker_b = IdempotencyCache(ttl_seconds=60, db_path=path)
+
+        assert await worker_a.claim("conv|1") is None
+        assert await worker_b.claim("conv|1") == IN_PROGRESS
+        await worker_a.complete("conv|1", {"status": "queued", "command": "build"})
+        assert await IdempotencyCache(ttl_seconds=60, db_path=path).claim("conv|1") == \
+            {"status": "queued", "command": "build"}
+
+        # A claim given up after a failure lets the retry run on either worker
+        assert await worker_a.claim("conv|2") is None
+        await worker_a.forget("conv|2")
+        assert await worker_b.claim("conv|2") is None
+
+        clock.now += 61
+        assert await IdempotencyCache(ttl_seconds=60, db_path=path).claim("conv|1") is None
+    run(scenario())
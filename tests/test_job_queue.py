@@ -0,0 +1,138 @@
+"""
+tests/test_job_queue.py
+The background job queue (jobs/queue.py) and how DeployBot hands commands to it.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from botbuilder.core import MessageFactory
+
+from bot.command_parser import ParsedCommand
+from bot.deploy_bot import OUTCOME_KEY, DeployBot
+from jobs.queue import CommandQueue, QueueFull
+from tests.support import FakeAdapter, run
+
+
+def test_queued_command_replies_through_continue_conversation():
+    async def scenario():
+        adapter = FakeAdapter()
+        bot = DeployBot(adapter)
+        incoming = adapter.incoming("history myapp", conversation="conv-7")
+
+        async def handler(turn_context):
+            await bot.outbound.send(turn_context, MessageFactory.text("done"))
+
+        await bot._enqueue(incoming, "history", None, handler)
+        # Acknowledged straight away; the reply comes later, from a proactive turn
+        assert incoming.turn_state[OUTCOME_KEY] == {"status": "queued", "command": "history"}
+        assert adapter.sent == []
+
+        await bot.jobs.join()
+        assert adapter.continued == ["conv-7"]
+        assert [activity.text for activity in adapter.sent] == ["done"]
+        assert adapter.sent[0].conversation.id == "conv-7"
+        await bot.jobs.close()
+    run(scenario())
+
+
+def test_jobs_with_the_same_key_run_in_submission_order():
+    async def scenario():
+        queue = CommandQueue(workers=4)
+        finished = []
+
+        def job(name: str, seconds: float):
+            async def body():
+                await asyncio.sleep(seconds)
+                finished.append(name)
+            return body
+
+        # Later jobs for the key are quicker, so only the key keeps them in order
+        for index, seconds in enumerate((0.04, 0.03, 0.02, 0.01)):
+            queue.submit("deploy", job(f"qa-{index}", seconds), key=("myapp", "qa"))
+        queue.submit("status", job("other", 0.0), key=("other", "qa"))
+        await queue.join()
+
+        assert [name for name in finished if name.startswith("qa-")] == ["qa-0", "qa-1", "qa-2", "qa-3"]
+        # Parked jobs do not hold a worker, so another key is not stuck behind them
+        assert finished[0] == "other"
+        await queue.close()
+    run(scenario())
+
+
+def test_submit_raises_queue_full_and_the_bot_turns_the_command_away():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def blocked():
+            await release.wait()
+
+        queue = CommandQueue(workers=1, max_size=2)
+        queue.submit("build", blocked)
+        queue.submit("build", blocked)
+        with pytest.raises(QueueFull):
+            queue.submit("build", blocked)
+        release.set()
+        await queue.join()
+        await queue.close()
+
+        adapter = FakeAdapter()
+        bot = DeployBot(adapter, jobs=CommandQueue(workers=1, max_size=1))
+        hold = asyncio.Event()
+        bot.jobs.submit("build", hold.wait)
+        incoming = adapter.incoming("build myapp main")
+        await bot._enqueue(incoming, "build", None, lambda ctx: asyncio.sleep(0))
+        assert incoming.turn_state[OUTCOME_KEY] == {"status": "rejected", "command": "build"}
+        assert "busy" in str(adapter.sent[-1].attachments[0].content)
+        hold.set()
+        await bot.jobs.close()
+    run(scenario())
+
+
+def test_close_cancels_running_jobs_and_counts_unfinished_ones():
+    async def scenario():
+        queue = CommandQueue(workers=1)
+        started, cancelled = asyncio.Event(), []
+
+        async def forever():
+            started.set()
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        running = queue.submit("promote", forever)
+        queued = queue.submit("build", forever)   # Still queued behind it
+        await started.wait()
+
+        assert await queue.close(timeout=1) == 2
+        assert cancelled == [True]
+        # Neither looks like it succeeded to whoever awaits it
+        assert running.done.cancelled()
+        assert queued.done.cancelled()
+    run(scenario())
+
+
+def test_a_batch_row_shows_a_command_cancelled_at_shutdown():
+    async def scenario():
+        adapter = FakeAdapter()
+        bot = DeployBot(adapter, jobs=CommandQueue(workers=1))
+        started = asyncio.Event()
+        shown = []
+
+        async def forever(turn_context, cmd, user, row=None):
+            started.set()
+            await asyncio.sleep(3600)
+
+        bot._handle_status = forever
+        row = SimpleNamespace(show=shown.append)
+        cmd = ParsedCommand(action="status", app="myapp", raw="status myapp")
+        batch = asyncio.ensure_future(
+            bot._run_batch_command(adapter.incoming("status myapp"), cmd, "Dev", row))
+        await started.wait()
+
+        await bot.jobs.close(timeout=1)
+        await asyncio.wait_for(batch, 1)
+        assert shown == ["🚫 Cancelled"]
+    run(scenario())
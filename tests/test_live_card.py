@@ -0,0 +1,109 @@
+"""
+tests/test_live_card.py
+Cards edited in place (outbound/live_card.py): rapid stage changes debounced into
+one update per window, on a fake clock.
+"""
+import asyncio
+from typing import Optional
+
+import pytest
+
+import outbound.live_card
+from bot.cards import OperationCard
+from outbound.live_card import LiveCard
+from outbound.scheduler import OutboundScheduler
+from tests.support import FakeAdapter, run
+
+
+class FakeClock:
+    """Sleeps wait until the test moves the clock past their end."""
+
+    def __init__(self):
+        self.now = 0.0
+        self._sleepers: list[tuple[float, asyncio.Future]] = []
+        self._real_sleep = asyncio.sleep
+
+    async def sleep(self, delay: float):
+        wake = asyncio.get_running_loop().create_future()
+        self._sleepers.append((self.now + delay, wake))
+        await wake
+
+    async def advance(self, seconds: float):
+        """Move the clock on by `seconds`, waking each sleeper at its time and letting it run."""
+        until = self.now + seconds
+        await self._real_sleep(0.01)             # Tasks started since the last step reach their sleep
+        while True:
+            due = [sleeper for sleeper in self._sleepers if sleeper[0] <= until]
+            if not due:
+                break
+            sleeper = min(due, key=lambda s: s[0])
+            self._sleepers.remove(sleeper)
+            self.now = sleeper[0]
+            sleeper[1].set_result(None)
+            await self._real_sleep(0.01)         # The woken task delivers its update
+        self.now = until
+
+
+class RecordingAdapter(FakeAdapter):
+    """Notes the fake time of every card update; while `gate` is set, updates wait for it."""
+
+    def __init__(self, clock: FakeClock):
+        super().__init__()
+        self.clock = clock
+        self.update_times: list[float] = []
+        self.gate: Optional[asyncio.Event] = None
+
+    async def update_activity(self, context, activity):
+        self.update_times.append(self.clock.now)
+        if self.gate is not None:
+            await self.gate.wait()
+        return await super().update_activity(context, activity)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(outbound.live_card.asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def status(activity) -> str:
+    return activity.attachments[0].content["body"][1]["facts"][-1]["value"]
+
+
+def test_rapid_stage_changes_make_one_update_per_window_and_the_last_state_always_lands(clock):
+    adapter = RecordingAdapter(clock)
+    state = OperationCard(kind="build", app="api", user="Dev", stage="building", branch="main")
+
+    async def scenario():
+        card = LiveCard(OutboundScheduler(), adapter.incoming("build api main"), state, debounce=1.0)
+        await card.post()
+        assert card.activity_id
+
+        # Ten changes 0.3s apart, then the final one. A window opens with the first change
+        # after a quiet spell and the card is updated once, when it closes
+        for n in range(10):
+            card.set(stage="build_queued", detail=f"#{n}")
+            await clock.advance(0.3)
+        card.set(stage="build_succeeded", build="17")
+        await clock.advance(5)
+        await card.settle()
+
+        assert adapter.update_times == pytest.approx([1.0, 2.2, 3.4])
+        assert [activity.id for activity in adapter.updated] == [card.activity_id] * 3
+        assert [status(activity) for activity in adapter.updated] == [
+            "⏳ Queued in Jenkins #3", "⏳ Queued in Jenkins #7", "✅ Build #17 succeeded"]
+
+        # A change made while an update is on its way to Teams gets a window of its own
+        adapter.gate = asyncio.Event()
+        card.set(stage="build_queued", detail="#10")
+        await clock.advance(1)
+        card.set(stage="build_failed", detail="Jenkins restarted")
+        adapter.gate.set()
+        await clock.advance(0.9)
+        assert len(adapter.updated) == 4
+        await clock.advance(0.1)
+        await card.settle()
+        assert [status(activity) for activity in adapter.updated[3:]] == [
+            "⏳ Queued in Jenkins #10", "❌ Jenkins restarted"]
+    run(scenario())
@@ -0,0 +1,158 @@
+"""
+tests/test_outbound.py
+Per-conversation pacing of what the bot sends to Teams (outbound/scheduler.py),
+on a fake clock.
+"""
+import asyncio
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+from botbuilder.core import MessageFactory
+from botbuilder.schema import Attachment
+
+import outbound.scheduler
+from outbound.scheduler import DROPPED, THROTTLED, OutboundScheduler, _retry_after
+from tests.support import FakeAdapter, run
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class Throttled(Exception):
+    """What the Bot Connector client raises for a 429."""
+
+    def __init__(self, retry_after: str = None):
+        super().__init__("Too Many Requests")
+        self.response = SimpleNamespace(status_code=429, headers={"Retry-After": retry_after} if retry_after else {})
+
+
+class ThrottlingAdapter(FakeAdapter):
+    """Raises the queued errors for the next sends, then records sends as usual."""
+
+    def __init__(self, *errors: Exception):
+        super().__init__()
+        self.errors = list(errors)
+
+    async def send_activities(self, context, activities):
+        if self.errors:
+            raise self.errors.pop(0)
+        return await super().send_activities(context, activities)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(outbound.scheduler, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def sleeps(monkeypatch, clock) -> list[float]:
+    """Lane waits, which move the fake clock on instead of sleeping."""
+    waited = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay: float):
+        waited.append(delay)
+        clock.now += delay
+        await real_sleep(0)
+
+    monkeypatch.setattr(outbound.scheduler.asyncio, "sleep", sleep)
+    return waited
+
+
+def scheduler(rate: float = 2, burst: int = 7, queue_limit: int = 100) -> OutboundScheduler:
+    s = OutboundScheduler()
+    s.rate, s.burst, s.queue_limit, s.max_retries = rate, burst, queue_limit, 5
+    return s
+
+
+def card(text: str):
+    """A message that is never merged with its neighbours."""
+    activity = MessageFactory.text(text)
+    activity.attachments = [Attachment(content_type="application/vnd.microsoft.card.adaptive", content={})]
+    return activity
+
+
+def test_a_429_waits_for_retry_after_then_retries(clock, sleeps):
+    adapter = ThrottlingAdapter(Throttled("3"))
+    outbound = scheduler()
+    throttled = THROTTLED.labels().value
+
+    async def scenario():
+        response = await outbound.send(adapter.incoming("build api main"), "🔨 Build triggered")
+        assert response is not None
+        assert sleeps == [3.0]
+        assert [activity.text for activity in adapter.sent] == ["🔨 Build triggered"]
+        assert THROTTLED.labels().value == throttled + 1
+    run(scenario())
+
+    # Retry-After can also be an HTTP date
+    date = Throttled(formatdate(clock.now + 5, usegmt=True))
+    assert _retry_after(date) == pytest.approx(5, abs=1)
+    assert _retry_after(Throttled()) == 0.0
+    assert _retry_after(ConnectionError("reset")) is None
+
+
+def test_queued_updates_to_one_card_merge_into_the_newest(clock, sleeps):
+    adapter = FakeAdapter()
+    outbound = scheduler()
+    context = adapter.incoming("deploy api 42 qa")
+
+    async def scenario():
+        responses = await asyncio.gather(*(
+            outbound.update(context, "activity-card", card(f"stage {n}")) for n in (1, 2, 3)))
+        assert [activity.text for activity in adapter.updated] == ["stage 3"]
+        assert adapter.updated[0].id == "activity-card"
+        assert responses[0] is responses[1] is responses[2]
+
+        # An update for another card is its own item
+        await asyncio.gather(outbound.update(context, "activity-card", card("stage 4")),
+                             outbound.update(context, "activity-other", card("other")))
+        assert [activity.text for activity in adapter.updated] == ["stage 3", "stage 4", "other"]
+    run(scenario())
+
+
+def test_messages_past_the_queue_limit_are_dropped_and_counted(clock, sleeps):
+    adapter = FakeAdapter()
+    outbound = scheduler(queue_limit=2)
+    context = adapter.incoming("help")
+    dropped = DROPPED.labels("queue_full").value
+
+    async def scenario():
+        responses = await asyncio.gather(*(outbound.send(context, card(f"card {n}")) for n in range(5)))
+        assert [response is not None for response in responses] == [True, True, False, False, False]
+        assert [activity.text for activity in adapter.sent] == ["card 0", "card 1"]
+        assert DROPPED.labels("queue_full").value == dropped + 3
+    run(scenario())
+
+
+def test_one_conversation_waiting_for_tokens_does_not_hold_up_another(clock):
+    adapter = FakeAdapter()
+    outbound = scheduler(rate=0.001, burst=1)    # After its first message a lane waits ~1000s
+
+    async def scenario():
+        busy = adapter.incoming("build api main", conversation="conv-busy")
+        await outbound.send(busy, card("busy 1"))
+        waiting = asyncio.ensure_future(outbound.send(busy, card("busy 2")))
+        await asyncio.sleep(0.01)
+
+        other = adapter.incoming("status api", conversation="conv-other")
+        assert await asyncio.wait_for(outbound.send(other, card("other 1")), 1) is not None
+        assert [activity.text for activity in adapter.sent] == ["busy 1", "other 1"]
+        assert not waiting.done()
+        assert outbound.snapshot() == {"conversations": 2, "queued": 1}
+
+        outbound._lanes["conv-busy"].worker.cancel()
+        waiting.cancel()
+    run(scenario())
@@ -0,0 +1,127 @@
+"""
+tests/test_promotion.py
+`promote` (promotion/pipeline.py): a stage that is not approved or does not
+succeed stops the promotion, and later environments are never deployed.
+"""
+import asyncio
+
+import pytest
+
+from bot.deploy_bot import DeployBot
+from config.settings import settings
+from tests.support import FakeAdapter, run
+
+
+class FakeOctopus:
+    """Deployments run until the test finishes them."""
+
+    def __init__(self):
+        self.deploys: list[str] = []
+        self._finished: dict[str, asyncio.Future] = {}
+
+    async def resolve_release(self, app: str, build_number: str) -> dict:
+        return {"project_id": "Projects-1", "release_id": f"Releases-{build_number}"}
+
+    async def deploy_release(self, release_id: str, environment: str, build_number: str) -> dict:
+        self.deploys.append(environment)
+        self._finished[environment] = asyncio.get_running_loop().create_future()
+        return {"status": "triggered", "deployment_id": f"Deployments-{environment}",
+                "url": f"https://octopus.example/deployments/{environment}"}
+
+    async def wait_for_deployment(self, deployment_id: str, poll_seconds: float, timeout_seconds: float) -> dict:
+        return await self._finished[deployment_id.removeprefix("Deployments-")]
+
+    async def finish(self, environment: str, state: str = "Success", error: str = ""):
+        self._finished[environment].set_result({"state": state, "completed": state == "Success", "error": error})
+        await asyncio.sleep(0.05)
+
+
+@pytest.fixture
+def deploy_bot(monkeypatch, tmp_path) -> DeployBot:
+    monkeypatch.chdir(tmp_path)   # audit.db
+    monkeypatch.setattr(settings, "CARD_UPDATE_DEBOUNCE_SECONDS", 0.01)
+    deploy_bot = DeployBot(FakeAdapter())
+    deploy_bot._octopus = FakeOctopus()
+    return deploy_bot
+
+
+def promote(deploy_bot: DeployBot, *environments: str) -> asyncio.Task:
+    context = deploy_bot.adapter.incoming(f"promote myapp 42 {'>'.join(environments)}")
+    return asyncio.ensure_future(deploy_bot.promotions.run(context, "myapp", "42", list(environments), "Dev"))
+
+
+async def deploying(deploy_bot: DeployBot, *environments: str):
+    """Wait until Octopus has been asked for exactly these deployments."""
+    for _ in range(100):
+        if deploy_bot.octopus.deploys == list(environments):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"deployed {deploy_bot.octopus.deploys}, expected {list(environments)}")
+
+
+def promotion_rows(adapter: FakeAdapter) -> dict:
+    """Environment → status line, from the latest render of the promotion card."""
+    for activity in reversed(adapter.sent + adapter.updated):
+        body = activity.attachments[0].content["body"] if activity.attachments else []
+        if body and body[0]["text"].startswith("🚚 Promoting"):
+            return {fact["title"]: fact["value"] for fact in body[-1]["facts"]}
+    raise AssertionError("no promotion card was sent")
+
+
+def test_a_rejected_stage_stops_the_promotion_before_later_environments(deploy_bot):
+    async def scenario():
+        promotion = promote(deploy_bot, "qa", "uat", "prod")
+        await deploying(deploy_bot, "qa")
+        # UAT's approval is raised while QA deploys; turned down, the promotion stops there
+        (approval_id,) = deploy_bot.approvals._pending
+        click = deploy_bot.adapter.incoming("", user="Lead")
+        await deploy_bot.approvals.handle_response(approval_id, approved=False, approver="Lead", turn_context=click)
+        await deploy_bot.octopus.finish("qa")
+        await asyncio.wait_for(promotion, 2)
+
+        assert deploy_bot.octopus.deploys == ["qa"]
+        assert deploy_bot.approvals._pending == {}
+        assert promotion_rows(deploy_bot.adapter) == {
+            "QA": "✅ Deployed https://octopus.example/deployments/qa",
+            "UAT": "❌ Rejected by Lead",
+            "PROD": "🚫 UAT was not approved",
+        }
+    run(scenario())
+
+
+def test_a_failed_stage_leaves_later_environments_untouched(deploy_bot):
+    async def scenario():
+        promotion = promote(deploy_bot, "qa", "uat", "prod")
+        await deploying(deploy_bot, "qa")
+        assert len(deploy_bot.approvals._pending) == 1
+        await deploy_bot.octopus.finish("qa", state="Failed", error="Step 2 failed")
+        await asyncio.wait_for(promotion, 2)
+
+        assert deploy_bot.octopus.deploys == ["qa"]
+        # The UAT approval raised while QA ran is withdrawn, and its card says so
+        assert deploy_bot.approvals._pending == {}
+        titles = [activity.attachments[0].content["body"][0]["text"] for activity in deploy_bot.adapter.updated]
+        assert [title for title in titles if not title.startswith("🚚")][-1] == "🚫 Deployment Cancelled"
+        assert promotion_rows(deploy_bot.adapter) == {
+            "QA": "❌ Octopus deployment Failed Step 2 failed",
+            "UAT": "🚫 QA did not succeed",
+            "PROD": "🚫 QA did not succeed",
+        }
+    run(scenario())
+
+
+def test_a_promotion_cancelled_between_stages_deploys_nothing_more(deploy_bot):
+    async def scenario():
+        promotion = promote(deploy_bot, "qa", "uat")
+        await deploying(deploy_bot, "qa")
+        await deploy_bot.octopus.finish("qa")
+        promotion.cancel()
+        await asyncio.gather(promotion, return_exceptions=True)
+
+        # Approving UAT afterwards does not bring the promotion back
+        (approval_id,) = deploy_bot.approvals._pending
+        click = deploy_bot.adapter.incoming("", user="Lead")
+        await deploy_bot.approvals.handle_response(approval_id, approved=True, approver="Lead", turn_context=click)
+        await asyncio.sleep(0.05)
+        assert deploy_bot.octopus.deploys == ["qa"]
+    run(scenario())
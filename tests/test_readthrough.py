@@ -0,0 +1,129 @@
+"""
+tests/test_readthrough.py
+The coalescing read cache (cache/readthrough.py), on a fake clock.
+"""
+import asyncio
+
+import pytest
+
+import cache.readthrough
+from cache.readthrough import LOOKUPS, ReadThroughCache
+from tests.support import run
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class Upstream:
+    """A fetch that counts its calls and, after `hold()`, waits for that hold's gate to be set."""
+
+    def __init__(self):
+        self.calls = 0
+        self.value = "v1"
+        self.gate = None
+
+    def hold(self) -> asyncio.Event:
+        self.gate = asyncio.Event()
+        return self.gate
+
+    async def fetch(self):
+        self.calls += 1
+        value, gate = self.value, self.gate
+        if gate is not None:
+            await gate.wait()
+        return value
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(cache.readthrough, "time", clock)
+    return clock
+
+
+def lookups(kind: str, outcome: str) -> float:
+    return LOOKUPS.labels(kind, outcome).value
+
+
+def test_concurrent_misses_share_one_fetch(clock):
+    async def scenario():
+        reads, upstream = ReadThroughCache(ttl=30, stale=60), Upstream()
+        upstream.hold()
+        coalesced = lookups("single", "coalesced")
+
+        callers = [asyncio.ensure_future(reads.get("single", "myapp", upstream.fetch)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        upstream.gate.set()
+
+        assert await asyncio.gather(*callers) == ["v1"] * 5
+        assert upstream.calls == 1
+        assert lookups("single", "coalesced") == coalesced + 4
+        assert await reads.get("single", "myapp", upstream.fetch) == "v1"   # Now a plain hit
+        assert upstream.calls == 1
+    run(scenario())
+
+
+def test_stale_hit_starts_exactly_one_background_refresh(clock):
+    async def scenario():
+        reads, upstream = ReadThroughCache(ttl=30, stale=60), Upstream()
+        await reads.get("stale", "myapp", upstream.fetch)
+
+        clock.now += 45   # Past the TTL, inside the stale window
+        upstream.value = "v2"
+        upstream.hold()
+        served = [await reads.get("stale", "myapp", upstream.fetch) for _ in range(3)]
+        await asyncio.sleep(0.01)
+
+        assert served == ["v1"] * 3   # Answered from the old entry without waiting
+        assert upstream.calls == 2    # The first fill plus one refresh
+        upstream.gate.set()
+        await asyncio.sleep(0.01)
+        assert await reads.get("stale", "myapp", upstream.fetch) == "v2"
+        assert upstream.calls == 2
+    run(scenario())
+
+
+def test_invalidate_during_fetch_does_not_store_the_result(clock):
+    async def scenario():
+        reads, upstream = ReadThroughCache(ttl=30, stale=60), Upstream()
+        first = upstream.hold()
+        before_deploy = asyncio.ensure_future(reads.get("invalidate", "myapp", upstream.fetch))
+        await asyncio.sleep(0.01)
+
+        reads.invalidate("myapp")   # A deploy finished while the lookup was in flight
+        upstream.value = "v2"
+        second = upstream.hold()
+        after_deploy = asyncio.ensure_future(reads.get("invalidate", "myapp", upstream.fetch))
+        await asyncio.sleep(0.01)
+        assert upstream.calls == 2   # Not coalesced with the pre-deploy lookup
+
+        # The pre-deploy lookup answers last, and must not overwrite the fresh entry
+        second.set()
+        assert await after_deploy == "v2"
+        first.set()
+        assert await before_deploy == "v1"   # Its caller still gets an answer
+        assert await reads.get("invalidate", "myapp", upstream.fetch) == "v2"
+        assert upstream.calls == 2
+    run(scenario())
+
+
+def test_failed_background_refresh_is_counted(clock):
+    async def scenario():
+        reads, upstream = ReadThroughCache(ttl=30, stale=60), Upstream()
+        await reads.get("failing", "myapp", upstream.fetch)
+        failed = lookups("failing", "refresh_failed")
+
+        async def broken():
+            raise ConnectionError("octopus unreachable")
+
+        clock.now += 45
+        assert await reads.get("failing", "myapp", broken) == "v1"
+        await asyncio.sleep(0.01)
+        assert lookups("failing", "refresh_failed") == failed + 1
+    run(scenario())
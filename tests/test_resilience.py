@@ -0,0 +1,172 @@
+"""
+tests/test_resilience.py
+Circuit breaker, jittered retries and deadlines (resilience/), on a fake clock.
+"""
+import asyncio
+
+import pytest
+
+import resilience.breaker
+import resilience.deadline
+import resilience.policy
+from resilience.breaker import BREAKER_OPENED, CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from resilience.deadline import DeadlineExceeded, deadline_after, within_deadline
+from resilience.policy import DEADLINE_EXCEEDED, RETRIES, UpstreamPolicy
+from tests.support import run
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FakeRandom:
+    """Jitter that always lands at `fraction` of the range, recording each range asked for."""
+
+    def __init__(self, fraction: float):
+        self.fraction = fraction
+        self.ranges: list[tuple[float, float]] = []
+
+    def uniform(self, low: float, high: float) -> float:
+        self.ranges.append((low, high))
+        return low + (high - low) * self.fraction
+
+
+class Flaky:
+    """An upstream call that fails with a fault the first `failures` times."""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError(f"refused #{self.calls}")
+        return "ok"
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(resilience.breaker, "time", clock)
+    monkeypatch.setattr(resilience.deadline, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def sleeps(monkeypatch, clock) -> list[float]:
+    """Retry waits, which move the fake clock on instead of sleeping."""
+    waited = []
+
+    async def sleep(delay: float):
+        waited.append(delay)
+        clock.now += delay
+
+    monkeypatch.setattr(resilience.policy.asyncio, "sleep", sleep)
+    return waited
+
+
+def policy(upstream: str, retries: int = 3, backoff: float = 0.5) -> UpstreamPolicy:
+    p = UpstreamPolicy(upstream, is_fault=lambda e: isinstance(e, ConnectionError), retries=retries, backoff=backoff)
+    p.breaker = CircuitBreaker(upstream, failures=10, reset_seconds=30)   # Not tripped by these tests
+    return p
+
+
+def test_breaker_opens_after_failures_in_a_row_then_half_opens(clock):
+    b = CircuitBreaker("test-breaker", failures=3, reset_seconds=30)
+    opened = BREAKER_OPENED.labels("test-breaker").value
+
+    for _ in range(2):
+        b.allow()
+        b.record(False)
+    b.allow()
+    b.record(True)                       # A success resets the count
+    for _ in range(3):
+        assert b.state == CLOSED
+        b.allow()
+        b.record(False)
+    assert b.state == OPEN
+    assert BREAKER_OPENED.labels("test-breaker").value == opened + 1
+    with pytest.raises(CircuitOpen):
+        b.allow()
+
+    clock.now += 29.9
+    assert b.state == OPEN
+    clock.now += 0.2
+    assert b.state == HALF_OPEN
+    b.allow()                            # The one trial call
+    with pytest.raises(CircuitOpen):
+        b.allow()
+
+    b.record(False)                      # Trial failed: open for another period
+    assert b.state == OPEN
+    assert BREAKER_OPENED.labels("test-breaker").value == opened + 2
+    clock.now += 30
+    assert b.state == HALF_OPEN
+    b.allow()
+    b.record(None)                       # Cut short by a deadline: says nothing, frees the trial
+    b.allow()
+    b.record(True)
+    assert b.state == CLOSED and b.failures == 0
+    b.allow()
+
+
+def test_idempotent_calls_retry_with_full_jitter(clock, sleeps, monkeypatch):
+    jitter = FakeRandom(0.5)
+    monkeypatch.setattr(resilience.policy, "random", jitter)
+    p = policy("test-retry")
+    retried = RETRIES.labels("test-retry").value
+    call = Flaky(failures=2)
+
+    assert run(p.call(call, idempotent=True)) == "ok"
+    assert call.calls == 3
+    # Attempt n waits a random 0..backoff × 2^n
+    assert jitter.ranges == [(0, 0.5), (0, 1.0)]
+    assert sleeps == [0.25, 0.5]
+    assert RETRIES.labels("test-retry").value == retried + 2
+
+    # Out of retries, the last fault is raised
+    call = Flaky(failures=10)
+    with pytest.raises(ConnectionError, match="refused #4"):
+        run(p.call(call, idempotent=True))
+    assert call.calls == 4
+
+    # Non-idempotent calls are never retried
+    call = Flaky(failures=1)
+    with pytest.raises(ConnectionError):
+        run(p.call(call))
+    assert call.calls == 1
+
+
+def test_retries_stop_at_the_deadline(clock, sleeps, monkeypatch):
+    monkeypatch.setattr(resilience.policy, "random", FakeRandom(1.0))
+    p = policy("test-deadline")
+    skipped = DEADLINE_EXCEEDED.labels("test-deadline").value
+
+    async def within(seconds: float, call):
+        with within_deadline(deadline_after(seconds)):
+            return await p.call(call, idempotent=True)
+
+    # The first retry waits 0.5s of the 1s left; the next would wait 1s, past the deadline
+    call = Flaky(failures=10)
+    with pytest.raises(ConnectionError, match="refused #2"):
+        run(within(1.0, call))
+    assert call.calls == 2
+    assert sleeps == [0.5]
+
+    # A deadline that has already passed stops the call before it starts
+    async def expired(call):
+        with within_deadline(deadline_after(1.0)):
+            clock.now += 1.0
+            return await p.call(call, idempotent=True)
+
+    call = Flaky(failures=0)
+    with pytest.raises(DeadlineExceeded):
+        run(expired(call))
+    assert call.calls == 0
+    assert DEADLINE_EXCEEDED.labels("test-deadline").value == skipped + 1
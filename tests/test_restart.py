@@ -0,0 +1,98 @@
+"""
+tests/test_restart.py
+Pending approvals surviving a restart: DeployBot.checkpoint / resume through the
+shared store, with several new workers starting at once, and through the
+checkpoint file a single process uses by default.
+"""
+import asyncio
+
+import bot.deploy_bot
+from bot.deploy_bot import DeployBot
+from jobs.shutdown import ShutdownCoordinator
+from store.shared import SharedStore
+from tests.support import FakeAdapter, run
+
+
+class FakeOctopus:
+
+    def __init__(self):
+        self.deploys: list[tuple] = []
+
+    async def deploy(self, app: str, build_number: str, environment: str) -> dict:
+        self.deploys.append((app, build_number, environment))
+        return {"status": "triggered", "release": f"1.0.{build_number}", "task_id": "ServerTasks-1",
+                "url": "https://octopus.example/app#/Spaces-1/tasks/ServerTasks-1"}
+
+
+def worker(monkeypatch, path: str, name: str) -> tuple[DeployBot, FakeAdapter, SharedStore]:
+    """A bot as one worker process would build it, sharing the database at `path`."""
+    store = SharedStore(path, poll_seconds=0.01)
+    store.worker = name
+    monkeypatch.setattr(bot.deploy_bot, "shared_store", lambda: store)
+    adapter = FakeAdapter()
+    deploy_bot = DeployBot(adapter)
+    deploy_bot._octopus = FakeOctopus()
+    return deploy_bot, adapter, store
+
+
+def test_pending_approval_is_adopted_by_exactly_one_new_worker(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)   # audit.db
+    path = str(tmp_path / "state.db")
+
+    async def scenario():
+        old, _, old_store = worker(monkeypatch, path, "host:1")
+        await old.on_turn(old.adapter.incoming("deploy myapp 42 uat"))
+        await old.jobs.join()
+        (approval_id,) = old.approvals._pending
+        await old.drain(timeout=1)
+        assert await old.checkpoint(old_store) == (1, 0)
+
+        # Three workers start together and all look for work the old one left
+        new = [worker(monkeypatch, path, f"host:{n}") for n in (2, 3, 4)]
+        await asyncio.gather(*(deploy_bot.resume(store) for deploy_bot, _, store in new))
+        adopters = [deploy_bot for deploy_bot, _, _ in new if approval_id in deploy_bot.approvals._pending]
+        assert len(adopters) == 1
+        assert sum(len(adapter.continued) for _, adapter, _ in new) == 1
+
+        # The card's buttons still work, on any worker, and only once
+        clicked, _, _ = next(entry for entry in new if entry[0] is not adopters[0])
+        click = clicked.adapter.incoming("", user="Lead")
+        await clicked.approvals.handle_response(approval_id, approved=True, approver="Lead", turn_context=click)
+        assert clicked.octopus.deploys == [("myapp", "42", "uat")]
+        # ... and the worker that took the click finishes the approval card the old worker posted
+        title, facts = clicked.adapter.updated[-1].attachments[0].content["body"]
+        assert title["text"] == "🚀 Deployment Triggered in UAT"
+        assert {"title": "Approved by", "value": "Lead"} in facts["facts"]
+        assert facts["facts"][-1] == {
+            "title": "Status", "value": "✅ Triggered in Octopus https://octopus.example/app#/Spaces-1/tasks/ServerTasks-1"}
+
+        again = adopters[0].adapter.incoming("", user="Lead")
+        await adopters[0].approvals.handle_response(approval_id, approved=True, approver="Lead", turn_context=again)
+        assert adopters[0].octopus.deploys == []
+        assert "already been handled" in adopters[0].adapter.sent[-1].text
+
+        for deploy_bot, _, _ in new:
+            await deploy_bot.jobs.close()
+    run(scenario())
+
+
+def test_a_single_process_keeps_pending_approvals_by_default(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)   # audit.db, and checkpoint.db next to it
+
+    async def scenario():
+        old = DeployBot(FakeAdapter())
+        await old.on_turn(old.adapter.incoming("deploy myapp 42 uat"))
+        await old.jobs.join()
+        (approval_id,) = old.approvals._pending
+        report = await ShutdownCoordinator(timeout=1).shutdown(old)
+        assert report["checkpointed"] == {"approvals": 1, "builds": 0}
+        assert (tmp_path / "checkpoint.db").exists()
+
+        new = DeployBot(FakeAdapter())
+        new._octopus = FakeOctopus()
+        await ShutdownCoordinator.resume(new)
+        click = new.adapter.incoming("", user="Lead")
+        await new.approvals.handle_response(approval_id, approved=True, approver="Lead", turn_context=click)
+        assert new.octopus.deploys == [("myapp", "42", "uat")]
+        await new.jobs.close()
+    run(scenario())
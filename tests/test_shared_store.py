@@ -0,0 +1,49 @@
+"""
+tests/test_shared_store.py
+State shared by worker processes through one SQLite database (store/shared.py).
+"""
+import sqlite3
+
+import pytest
+
+from metrics.registry import Registry
+from store.shared import SharedStore
+from tests.support import run
+
+
+def workers(path: str, *names: str) -> list[SharedStore]:
+    """One store per worker process, all on the database at `path`."""
+    stores = []
+    for name in names:
+        store = SharedStore(path)
+        store.worker = name
+        stores.append(store)
+    return stores
+
+
+def test_store_refuses_sqlite_without_returning(monkeypatch, tmp_path):
+    monkeypatch.setattr(sqlite3, "sqlite_version_info", (3, 34, 1))
+    monkeypatch.setattr(sqlite3, "sqlite_version", "3.34.1")
+    with pytest.raises(RuntimeError, match="3.35"):
+        SharedStore(str(tmp_path / "state.db"))
+
+
+def test_metrics_cover_every_worker_whichever_one_renders_them(tmp_path):
+    a, b, gone = workers(str(tmp_path / "state.db"), "host:1", "host:2", "host:3")
+    registries = {}
+    for store, handled in ((a, 3), (b, 5), (gone, 7)):
+        registry = registries[store.worker] = Registry()
+        registry.counter("deploybot_handled_total", "Handled", ["command"]).labels("build").inc(handled)
+
+    async def scenario():
+        await gone.publish_metrics(registries["host:3"].samples("host:3"))
+        await b.publish_metrics(registries["host:2"].samples("host:2"))
+        others = await a.worker_metrics(max_age=60)
+        text = registries["host:1"].render(workers=[registries["host:1"].samples("host:1"), *others])
+        assert text.count("# HELP deploybot_handled_total") == 1
+        for worker, handled in (("host:1", 3), ("host:2", 5), ("host:3", 7)):
+            assert f'deploybot_handled_total{{command="build",worker="{worker}"}} {handled}' in text
+
+        # Samples older than max_age are from workers that have stopped
+        assert len(await a.worker_metrics(max_age=0)) == 0
+    run(scenario())
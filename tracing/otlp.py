@@ -0,0 +1,76 @@
+"""
+tracing/otlp.py
+Writes finished traces to a file as OTLP JSON, one ExportTraceServiceRequest
+per line — the format the OpenTelemetry Collector's file exporter writes and
+its `otlpjsonfile` receiver reads, so traces can be forwarded to Jaeger,
+Tempo, etc. without the bot depending on the OpenTelemetry SDK.
+
+Enabled by setting TRACE_EXPORT_PATH. Lines are written on a single background
+thread, in the order traces finish, so the event loop never waits on the disk.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing.tracer import Span, Trace
+
+SERVICE_NAME = "deploybot"
+
+# OTLP enum values
+_SPAN_KIND_INTERNAL = 1
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+
+def _value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _span(span: Span) -> dict:
+    record = {
+        "traceId": span.trace.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": _SPAN_KIND_INTERNAL,
+        "startTimeUnixNano": str(span.start_unix_ns),
+        "endTimeUnixNano": str(span.start_unix_ns + span.duration_ns),
+        "attributes": [{"key": k, "value": _value(v)} for k, v in span.attributes.items()],
+        "status": {"code": _STATUS_ERROR, "message": span.error} if span.error else {"code": _STATUS_OK},
+    }
+    if span.parent_id:
+        record["parentSpanId"] = span.parent_id
+    return record
+
+
+def to_otlp(trace: Trace) -> dict:
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{
+            "scope": {"name": SERVICE_NAME},
+            "spans": [_span(span) for span in trace.spans],
+        }],
+    }]}
+
+
+class OtlpFileExporter:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trace-export")
+
+    def __call__(self, trace: Trace):
+        # Serialise now, while the spans are not going to change
+        line = json.dumps(to_otlp(trace), separators=(",", ":")) + "\n"
+        self._writer.submit(self._append, line)
+
+    def _append(self, line: str):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            print(f"[TRACE] Could not write to {self.path}: {e}")
@@ -0,0 +1,259 @@
+"""
+tracing/tracer.py
+Lightweight in-process tracing — where the seconds of a slow command went.
+
+A trace is a tree of spans: the root is one chat command (started by
+DeployBot when the command is received), children are the Octopus / Jenkins
+calls, audit writes and so on made while handling it.
+
+  with span("octopus.POST", path=path):        # child of the current span, if any
+      ...
+
+  @traced("octopus.release_scan")             # same, for a whole async method
+  async def _get_release_id(...): ...
+
+The current span lives in a contextvar, so it follows the code into tasks
+started with asyncio.create_task / gather. Work handed to a long-lived task
+(a queue worker, a per-environment deploy worker) carries its span across with
+`activate(span)`.
+
+Outside a trace, `span()` and `@traced` do nothing beyond one contextvar read.
+Finished traces are kept in a ring buffer of the last TRACE_BUFFER_SIZE
+(served by /debug/traces) and, if TRACE_EXPORT_PATH is set, appended to that
+file as OTLP JSON (see tracing/otlp.py).
+"""
+import functools
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Optional
+
+from config.settings import settings
+
+
+# perf_counter_ns() + this = Unix time in ns; spans are timed with the monotonic clock
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+_INHERIT = object()   # span(parent=...) default: the current span
+
+_current: ContextVar[Optional["Span"]] = ContextVar("deploybot_span", default=None)
+
+
+class Trace:
+    __slots__ = ("trace_id", "spans", "root")
+
+    def __init__(self):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans: list[Span] = []
+        self.root: Optional[Span] = None
+
+    @property
+    def duration_ns(self) -> int:
+        return self.root.duration_ns
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error",
+                 "_tracer", "_token")
+
+    def __init__(self, tracer: "Tracer", trace: Trace, parent: Optional["Span"], name: str,
+                 start_ns: int, attributes: dict):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.start_ns = start_ns
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self._tracer = tracer
+        self._token = None
+        trace.spans.append(self)
+
+    @property
+    def duration_ns(self) -> int:
+        return (self.end_ns or time.perf_counter_ns()) - self.start_ns
+
+    @property
+    def start_unix_ns(self) -> int:
+        return self.start_ns + _EPOCH_OFFSET_NS
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def child(self, name: str, start_ns: int, end_ns: int, **attributes) -> "Span":
+        """Record an already-finished child span, e.g. time spent waiting in a queue."""
+        span = Span(self._tracer, self.trace, self, name, start_ns, attributes)
+        span.end_ns = end_ns
+        return span
+
+    def end(self, error: Optional[BaseException] = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.perf_counter_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self.trace.root is self:
+            self._tracer._finish(self.trace)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self.end(exc)
+        return False
+
+
+class _NoSpan:
+    """Stands in for a span outside a trace (or with tracing disabled)."""
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def child(self, name, start_ns, end_ns, **attributes):
+        return self
+
+    def end(self, error=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+class _Activated:
+    __slots__ = ("_span", "_token")
+
+    def __init__(self, span: Optional[Span]):
+        self._span = span
+
+    def __enter__(self):
+        self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        return False
+
+
+class Tracer:
+
+    def __init__(self, capacity: int = None, enabled: bool = None):
+        self.enabled = settings.TRACING_ENABLED if enabled is None else enabled
+        self.finished: deque[Trace] = deque(maxlen=capacity or settings.TRACE_BUFFER_SIZE)
+        self.exporters: list = []   # exporter(trace) for every finished trace
+
+    def span(self, name: str, parent=_INHERIT, start_ns: int = None, **attributes):
+        """
+        A span to use as a context manager. It is a child of `parent` (default: the
+        current span); outside a trace it is a no-op, unless `parent=None` is passed
+        explicitly to start a new trace.
+        """
+        if parent is _INHERIT:
+            parent = _current.get()
+            if parent is None:
+                return NO_SPAN
+        elif not self.enabled:
+            return NO_SPAN
+        trace = parent.trace if parent is not None else Trace()
+        span = Span(self, trace, parent, name, start_ns or time.perf_counter_ns(), attributes)
+        if parent is None:
+            trace.root = span
+        return span
+
+    def traced(self, name: str):
+        """Decorator for async functions: run each call in a span named `name`."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                if _current.get() is None:
+                    return await fn(*args, **kwargs)
+                with self.span(name) as s:
+                    result = await fn(*args, **kwargs)
+                    # The clients report most failures as {"status": "error", "message": ...}
+                    if isinstance(result, dict) and result.get("status") == "error":
+                        s.error = result.get("message") or "error"
+                    return result
+            return wrapper
+        return decorate
+
+    def slowest(self, limit: int) -> list[Trace]:
+        return sorted(self.finished, key=lambda trace: trace.duration_ns, reverse=True)[:limit]
+
+    def _finish(self, trace: Trace):
+        self.finished.append(trace)
+        for exporter in self.exporters:
+            try:
+                exporter(trace)
+            except Exception as e:
+                print(f"[TRACE] Export failed: {e}")
+
+
+TRACER = Tracer()
+
+span = TRACER.span
+traced = TRACER.traced
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def activate(span: Optional[Span]) -> _Activated:
+    """Make `span` the current span inside a `with` block, e.g. in a worker task."""
+    return _Activated(span)
+
+
+# ─────────────────────────────────────────────────────────────
+# Waterfall — /debug/traces
+# ─────────────────────────────────────────────────────────────
+def waterfall(trace: Trace, width: int = 40) -> dict:
+    """A trace as JSON: its spans depth-first (siblings in start order), with their offset and depth."""
+    root = trace.root
+    total = max(root.duration_ns, 1)
+    children: dict[Optional[str], list[Span]] = {}
+    for s in sorted(trace.spans, key=lambda s: s.start_ns):
+        children.setdefault(s.parent_id, []).append(s)
+    spans = []
+    stack = [(root, 0)]
+    while stack:
+        s, depth = stack.pop()
+        stack.extend((child, depth + 1) for child in reversed(children.get(s.span_id, ())))
+        offset = s.start_ns - root.start_ns
+        start_col = min(width - 1, offset * width // total)
+        cols = max(1, min(width - start_col, s.duration_ns * width // total))
+        spans.append({
+            "name": s.name,
+            "depth": depth,
+            "offset_ms": round(offset / 1e6, 1),
+            "duration_ms": round(s.duration_ns / 1e6, 1),
+            "bar": " " * start_col + "█" * cols,
+            "attributes": s.attributes,
+            **({"error": s.error} if s.error else {}),
+        })
+    return {
+        "trace_id": trace.trace_id,
+        "name": root.name,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(root.start_unix_ns / 1e9)),
+        "duration_ms": round(root.duration_ns / 1e6, 1),
+        "spans": spans,
+    }
+
+
+def waterfall_text(trace: dict) -> str:
+    """Plain-text rendering of waterfall(trace)."""
+    lines = [f"{trace['name']}  {trace['duration_ms']} ms  {trace['started_at']}  trace {trace['trace_id']}"]
+    for s in trace["spans"]:
+        label = ("  " * s["depth"] + s["name"])[:36]
+        lines.append(f"  {label:<36} {s['duration_ms']:>9.1f} ms  |{s['bar']:<40}|"
+                     + (f"  {s['error']}" if "error" in s else ""))
+    return "\n".join(lines)